@@ -1,14 +1,41 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
 import pandas as pd
+import numpy as np
 import random
+import re
 import os
 import json
 import configparser
 import sys
+import io
+import functools
+import contextlib
+import html
+from collections import Counter, OrderedDict
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import math
+import multiprocessing
+import operator
+import pickle
+import sqlite3
+import tempfile
+from array import array
+import time
+import threading
+import tracemalloc
+import unicodedata
+import queue
+import urllib.parse
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
 # 添加PIL库导入
 try:
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw, ImageFont, ImageTk
 except ImportError:
     print("未找到PIL库，请先安装: pip install pillow")
     pillow_available = False
@@ -28,13 +55,3660 @@ except ImportError:
 else:
     docx_available = True
 
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+except ImportError:
+    print("未找到openpyxl库，请先安装: pip install openpyxl")
+    openpyxl_available = False
+else:
+    openpyxl_available = True
+
+# scipy可选：有则用其linear_sum_assignment求解最优分配，没有时使用内置的numpy实现
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    scipy_available = False
+else:
+    scipy_available = True
+
+
+# ---------------------- 座位调整核心算法（与界面无关） ----------------------
+def _float_value(value):
+    """数值（身高、成绩等）转换为float，空值或无法识别时返回None"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def find_height_slot(seat_positions, seat_data, height_map, height):
+    """在按座位顺序（前排→后排）排好身高的序列中查找新学生的插入位置
+
+    插入位置在按座位顺序第一个比他高的学生之前；空座位和身高未知的学生不参与比较。
+    每次调用都遍历座位表建立索引，界面中连续调整时使用随座位增量更新的SeatRepairIndex。
+
+    Args:
+        seat_positions: 座位坐标列表（顺序即身高从低到高的排列顺序）
+        seat_data: 座位数据字典
+        height_map: 姓名到身高的映射
+        height: 新学生的身高
+
+    Returns:
+        int: 插入位置在seat_positions中的下标
+    """
+    return SeatRepairIndex(seat_positions, seat_data, height_map).find_slot(height)
+
+
+def find_height_slots(seat_positions, seat_data, height_map, heights):
+    """一次求出多名学生的插入位置（只建立一次索引），结果与逐个find_height_slot相同
+
+    Returns:
+        list: 与heights顺序对应的插入位置下标
+    """
+    index = SeatRepairIndex(seat_positions, seat_data, height_map)
+    return [index.find_slot(height) for height in heights]
+
+
+def find_nearest_empty_index(seat_positions, seat_data, start):
+    """从start开始向两侧扩展查找最近的空座位下标，没有空座位时返回None"""
+    total = len(seat_positions)
+    for offset in range(total + 1):
+        for idx in (start + offset, start - offset):
+            if 0 <= idx < total and seat_data[seat_positions[idx]]["name"] == "空":
+                return idx
+    return None
+
+
+def insert_with_min_shift(seat_positions, seat_data, index, entry, before=None, repair_index=None):
+    """把entry放到下标index处，只顺移index与最近空座位之间的学生
+
+    Args:
+        before: 传入字典时在其中记下被修改座位修改前的条目（已有的不覆盖），用于记录撤销
+        repair_index: 传入SeatRepairIndex时随之更新（并在没有空座位时不必查找）
+
+    Returns:
+        list: 数据发生变化的座位坐标列表；没有空座位时返回空列表
+    """
+    if repair_index is not None and not repair_index.empty:
+        return []
+    empty_idx = find_nearest_empty_index(seat_positions, seat_data, min(index, len(seat_positions) - 1))
+    if empty_idx is None:
+        return []
+    if empty_idx >= index:
+        # 空座位在后方：index..empty_idx-1 依次后移一位
+        changed = seat_positions[index:empty_idx + 1]
+    else:
+        # 空座位在前方：empty_idx+1..index-1 依次前移一位
+        changed = seat_positions[empty_idx:index]
+    if before is not None:
+        for pos in changed:
+            before.setdefault(pos, seat_data[pos])
+    if empty_idx >= index:
+        for idx in range(empty_idx, index, -1):
+            seat_data[seat_positions[idx]] = seat_data[seat_positions[idx - 1]]
+        target = index
+    else:
+        for idx in range(empty_idx, index - 1):
+            seat_data[seat_positions[idx]] = seat_data[seat_positions[idx + 1]]
+        target = index - 1
+    seat_data[seat_positions[target]] = entry
+    if repair_index is not None:
+        repair_index.update(changed, seat_data)
+    return list(changed)
+
+
+class SeatRepairIndex:
+    """插班/离班增量调整用的索引，随座位变化增量更新，代价与变化的座位数有关
+
+    按座位顺序建立最大值线段树，叶子为各座位上学生的身高（空座位或身高未知为-inf），
+    查找身高插入位置只需沿树下降一次；同时记录名单中尚未安排座位的学生，离班补位时不必扫描座位表。
+    """
+
+    def __init__(self, seat_positions, seat_data, height_map, students=()):
+        self.positions = seat_positions
+        self.index = {pos: i for i, pos in enumerate(seat_positions)}
+        self.size = 1
+        while self.size <= len(seat_positions):
+            self.size *= 2
+        self.tree = [-math.inf] * (2 * self.size)
+        self.heights = {name: _float_value(height) for name, height in height_map.items()}
+        # 名单：姓名 -> 首个学生记录、人数、名单中的先后顺序
+        self.roster = {}
+        self.roster_count = Counter()
+        self.order = {}
+        self._next_order = 0
+        self.seated = Counter()
+        self.unseated = set()
+        self.names = ["空"] * len(seat_positions)
+        self.empty = len(seat_positions)
+        for i, pos in enumerate(seat_positions):
+            name = seat_data[pos]["name"]
+            if name != "空":
+                self.names[i] = name
+                self.empty -= 1
+                self.seated[name] += 1
+                self.tree[self.size + i] = self._height_of(name)
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+        for stu in students:
+            self.add_student(stu)
+
+    def _height_of(self, name):
+        height = self.heights.get(name)
+        return -math.inf if height is None else height
+
+    def _set(self, i, height):
+        node = self.size + i
+        self.tree[node] = height
+        node //= 2
+        while node:
+            value = max(self.tree[2 * node], self.tree[2 * node + 1])
+            if self.tree[node] == value:
+                break
+            self.tree[node] = value
+            node //= 2
+
+    def _seat(self, name, sign):
+        if name == "空":
+            self.empty += sign
+            return
+        self.seated[name] += sign
+        if self.seated[name] <= 0:
+            del self.seated[name]
+            if name in self.roster:
+                self.unseated.add(name)
+        else:
+            self.unseated.discard(name)
+
+    def update(self, positions, seat_data):
+        """按座位数据的最新内容更新索引，代价只与变化的座位数有关"""
+        for pos in positions:
+            i = self.index.get(pos)
+            if i is None:
+                continue
+            old, new = self.names[i], seat_data[pos]["name"]
+            if old == new:
+                continue
+            self._seat(old, -1)
+            self._seat(new, 1)
+            self.names[i] = new
+            self._set(i, -math.inf if new == "空" else self._height_of(new))
+
+    def add_student(self, student):
+        """名单中加入一名学生（尚未安排座位时成为候补）"""
+        name = student["姓名"]
+        self.roster_count[name] += 1
+        if name not in self.roster:
+            self.roster[name] = student
+            self.order[name] = self._next_order
+            self._next_order += 1
+        self.heights[name] = _float_value(student.get("身高"))
+        if name not in self.seated:
+            self.unseated.add(name)
+
+    def remove_student(self, name):
+        """名单中去掉一名学生"""
+        self.roster_count[name] -= 1
+        if self.roster_count[name] <= 0:
+            del self.roster_count[name]
+            self.roster.pop(name, None)
+            self.order.pop(name, None)
+            self.unseated.discard(name)
+
+    def waiting(self):
+        """名单中有但没有座位的学生记录（按名单顺序）"""
+        return [self.roster[name] for name in sorted(self.unseated, key=self.order.__getitem__)]
+
+    def _first_taller(self, height):
+        """按座位顺序第一个比height高的学生的座位下标，没有时返回座位数"""
+        if self.tree[1] <= height:
+            return len(self.positions)
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] > height else 2 * node + 1
+        return node - self.size
+
+    def _last_known_before(self, j):
+        """下标小于j、有人且身高已知的最后一个座位下标，没有时返回-1"""
+        node = self.size + j
+        while node > 1:
+            # 右子节点的左兄弟正好覆盖紧邻其前的一段座位
+            if node & 1 and self.tree[node - 1] > -math.inf:
+                node -= 1
+                break
+            node //= 2
+        else:
+            return -1
+        while node < self.size:
+            node = 2 * node + 1 if self.tree[2 * node + 1] > -math.inf else 2 * node
+        return node - self.size
+
+    def find_slot(self, height):
+        """新学生的插入位置：第一个比他高的学生之前、紧跟前一个身高已知的学生（身高未知时排在最后）"""
+        height = _float_value(height)
+        j = len(self.positions) if height is None else self._first_taller(height)
+        return self._last_known_before(j) + 1
+
+
+def build_seat_positions(layout_config):
+    """根据布局配置生成座位坐标列表（顺序即座位编号顺序）
+
+    Args:
+        layout_config: 布局配置字典，需包含podium_seats、main_rows、main_cols
+
+    Returns:
+        list: 座位坐标(行, 列)列表
+    """
+    seat_positions = []
+    main_cols = layout_config["main_cols"]
+    podium_seats = layout_config["podium_seats"]
+    main_rows = layout_config["main_rows"]
+    # 计算总宽度与讲台参数 - 讲台独立居中，不与座位列对齐
+    total_width = max(main_cols, 4)  # 增加最小宽度以适应2格讲台
+    podium_width = 2  # 讲台固定占用2格
+    podium_start_col = (total_width - podium_width + 1) // 2  # 讲台始终居中，不考虑座位列
+    podium_row = main_rows + 1  # 讲台行位置（教师视角：讲台在下方）
+
+    # 1. 讲台侧座位（若数量>0则生成）- 围绕讲台左右排列
+    # 教师视角：讲台侧座位位于讲台同一行的左右两侧
+    if podium_seats > 0:
+        # 计算左侧和右侧座位数
+        left_seats = podium_seats // 2
+        right_seats = podium_seats - left_seats
+
+        # 左侧座位（从教师视角看是左侧，位于讲台左边）
+        for i in range(left_seats):
+            seat_positions.append((podium_row, podium_start_col - (left_seats - i)))
+
+        # 右侧座位（从教师视角看是右侧，位于讲台右边）
+        for i in range(right_seats):
+            seat_positions.append((podium_row, podium_start_col + podium_width + i))
+
+    # 2. 主体座位 - 教师视角：左下角为起始号
+    # 从下往上遍历行，从左到右遍历列，确保左下角座位先被添加（起始号）
+    start_col = (total_width - main_cols) // 2
+    for r in range(main_rows, 0, -1):
+        # 从左到右遍历列（教师视角）
+        for c in range(start_col, start_col + main_cols):
+            seat_positions.append((r, c))
+    return seat_positions
+
+
+def _relative_seat_key(layout_config, pos):
+    """把座位坐标转换为与行列数无关的相对位置
+
+    主体座位用（距讲台第几排, 距中线的列偏移）表示，讲台侧座位用（左右侧, 距讲台第几个）表示，
+    这样行列数变化后前排仍是前排、中间列仍在中间。
+    """
+    main_rows = layout_config["main_rows"]
+    main_cols = layout_config["main_cols"]
+    total_width = max(main_cols, 4)
+    r, c = pos
+    if r == main_rows + 1:
+        podium_start_col = (total_width - 2 + 1) // 2
+        if c < podium_start_col:
+            return ("podium", "left", podium_start_col - c)
+        return ("podium", "right", c - (podium_start_col + 1))
+    start_col = (total_width - main_cols) // 2
+    # 列偏移以左半边列数为基准，列数增减时两侧对称变化
+    return ("main", main_rows - r, c - start_col - main_cols // 2)
+
+
+def _seat_from_relative_key(layout_config, key):
+    """_relative_seat_key的逆运算，返回新布局中的目标座位坐标（可能越界）"""
+    main_rows = layout_config["main_rows"]
+    main_cols = layout_config["main_cols"]
+    total_width = max(main_cols, 4)
+    if key[0] == "podium":
+        podium_start_col = (total_width - 2 + 1) // 2
+        _, side, distance = key
+        if side == "left":
+            return (main_rows + 1, podium_start_col - distance)
+        return (main_rows + 1, podium_start_col + 1 + distance)
+    _, front_offset, col_offset = key
+    start_col = (total_width - main_cols) // 2
+    return (main_rows - front_offset, start_col + main_cols // 2 + col_offset)
+
+
+def migrate_seat_data(old_config, old_seat_data, new_config, new_positions):
+    """布局变化时按相对位置迁移已有座位安排
+
+    能对应上的学生保持相对位置不变；对应座位被删除的学生就近安排到最近的空座位；
+    新增的座位保持为空。
+
+    Returns:
+        tuple: (新座位数据字典, 无座位可安排的学生条目列表)
+    """
+    new_seat_data = {pos: {"name": "空", "gender": "空"} for pos in new_positions}
+    new_rows = new_config["main_rows"]
+    new_cols = new_config["main_cols"]
+    new_start_col = (max(new_cols, 4) - new_cols) // 2
+    displaced = []
+    for pos, entry in old_seat_data.items():
+        if entry["name"] == "空":
+            continue
+        target = _seat_from_relative_key(new_config, _relative_seat_key(old_config, pos))
+        if target in new_seat_data and new_seat_data[target]["name"] == "空":
+            new_seat_data[target] = entry
+            continue
+        # 目标座位不存在：夹到新主体区域的边界上再就近找空位
+        r = min(max(target[0], 1), new_rows)
+        c = min(max(target[1], new_start_col), new_start_col + new_cols - 1)
+        displaced.append(((r, c), entry))
+
+    unplaced = []
+    free_count = sum(1 for entry in new_seat_data.values() if entry["name"] == "空")
+    max_distance = new_rows + max(new_cols, 4) + 2
+    for (r, c), entry in displaced:
+        if free_count == 0:
+            unplaced.append(entry)
+            continue
+        placed = False
+        # 按曼哈顿距离由近到远逐圈查找空座位，只搜索受影响的局部区域
+        for distance in range(max_distance + 1):
+            for dr in range(-distance, distance + 1):
+                dc = distance - abs(dr)
+                for cand in {(r + dr, c - dc), (r + dr, c + dc)}:
+                    if cand in new_seat_data and new_seat_data[cand]["name"] == "空":
+                        new_seat_data[cand] = entry
+                        placed = True
+                        break
+                if placed:
+                    break
+            if placed:
+                break
+        if placed:
+            free_count -= 1
+        else:
+            unplaced.append(entry)
+    return new_seat_data, unplaced
+
+def grid_permutation(layout_config, operation, *args):
+    """计算主体座位区域的整体调整，返回{目标座位: 来源座位}
+
+    行按教师视角从前（靠近讲台）往后计数，列从左往右计数，均从1开始。
+
+    Args:
+        operation: swap_rows(a, b)、swap_cols(a, b)、shift_rows(k)、shift_cols(k)、mirror()、rotate()
+            shift_rows把每排向后轮换k排（最后几排轮换到最前）；shift_cols把每列向右轮换k列；
+            mirror左右镜像；rotate把整个教室旋转180度
+    """
+    rows = layout_config["main_rows"]
+    cols = layout_config["main_cols"]
+    start_col = (max(cols, 4) - cols) // 2
+
+    def swap(index, a, b):
+        return b if index == a else a if index == b else index
+
+    if operation == "swap_rows":
+        a, b = args[0] - 1, args[1] - 1
+        source_of = lambda f, c: (swap(f, a, b), c)
+    elif operation == "swap_cols":
+        a, b = args[0] - 1, args[1] - 1
+        source_of = lambda f, c: (f, swap(c, a, b))
+    elif operation == "shift_rows":
+        k = args[0]
+        source_of = lambda f, c: ((f - k) % rows, c)
+    elif operation == "shift_cols":
+        k = args[0]
+        source_of = lambda f, c: (f, (c - k) % cols)
+    elif operation == "mirror":
+        source_of = lambda f, c: (f, cols - 1 - c)
+    elif operation == "rotate":
+        source_of = lambda f, c: (rows - 1 - f, cols - 1 - c)
+    else:
+        raise ValueError(f"未知的调整方式：{operation}")
+
+    mapping = {}
+    for f in range(rows):
+        for c in range(cols):
+            sf, sc = source_of(f, c)
+            if not (0 <= sf < rows and 0 <= sc < cols):
+                raise ValueError("行号或列号超出范围")
+            if (sf, sc) != (f, c):
+                mapping[(rows - f, start_col + c)] = (rows - sf, start_col + sc)
+    return mapping
+
+
+def group_move_permutation(seat_positions, selected, row_offset, col_offset):
+    """把选中的一组座位整体平移，被占用的座位依次移到空出的位置，返回{目标座位: 来源座位}
+
+    Args:
+        seat_positions: 座位坐标列表
+        selected: 选中的座位坐标
+        row_offset: 向后移动的排数（负数表示向前）
+        col_offset: 向右移动的列数（负数表示向左）
+
+    Raises:
+        ValueError: 移动后超出座位范围
+    """
+    order = {pos: idx for idx, pos in enumerate(seat_positions)}
+    sources = sorted(selected, key=order.get)
+    targets = [(r - row_offset, c + col_offset) for r, c in sources]
+    if not all(pos in order for pos in targets):
+        raise ValueError("移动后超出座位范围")
+    mapping = dict(zip(targets, sources))
+    # 目标区域中原有的学生按座位顺序填到空出的位置
+    target_set = set(targets)
+    vacated = [pos for pos in sources if pos not in target_set]
+    displaced = sorted((pos for pos in targets if pos not in set(sources)), key=order.get)
+    mapping.update(zip(vacated, displaced))
+    return {target: source for target, source in mapping.items() if target != source}
+
+
+def diff_seat_data(before, after, positions=None):
+    """比较操作前后的座位数据，返回发生变化的((坐标, 修改前, 修改后), ...)
+
+    Args:
+        before: 操作前的座位数据（可以是浅拷贝）
+        after: 操作后的座位数据
+        positions: 只比较这些座位，默认比较全部座位
+    """
+    changes = []
+    for pos in (after if positions is None else positions):
+        old, new = before.get(pos), after[pos]
+        if old is not new and old != new:
+            changes.append((pos, old, new))
+    return tuple(changes)
+
+
+def occupied_seats(seat_data):
+    """返回有学生的座位((坐标, 座位条目), ...)，用于记录布局变化前后的安排"""
+    return tuple((pos, entry) for pos, entry in seat_data.items() if entry["name"] != "空")
+
+
+class HistoryEntry:
+    """一步可撤销的操作
+
+    seats: 发生变化的座位((坐标, 修改前, 修改后), ...)，写入历史时会被编码为整数数组
+    layout: 布局变化时为(修改前配置, 修改后配置, 修改前有人的座位, 修改后有人的座位)
+    students: 学生名单变化时为(修改前名单, 修改后名单)
+    arrangement: 排座来源记录变化时为(修改前记录, 修改后记录)，撤销/重做时与座位一起恢复
+    """
+
+    __slots__ = ("label", "seats", "layout", "students", "arrangement")
+
+    def __init__(self, label, seats=(), layout=None, students=None, arrangement=None):
+        self.label = label
+        self.seats = seats
+        self.layout = layout
+        self.students = students
+        self.arrangement = arrangement
+
+
+class _HistoryStack:
+    """撤销或重做栈：所有步骤的座位变化连续存放在一个整数数组中"""
+
+    __slots__ = ("deltas", "ends", "labels", "extras")
+
+    def __init__(self):
+        # 每个座位变化占3个整数：座位编号、修改前条目编号、修改后条目编号
+        self.deltas = array("i")
+        # 每一步在deltas中的结束位置
+        self.ends = array("i")
+        self.labels = array("H")
+        # 布局、名单等不常见的附加信息，按步骤序号存放
+        self.extras = {}
+
+    def __len__(self):
+        return len(self.ends)
+
+    def push(self, deltas, label_id, extra):
+        self.deltas.extend(deltas)
+        self.ends.append(len(self.deltas))
+        self.labels.append(label_id)
+        if extra is not None:
+            self.extras[len(self.ends) - 1] = extra
+
+    def pop(self):
+        index = len(self.ends) - 1
+        start = self.ends[index - 1] if index > 0 else 0
+        deltas = self.deltas[start:]
+        del self.deltas[start:]
+        self.ends.pop()
+        label_id = self.labels.pop()
+        return deltas, label_id, self.extras.pop(index, None)
+
+    def clear(self):
+        del self.deltas[:]
+        del self.ends[:]
+        del self.labels[:]
+        self.extras.clear()
+
+
+class StartupTimeline:
+    """记录程序启动各阶段的起止时间（相对于创建时刻），用于分析启动慢在哪里"""
+
+    def __init__(self, echo=False):
+        self.origin = time.perf_counter()
+        # 为True时启动完成后在控制台输出时间线
+        self.echo = echo
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def _record(self, name, start, end):
+        with self._lock:
+            self.entries.append((start - self.origin, end - self.origin, name, threading.current_thread().name))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """记录一个阶段的耗时：with timeline.stage("构建界面"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter())
+
+    def mark(self, name):
+        """记录一个时间点（如窗口首次显示）"""
+        now = time.perf_counter()
+        self._record(name, now, now)
+
+    def report(self):
+        with self._lock:
+            entries = sorted(self.entries)
+        lines = ["启动时间线（毫秒）：", f"{'开始':>8}{'结束':>9}{'耗时':>9}  阶段"]
+        for start, end, name, thread in entries:
+            where = "" if thread == "MainThread" else f"（{thread}线程）"
+            lines.append(f"{start * 1000:9.1f}{end * 1000:10.1f}{(end - start) * 1000:10.1f}  {name}{where}")
+        return "\n".join(lines)
+
+
+class ClassSession:
+    """工作区中打开的一个班级（一个标签页）
+
+    班级数据（布局、座位、名单、撤销历史等）一直保存在内存中；座位画布等界面控件只为最近使用的几个班级保留，
+    其余班级的界面被释放，再次切换到时重新创建。当前班级的数据与界面直接放在StudentSeatTool的属性上，
+    切换班级时与会话交换。
+    """
+
+    # 班级数据
+    MODEL_FIELDS = ("class_id", "layout_config", "seat_positions", "seat_index_map", "seat_data", "students",
+                    "arrangement_record", "history", "selected_seats", "metrics", "_metrics_students_key",
+                    "constraint_checker", "_constraint_students_key", "occlusion", "repair_index",
+                    "_repair_students_key")
+    # 座位画布及其上的控件
+    VIEW_FIELDS = ("seat_canvas", "seat_frame", "seat_frame_window", "seat_buttons", "virtual_view")
+
+    def __init__(self, model=None, file_path=None):
+        self.model = model or {}
+        # 界面控件，未创建或已释放时为None
+        self.view = None
+        # 使用JSON文件保存时该班级的自动保存文件，None表示默认的座位表数据.json
+        self.file_path = file_path
+        # 标签页（ttk.Notebook中的占位框架）
+        self.tab = None
+
+    @staticmethod
+    def new_model(layout_config, seat_data=None, seat_index_map=None, students=(), arrangement=None, class_id=None):
+        """按布局生成班级数据，seat_data中不属于该布局的座位被丢弃，缺少的座位为空
+
+        class_id为SQLite存储中的班级编号，尚未保存到数据库（或使用JSON文件保存）时为None。
+        """
+        seat_positions = build_seat_positions(layout_config)
+        seat_data = seat_data or {}
+        return {
+            "class_id": class_id,
+            "layout_config": layout_config,
+            "seat_positions": seat_positions,
+            "seat_index_map": seat_index_map or {pos: idx + 1 for idx, pos in enumerate(seat_positions)},
+            "seat_data": {pos: seat_data.get(pos, {"name": "空", "gender": "空"}) for pos in seat_positions},
+            "students": list(students),
+            "arrangement_record": arrangement,
+            "history": SeatHistory(),
+            "selected_seats": set(),
+            "metrics": None,
+            "_metrics_students_key": None,
+            "constraint_checker": None,
+            "_constraint_students_key": None,
+            "occlusion": {},
+            "repair_index": None,
+            "_repair_students_key": None,
+        }
+
+
+class SeatHistory:
+    """座位调整的撤销/重做历史
+
+    座位坐标与座位条目都只登记一次，每一步只以整数三元组记录变化的座位，
+    因此大教室上成千上万步的交换也只占用几十KB内存。
+    丢弃重做步骤后，登记表中只被这些步骤引用的条目在登记数翻倍时统一清理。
+    """
+
+    # 登记的条目少于该数量时不清理
+    COMPACT_MIN = 1024
+
+    def __init__(self):
+        self.undo_stack = _HistoryStack()
+        self.redo_stack = _HistoryStack()
+        self._reset_tables()
+
+    def _reset_tables(self):
+        self._positions = []
+        self._position_ids = {}
+        self._values = []
+        self._value_ids = {}
+        self._labels = []
+        self._label_ids = {}
+        self._compact_at = self.COMPACT_MIN
+
+    @staticmethod
+    def _intern(key, value, items, ids):
+        item_id = ids.get(key)
+        if item_id is None:
+            item_id = ids[key] = len(items)
+            items.append(value)
+        return item_id
+
+    def _encode(self, entry):
+        deltas = array("i")
+        for pos, old, new in entry.seats:
+            deltas.append(self._intern(pos, pos, self._positions, self._position_ids))
+            for value in (old, new):
+                if value is None:
+                    deltas.append(-1)
+                else:
+                    key = tuple(sorted(value.items()))
+                    deltas.append(self._intern(key, value, self._values, self._value_ids))
+        label_id = self._intern(entry.label, entry.label, self._labels, self._label_ids)
+        extra = None
+        if entry.layout is not None or entry.students is not None or entry.arrangement is not None:
+            extra = (entry.layout, entry.students, entry.arrangement)
+        return deltas, label_id, extra
+
+    def _decode(self, deltas, label_id, extra):
+        seats = tuple(
+            (self._positions[deltas[i]],
+             self._values[deltas[i + 1]] if deltas[i + 1] >= 0 else None,
+             self._values[deltas[i + 2]] if deltas[i + 2] >= 0 else None)
+            for i in range(0, len(deltas), 3)
+        )
+        layout, students, arrangement = extra if extra is not None else (None, None, None)
+        return HistoryEntry(self._labels[label_id], seats, layout, students, arrangement)
+
+    def push(self, entry):
+        self.undo_stack.push(*self._encode(entry))
+        # 新操作之后不能再重做之前撤销的步骤
+        self.redo_stack.clear()
+        if len(self._positions) + len(self._values) > self._compact_at:
+            self._compact()
+
+    def _compact(self):
+        """丢弃两个栈都不再引用的座位坐标、座位条目和操作名称，其余重新编号"""
+        stacks = (self.undo_stack, self.redo_stack)
+        used_positions, used_values, used_labels = set(), set(), set()
+        for stack in stacks:
+            used_positions.update(stack.deltas[0::3])
+            used_values.update(stack.deltas[1::3])
+            used_values.update(stack.deltas[2::3])
+            used_labels.update(stack.labels)
+        used_values.discard(-1)
+        position_map = {old: new for new, old in enumerate(sorted(used_positions))}
+        value_map = {old: new for new, old in enumerate(sorted(used_values))}
+        value_map[-1] = -1
+        label_map = {old: new for new, old in enumerate(sorted(used_labels))}
+        for stack in stacks:
+            deltas = stack.deltas
+            deltas[0::3] = array("i", [position_map[i] for i in deltas[0::3]])
+            deltas[1::3] = array("i", [value_map[i] for i in deltas[1::3]])
+            deltas[2::3] = array("i", [value_map[i] for i in deltas[2::3]])
+            stack.labels[:] = array("H", [label_map[i] for i in stack.labels])
+        positions = [self._positions[i] for i in sorted(used_positions)]
+        values = [self._values[i] for i in sorted(used_values)]
+        labels = [self._labels[i] for i in sorted(used_labels)]
+        self._reset_tables()
+        for pos in positions:
+            self._intern(pos, pos, self._positions, self._position_ids)
+        for value in values:
+            self._intern(tuple(sorted(value.items())), value, self._values, self._value_ids)
+        for label in labels:
+            self._intern(label, label, self._labels, self._label_ids)
+        self._compact_at = max(self.COMPACT_MIN, 2 * (len(self._positions) + len(self._values)))
+
+    def pop_undo(self):
+        if not self.undo_stack:
+            return None
+        record = self.undo_stack.pop()
+        self.redo_stack.push(*record)
+        return self._decode(*record)
+
+    def pop_redo(self):
+        if not self.redo_stack:
+            return None
+        record = self.redo_stack.pop()
+        self.undo_stack.push(*record)
+        return self._decode(*record)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._reset_tables()
+
+
+# ---------------------- 排座与导出（与界面无关，界面与服务模式共用） ----------------------
+DEFAULT_LAYOUT_CONFIG = {
+    "podium_seats": 0,
+    "main_rows": 6,
+    "main_cols": 8,
+    "class_name": "",
+    "teacher_name": ""
+}
+
+# 性别颜色（改进的配色方案，更加柔和美观），座位按钮与Excel导出共用
+GENDER_COLORS = {
+    "男": "#64B5F6",  # 柔和的蓝色
+    "女": "#FFB7C5",  # 柔和的粉色
+    "空": "#E8EAF6"   # 柔和的灰色
+}
+
+
+def same_path(path1, path2):
+    """两个路径是否指向同一文件（忽略大小写差异等平台规则）"""
+    return os.path.normcase(os.path.abspath(path1)) == os.path.normcase(os.path.abspath(path2))
+
+
+def get_base_dir():
+    """获取程序运行时的基础目录（考虑PyInstaller单文件打包情况）"""
+    if hasattr(sys, '_MEIPASS'):
+        # 打包后的临时目录
+        return os.path.dirname(os.path.abspath(sys.executable))
+    # 正常运行时的目录
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def _read_text_table(source, sep):
+    """读取CSV/TSV：Excel导出的CSV常为GBK编码，UTF-8解码失败时改用GB18030"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            content = f.read()
+    else:
+        content = source.read()
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = content.decode("gb18030")
+    return pd.read_csv(io.StringIO(text), sep=sep)
+
+
+# 名单读取器：扩展名 -> 读取函数（接受文件路径或二进制文件对象，返回DataFrame）
+ROSTER_READERS = {
+    "xlsx": pd.read_excel,
+    "xls": pd.read_excel,
+    "csv": lambda source: _read_text_table(source, ","),
+    "tsv": lambda source: _read_text_table(source, "\t"),
+    "json": lambda source: pd.read_json(source, orient="records"),
+    # 以下两种格式需要pyarrow，未安装时pandas会抛出ImportError
+    "parquet": pd.read_parquet,
+    "feather": pd.read_feather,
+}
+ROSTER_EXTENSIONS = tuple("." + ext for ext in ROSTER_READERS)
+ROSTER_FILETYPES = [
+    ("学生名单", ";".join("*" + ext for ext in ROSTER_EXTENSIONS)),
+    ("Excel文件", "*.xlsx;*.xls"),
+    ("CSV文件", "*.csv;*.tsv"),
+]
+
+
+# 名单写出器：扩展名 -> 写出函数（DataFrame, 文件路径），用于保存生成的测试名单
+ROSTER_WRITERS = {
+    "xlsx": lambda df, path: df.to_excel(path, index=False),
+    "csv": lambda df, path: df.to_csv(path, index=False, encoding="utf-8-sig"),
+    "tsv": lambda df, path: df.to_csv(path, index=False, sep="\t", encoding="utf-8-sig"),
+    "json": lambda df, path: df.to_json(path, orient="records", force_ascii=False),
+}
+
+
+def write_roster(students, path):
+    """按扩展名把学生名单写成名单文件（可再由read_roster读取）"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    writer = ROSTER_WRITERS.get(ext)
+    if writer is None:
+        raise ValueError(f"不支持的名单格式：{ext}（可用：{'、'.join(ROSTER_WRITERS)}）")
+    writer(pd.DataFrame.from_records(students), path)
+
+
+def roster_format(path):
+    """由文件扩展名得到名单格式，不支持的格式返回None"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in ROSTER_READERS else None
+
+
+def read_roster(source, file_format=None):
+    """读取学生名单
+
+    Args:
+        source: 文件路径或二进制文件对象
+        file_format: 名单格式（见ROSTER_READERS），默认由路径扩展名判断，文件对象默认为xlsx
+
+    Returns:
+        list: 学生记录字典列表
+
+    Raises:
+        ValueError: 格式不支持或缺少必要的列
+    """
+    if file_format is None:
+        file_format = roster_format(source) if isinstance(source, str) else "xlsx"
+        if file_format is None:
+            raise ValueError(f"不支持的名单格式：{os.path.splitext(source)[1]}")
+    elif file_format not in ROSTER_READERS:
+        raise ValueError(f"不支持的名单格式：{file_format}")
+    df = ROSTER_READERS[file_format](source)
+    required_cols = ["姓名", "性别", "身高"]
+    if not all(col in df.columns for col in required_cols):
+        raise ValueError("名单需包含：姓名、性别、身高列")
+    return df.to_dict("records")
+
+
+# 名单解析缓存：解析结果以pickle保存在缓存目录，键为文件路径、大小、修改时间与内容哈希
+ROSTER_CACHE_DIR = os.path.join(get_base_dir(), ".roster_cache")
+ROSTER_CACHE_VERSION = 1
+ROSTER_CACHE_MAX_FILES = 256
+# 进程内的stat缓存：路径 -> ((大小, 修改时间), 内容哈希)，文件未变化时不必重新读取计算哈希
+_roster_digests = {}
+_roster_digests_lock = threading.Lock()
+
+
+def file_sha256(path):
+    """文件内容的sha256（分块读取）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_roster(path, digest=None, cache_dir=None, stat_key=None):
+    """读取名单文件，解析结果缓存到磁盘，同一文件再次导入时直接读取缓存
+
+    Args:
+        path: 名单文件路径
+        digest: 已知的文件内容sha256（如监视模式已计算过），省去重复计算
+        cache_dir: 缓存目录，默认为ROSTER_CACHE_DIR
+        stat_key: 计算digest时文件的(大小, 修改时间纳秒)；与当前文件不符（或未提供）时digest不被采用
+
+    Returns:
+        list: 学生记录字典列表
+
+    Raises:
+        ValueError: 格式不支持或缺少必要的列
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    current = (stat.st_size, stat.st_mtime_ns)
+    if stat_key != current:
+        # 调用方计算哈希之后文件又被修改过，哈希与当前文件对不上
+        digest = None
+    if digest is None:
+        with _roster_digests_lock:
+            cached = _roster_digests.get(path)
+        if cached and cached[0] == current:
+            digest = cached[1]
+        else:
+            digest = file_sha256(path)
+    with _roster_digests_lock:
+        _roster_digests[path] = (current, digest)
+
+    cache_dir = cache_dir or ROSTER_CACHE_DIR
+    cache_key = hashlib.sha256(
+        json.dumps([ROSTER_CACHE_VERSION, path, stat.st_size, stat.st_mtime_ns, digest]).encode("utf-8")
+    ).hexdigest()
+    cache_path = os.path.join(cache_dir, cache_key + ".pkl")
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # 缓存损坏或由不兼容的版本写入，重新解析
+        print(f"名单缓存读取失败，重新解析：{str(e)}")
+
+    students = read_roster(path)
+    stat = os.stat(path)
+    if (stat.st_size, stat.st_mtime_ns) != current:
+        # 解析期间文件被修改：解析结果可能不是哈希对应的内容，不写入缓存
+        return students
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再替换，并发导入同一文件时不会读到写了一半的缓存
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(students, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        prune_roster_cache(cache_dir)
+    except OSError as e:
+        # 缓存只是加速手段，写入失败不影响导入
+        print(f"名单缓存写入失败：{str(e)}")
+    return students
+
+
+def prune_roster_cache(cache_dir=None, max_files=ROSTER_CACHE_MAX_FILES):
+    """缓存文件超过上限时删除最早的缓存"""
+    cache_dir = cache_dir or ROSTER_CACHE_DIR
+    entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".pkl")]
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# 名单校验：身高的合理范围（厘米），超出范围只给出警告
+ROSTER_HEIGHT_RANGE = (80, 230)
+ROSTER_GENDERS = ("男", "女")
+
+
+def validate_roster(students, seat_count=None):
+    """按列整体校验名单，在排座之前给出结构化的报告
+
+    行号按名单文件计（第1行为表头，第一名学生为第2行）。
+
+    Args:
+        students: 学生记录字典列表
+        seat_count: 座位数，提供时检查名单人数是否超出
+
+    Returns:
+        dict: {"total": 人数, "capacity": 座位数, "errors": [...], "warnings": [...]}，
+              每一项为{"column": 列名, "message": 说明, "rows": [行号, ...]}；errors为空时可以排座
+    """
+    report = {"total": len(students), "capacity": seat_count, "errors": [], "warnings": []}
+
+    def add(level, column, message, mask=None):
+        rows = (np.flatnonzero(mask.to_numpy()) + 2).tolist() if mask is not None else []
+        report[level].append({"column": column, "message": message, "rows": rows})
+
+    if not students:
+        add("errors", "姓名", "名单中没有学生")
+        return report
+    df = pd.DataFrame.from_records(students)
+    missing = [col for col in ("姓名", "性别", "身高") if col not in df.columns]
+    if missing:
+        add("errors", "、".join(missing), f"缺少必要的列：{'、'.join(missing)}")
+        return report
+
+    names = df["姓名"].astype(str).str.strip()
+    blank_names = df["姓名"].isna() | (names == "")
+    if blank_names.any():
+        add("errors", "姓名", "姓名为空", blank_names)
+    duplicated = df["姓名"].duplicated(keep=False) & ~blank_names
+    if duplicated.any():
+        add("warnings", "姓名", f"姓名重复：{'、'.join(names[duplicated].unique()[:10])}（换座、查找时无法区分）",
+            duplicated)
+
+    bad_gender = ~df["性别"].isin(ROSTER_GENDERS)
+    if bad_gender.any():
+        values = df["性别"][bad_gender].astype(str).unique()[:10]
+        add("errors", "性别", f"性别只能为“男”或“女”，发现：{'、'.join(repr(v) for v in values)}", bad_gender)
+
+    heights = pd.to_numeric(df["身高"], errors="coerce")
+    bad_height = heights.isna()
+    if bad_height.any():
+        add("errors", "身高", "身高为空或不是数字", bad_height)
+    low, high = ROSTER_HEIGHT_RANGE
+    odd_height = ~bad_height & ((heights < low) | (heights > high))
+    if odd_height.any():
+        add("warnings", "身高", f"身高超出{low}～{high}厘米，请确认单位是否为厘米", odd_height)
+
+    if "成绩" in df.columns:
+        scores = pd.to_numeric(df["成绩"], errors="coerce")
+        bad_score = scores.isna() & df["成绩"].notna()
+        if bad_score.any():
+            add("errors", "成绩", "成绩不是数字", bad_score)
+        missing_score = df["成绩"].isna()
+        if missing_score.any():
+            add("warnings", "成绩", "成绩为空，按成绩排序时视为0分", missing_score)
+
+    if SEAT_REQUIREMENT_COLUMN in df.columns:
+        def invalid_requirement(value):
+            try:
+                parse_seat_requirements(value)
+            except ValueError:
+                return True
+            return False
+        bad_requirement = df[SEAT_REQUIREMENT_COLUMN].map(invalid_requirement).astype(bool)
+        if bad_requirement.any():
+            add("errors", SEAT_REQUIREMENT_COLUMN,
+                f"座位要求只能为{'、'.join(SEAT_ZONES)}（可加“尽量”前缀，多项用顿号分隔）", bad_requirement)
+
+    if "每排最多" in df.columns:
+        limits = pd.to_numeric(df["每排最多"], errors="coerce")
+        bad_limit = df["每排最多"].notna() & ~(limits >= 1)
+        if bad_limit.any():
+            add("errors", "每排最多", "每排最多需为≥1的整数", bad_limit)
+    if "同坐" in df.columns or "分开" in df.columns:
+        unknown = roster_constraints(students)["unknown"]
+        if unknown:
+            add("warnings", "同坐/分开", f"约束中的学生不在名单中：{'、'.join(unknown[:10])}（这些约束将被忽略）")
+
+    if seat_count is not None and len(students) > seat_count:
+        add("warnings", "", f"名单共{len(students)}人，超出座位数{seat_count}，"
+                            f"排座时将有{len(students) - seat_count}名学生没有座位")
+    return report
+
+
+def coerce_roster_numbers(students):
+    """校验通过的名单中身高、成绩统一转为float（JSON名单等可能是数字字符串），空成绩保持不变
+
+    排序和比较身高、成绩时不会再遇到数字与字符串混在一起的情况。
+
+    Returns:
+        list: 新的学生记录字典列表
+    """
+    result = []
+    for stu in students:
+        stu = dict(stu)
+        for column in ("身高", "成绩"):
+            value = _float_value(stu.get(column))
+            if value is not None:
+                stu[column] = value
+        result.append(stu)
+    return result
+
+
+def format_roster_report(report, max_rows=8):
+    """把校验报告整理为可以直接显示的文字"""
+    lines = []
+    for level, label in (("errors", "错误"), ("warnings", "提示")):
+        for issue in report[level]:
+            line = f"[{label}] {issue['message']}"
+            rows = issue["rows"]
+            if rows:
+                shown = "、".join(str(row) for row in rows[:max_rows])
+                more = f"等{len(rows)}行" if len(rows) > max_rows else ""
+                line += f"（第{shown}行{more}）"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class ArrangeStrategy:
+    """一种排座策略
+
+    func(students, seat_positions, rng, params)返回学生下标的排列：按seat_positions的顺序，
+    第i个座位安排students[order[i]]，None表示该座位空着；排列可以短于座位数（其余座位为空），
+    超出座位数的部分不安排。
+    randomized: 是否用到随机数（用到时每次排座生成并记录种子，rng为以该种子初始化的random.Random）
+    uses_scores: 结果是否与成绩有关（有关时记录成绩哈希，见describe_arrangement；params["reverse"]表示成绩从高到低）
+    builtin: 是否为内置策略（名称不能被自定义策略占用）
+    in_process: 是否在界面进程中直接计算，默认只有内置策略如此，其余在独立的策略进程中运行
+    version: 自定义策略所在文件内容的哈希，计入排座指纹，修改策略文件后不会沿用旧的排座结果
+    自定义策略只在策略进程中读取和运行，其他进程的注册表中只有它的描述（func为None），见register_worker_strategies
+    """
+
+    __slots__ = ("name", "title", "func", "randomized", "uses_scores", "builtin", "in_process", "source", "version")
+
+    def __init__(self, name, title, func, randomized=True, uses_scores=True, builtin=False, in_process=None,
+                 source=None, version=None):
+        self.name = name
+        self.title = title
+        self.func = func
+        self.randomized = randomized
+        self.uses_scores = uses_scores
+        self.builtin = builtin
+        self.in_process = builtin if in_process is None else in_process
+        self.source = source
+        self.version = version
+
+
+# 排座策略注册表：界面菜单、接口参数和监视模式的--method共用，名称 -> ArrangeStrategy
+ARRANGE_STRATEGIES = OrderedDict()
+# 自定义策略所在的文件夹（程序目录下），每个.py文件可注册一个或多个策略
+STRATEGY_DIR_NAME = "strategies"
+
+
+def register_strategy(name, title=None, randomized=True, uses_scores=True, builtin=False, in_process=None,
+                      source=None, version=None):
+    """注册排座策略的装饰器，策略文件中可直接使用（无需导入）：
+
+        @register_strategy("by_name", "按姓名排序", randomized=False, uses_scores=False)
+        def by_name(students, seat_positions, rng, params):
+            return sorted(range(len(students)), key=lambda i: students[i]["姓名"])
+    """
+    def decorator(func):
+        existing = ARRANGE_STRATEGIES.get(name)
+        if existing is not None and existing.builtin:
+            raise ValueError(f"排座策略名称“{name}”与内置策略重复")
+        ARRANGE_STRATEGIES[name] = ArrangeStrategy(name, title or name, func, randomized, uses_scores, builtin,
+                                                   in_process, source, version)
+        return func
+    return decorator
+
+
+@register_strategy("random", "随机排列", randomized=True, uses_scores=False, builtin=True)
+def _random_strategy(students, seat_positions, rng, params):
+    # 按下标抽样与直接抽样学生记录的结果相同，保证旧的排座指纹仍能重现
+    return rng.sample(range(len(students)), min(len(students), len(seat_positions)))
+
+
+@register_strategy("height", "按身高排序", randomized=False, uses_scores=False, builtin=True)
+def _height_strategy(students, seat_positions, rng, params):
+    return sorted(range(len(students)), key=lambda i: students[i]["身高"])
+
+
+@register_strategy("score", "按成绩排序", randomized=False, uses_scores=True, builtin=True)
+def _score_strategy(students, seat_positions, rng, params):
+    # 成绩为空（读取为NaN）时按0分处理，否则排序结果不确定
+    def score(i):
+        value = students[i].get("成绩", 0)
+        return 0 if pd.isna(value) else value
+    return sorted(range(len(students)), key=score, reverse=params.get("reverse", True))
+
+
+def strategy_plugin_files(plugin_dir):
+    """策略文件夹中的策略文件（按文件名排序，跳过以.或_开头的文件），文件夹不存在时为空列表"""
+    if not os.path.isdir(plugin_dir):
+        return []
+    return [os.path.join(plugin_dir, filename) for filename in sorted(os.listdir(plugin_dir))
+            if filename.endswith(".py") and not filename.startswith((".", "_"))]
+
+
+def load_strategy_plugins(plugin_dir=None):
+    """读取策略文件夹中的.py文件，注册其中的自定义排座策略（重新读取时先移除之前读取的自定义策略）
+
+    策略文件在本进程中执行，文件中直接使用register_strategy；出错的文件跳过。
+    只在策略进程（_strategy_worker_main）中调用：策略文件顶层的死循环或阻塞不会影响界面和服务。
+
+    Returns:
+        list: 读取失败的(文件路径, 错误信息)
+    """
+    plugin_dir = plugin_dir or os.path.join(get_base_dir(), STRATEGY_DIR_NAME)
+    for name in [name for name, strategy in ARRANGE_STRATEGIES.items() if not strategy.builtin]:
+        del ARRANGE_STRATEGIES[name]
+    errors = []
+    for path in strategy_plugin_files(plugin_dir):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+            namespace = {
+                "__name__": "seat_strategy_" + os.path.splitext(os.path.basename(path))[0],
+                "__file__": path,
+                "register_strategy": functools.partial(register_strategy, builtin=False, in_process=False,
+                                                       source=path, version=version)
+            }
+            exec(compile(text, path, "exec"), namespace)
+        except Exception as e:
+            print(f"读取排座策略文件失败：{path}：{type(e).__name__}: {e}")
+            errors.append((path, f"{type(e).__name__}: {e}"))
+    return errors
+
+
+def custom_strategy_infos():
+    """本进程已注册的自定义策略的描述（可跨进程传递）"""
+    return [{"name": s.name, "title": s.title, "randomized": s.randomized, "uses_scores": s.uses_scores,
+             "source": s.source, "version": s.version} for s in ARRANGE_STRATEGIES.values() if not s.builtin]
+
+
+def register_worker_strategies(infos):
+    """按策略进程返回的描述替换注册表中的自定义策略（只有描述，运行时交给策略进程）"""
+    for name in [name for name, strategy in ARRANGE_STRATEGIES.items() if not strategy.builtin]:
+        del ARRANGE_STRATEGIES[name]
+    for info in infos:
+        if info["name"] in ARRANGE_STRATEGIES:
+            continue
+        ARRANGE_STRATEGIES[info["name"]] = ArrangeStrategy(
+            info["name"], info["title"], None, info["randomized"], info["uses_scores"], builtin=False,
+            in_process=False, source=info["source"], version=info.get("version"))
+
+
+def load_custom_strategies(worker, timeout=10.0):
+    """让策略进程读取策略文件夹，把其中的自定义策略登记到本进程（阻塞，最多等待timeout秒）
+
+    Returns:
+        list: 读取失败的(文件路径, 错误信息)；策略进程超时或出错时自定义策略全部不可用
+    """
+    if not strategy_plugin_files(worker.plugin_dir):
+        # 没有策略文件时不启动策略进程
+        register_worker_strategies([])
+        return []
+    try:
+        result = worker.list_strategies(timeout)
+    except RuntimeError as e:
+        register_worker_strategies([])
+        return [(worker.plugin_dir, str(e))]
+    register_worker_strategies(result["strategies"])
+    return result["errors"]
+
+
+def check_arrangement_order(order, student_count, seat_count):
+    """检查策略返回的排列（整数下标或表示空座位的None、不越界、不重复），超出座位数的部分截去
+
+    Returns:
+        list: 学生下标列表
+    """
+    try:
+        order = [None if i is None else operator.index(i) for i in order]
+    except TypeError:
+        raise ValueError("排座策略应返回学生下标（整数）的列表")
+    assigned = [i for i in order if i is not None]
+    if any(i < 0 or i >= student_count for i in assigned):
+        raise ValueError(f"排座策略返回的学生下标超出范围（共{student_count}名学生）")
+    if len(set(assigned)) != len(assigned):
+        raise ValueError("排座策略返回的学生下标有重复")
+    return order[:seat_count]
+
+
+def compute_arrangement_order(students, seat_positions, method="random", rng=None, params=None):
+    """运行排座策略并检查结果
+
+    Returns:
+        list: 学生下标列表，第i个座位安排students[order[i]]（None为空座位）
+    """
+    strategy = ARRANGE_STRATEGIES.get(method)
+    if strategy is None:
+        raise ValueError(f"未知的排座方式：{method}")
+    if strategy.func is None:
+        raise RuntimeError(f"自定义排座策略“{strategy.title}”只能在策略进程中运行")
+    order = strategy.func(students, seat_positions, rng or random, params or {})
+    return check_arrangement_order(order, len(students), len(seat_positions))
+
+
+def seat_data_from_order(students, seat_positions, order):
+    """按学生下标列表生成座位数据字典，没有安排学生的座位为空"""
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in seat_positions}
+    for pos, index in zip(seat_positions, order):
+        if index is None:
+            continue
+        stu = students[index]
+        seat_data[pos] = {"name": stu["姓名"], "gender": stu["性别"]}
+    return seat_data
+
+
+def arrange_seats(students, seat_positions, method="random", reverse=True, rng=None):
+    """按指定方式为学生分配座位，超出座位数的学生不安排
+
+    Args:
+        students: 学生记录字典列表
+        seat_positions: 座位坐标列表
+        method: 排座策略名称（见ARRANGE_STRATEGIES），内置random（随机）、height（按身高）、score（按成绩）
+        reverse: 按成绩排序时是否从高到低
+        rng: random.Random实例，默认使用全局随机数
+
+    Returns:
+        dict: 座位数据字典
+    """
+    order = compute_arrangement_order(students, seat_positions, method, rng, {"reverse": bool(reverse)})
+    return seat_data_from_order(students, seat_positions, order)
+
+
+# ---------------------- 最优分配排座 ----------------------
+# 名单中可选的“座位要求”列：多项用顿号、逗号或空格分隔，加“尽量”前缀表示尽量满足（如“尽量前排”）
+SEAT_REQUIREMENT_COLUMN = "座位要求"
+# 前排：离讲台最近的几排主体座位（讲台两侧座位也算前排）；后排：主体座位最后一排；过道：主体座位每排最左、最右的座位
+SEAT_ZONES = ("前排", "后排", "过道")
+SOLVER_FRONT_ROWS = 2
+# 代价权重：必须满足的要求远大于其余各项之和，无法全部满足时尽量少违反
+SOLVER_HARD_COST = 1e6
+SOLVER_SOFT_COST = 10.0
+SOLVER_HEIGHT_WEIGHT = 4.0
+SOLVER_FRONT_WEIGHT = 0.5
+
+
+def parse_seat_requirements(value):
+    """解析一名学生的座位要求
+
+    Returns:
+        tuple: (必须满足的区域集合, 尽量满足的区域集合)，含未知区域时抛出ValueError
+    """
+    hard, soft = set(), set()
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return hard, soft
+    for token in re.split(r"[、,，;；/\s]+", str(value).strip()):
+        if not token:
+            continue
+        zone, target = (token[2:], soft) if token.startswith("尽量") else (token, hard)
+        if zone not in SEAT_ZONES:
+            raise ValueError(f"未知的座位要求：{token}（可用：{'、'.join(SEAT_ZONES)}，可加“尽量”前缀）")
+        target.add(zone)
+    return hard, soft
+
+
+def podium_seat_mask(seat_positions):
+    """讲台侧座位的布尔数组
+
+    build_seat_positions中讲台侧座位位于主体座位前面的讲台行（行号最大），讲台本身占两格不是座位，
+    因此讲台行的列与主体座位各排（列连续且相同）一定不同，据此区分讲台行与第一排。
+    """
+    pos = np.asarray(seat_positions, dtype=np.int64).reshape(-1, 2)
+    rows, cols = pos[:, 0], pos[:, 1]
+    if not len(pos) or rows.max() == rows.min():
+        return np.zeros(len(pos), dtype=bool)
+    top = rows == rows.max()
+    if set(cols[top].tolist()) == set(cols[rows == rows.min()].tolist()):
+        return np.zeros(len(pos), dtype=bool)
+    return top
+
+
+def seat_zone_masks(seat_positions):
+    """按座位坐标计算各区域的布尔数组，以及每个座位离讲台的远近（0为最前，1为最后）
+
+    前后位置和过道只按主体座位网格计算；讲台侧座位算前排、远近为0，不算过道和后排。
+    """
+    pos = np.asarray(seat_positions, dtype=np.int64).reshape(-1, 2)
+    if not len(pos):
+        empty = np.zeros(0, dtype=bool)
+        return {zone: empty for zone in SEAT_ZONES}, np.zeros(0)
+    rows, cols = pos[:, 0], pos[:, 1]
+    podium = podium_seat_mask(seat_positions)
+    main = ~podium
+    # 行号越大离讲台越近：主体座位第一排（讲台行之前的一排）深度为0
+    front_row, back_row = rows[main].max(), rows[main].min()
+    depth = np.where(main, front_row - rows, 0)
+    first_col, last_col = cols[main].min(), cols[main].max()
+    masks = {
+        "前排": podium | (main & (depth < SOLVER_FRONT_ROWS)),
+        "后排": main & (rows == back_row),
+        "过道": main & ((cols == first_col) | (cols == last_col))
+    }
+    return masks, depth / max(int(front_row - back_row), 1)
+
+
+def seat_cost_matrix(students, seat_positions):
+    """学生×座位的代价矩阵（numpy向量化计算）
+
+    代价由三部分组成：座位要求（未满足时加必须/尽量的惩罚），身高视线（身高名次与前后位置的差距，
+    高个子坐后面），以及靠前的轻微偏好（人数少于座位时空位留在后排）。
+
+    Returns:
+        tuple: (代价矩阵, 每名学生是否有必须满足的要求)
+    """
+    n = len(students)
+    masks, depth = seat_zone_masks(seat_positions)
+    heights = pd.to_numeric(pd.Series([stu.get("身高") for stu in students], dtype=object), errors="coerce")
+    heights = heights.fillna(heights.median() if heights.notna().any() else 0)
+    # 身高名次归一化到0～1（同样身高名次相同），与座位前后位置比较
+    rank = heights.rank(method="average").to_numpy(dtype=float) - 1
+    z = rank / max(n - 1, 1)
+    cost = SOLVER_HEIGHT_WEIGHT * (z[:, None] - depth[None, :]) ** 2 + SOLVER_FRONT_WEIGHT * depth[None, :]
+
+    has_hard = np.zeros(n, dtype=bool)
+    requirements = [parse_seat_requirements(stu.get(SEAT_REQUIREMENT_COLUMN)) for stu in students]
+    for zone, seat_mask in masks.items():
+        hard = np.fromiter((zone in req[0] for req in requirements), dtype=bool, count=n)
+        soft = np.fromiter((zone in req[1] for req in requirements), dtype=bool, count=n)
+        if hard.any() or soft.any():
+            outside = ~seat_mask[None, :]
+            cost += SOLVER_HARD_COST * (hard[:, None] & outside) + SOLVER_SOFT_COST * (soft[:, None] & outside)
+            has_hard |= hard
+    return cost, has_hard
+
+
+def _hungarian(cost):
+    """最小代价分配的numpy实现，要求行数≤列数
+
+    先做行归约并把每行贪心分配到代价最小的空闲列，其余各行用最短增广路（Dijkstra）逐行加入；
+    对偶变量在每次增广结束后统一调整，内层每一步只对整行做几次向量运算。
+
+    Returns:
+        np.ndarray: 每行分配到的列
+    """
+    n, m = cost.shape
+    # 行归约后v为0，每行最小代价的列若空闲即可直接分配（对偶可行、分配边紧）
+    u = cost.min(axis=1)
+    v = np.zeros(m)
+    col4row = np.full(n, -1, dtype=np.int64)
+    row4col = np.full(m, -1, dtype=np.int64)
+    for i, j in enumerate(np.argmin(cost, axis=1).tolist()):
+        if row4col[j] < 0:
+            row4col[j] = i
+            col4row[i] = j
+    for start in np.flatnonzero(col4row < 0).tolist():
+        dist = np.full(m, np.inf)
+        pred = np.zeros(m, dtype=np.int64)
+        scanned = np.zeros(m, dtype=bool)
+        path_rows = []
+        i, shortest = start, 0.0
+        while True:
+            reduced = shortest + cost[i] - u[i] - v
+            better = (reduced < dist) & ~scanned
+            dist[better] = reduced[better]
+            pred[better] = i
+            candidates = np.where(scanned, np.inf, dist)
+            j = int(np.argmin(candidates))
+            shortest = candidates[j]
+            scanned[j] = True
+            if row4col[j] < 0:
+                break
+            i = int(row4col[j])
+            path_rows.append(i)
+        # 调整对偶变量，保持可行且增广路上的边都是紧的
+        u[start] += shortest
+        for row in path_rows:
+            u[row] += shortest - dist[col4row[row]]
+        v[scanned] -= shortest - dist[scanned]
+        # 沿增广路翻转匹配
+        while True:
+            i = int(pred[j])
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == start:
+                break
+    return col4row
+
+
+def solve_assignment(cost):
+    """求解最小代价分配（行、列数可以不同）
+
+    Returns:
+        tuple: (行下标数组, 列下标数组)，按行排序，共min(行数, 列数)对
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if scipy_available:
+        return linear_sum_assignment(cost)
+    if cost.shape[0] <= cost.shape[1]:
+        return np.arange(cost.shape[0]), _hungarian(cost)
+    # 行多于列时转置求解
+    cols = _hungarian(cost.T)
+    rows = np.argsort(cols)
+    return cols[rows], rows
+
+
+@register_strategy("optimal", "最优分配（座位要求+身高）", randomized=False, uses_scores=False, builtin=True,
+                   in_process=False)
+def _optimal_strategy(students, seat_positions, rng, params):
+    """把座位要求和身高视线写成代价矩阵，求总代价最小的分配；人数多于座位时优先安排有座位要求的学生"""
+    if not students or not seat_positions:
+        return []
+    cost, has_hard = seat_cost_matrix(students, seat_positions)
+    extra = len(students) - len(seat_positions)
+    if extra > 0:
+        # 补上“不安排座位”的虚拟座位：有必须满足的要求的学生不安排座位时代价很大
+        no_seat = np.where(has_hard, SOLVER_HARD_COST, 0.0)
+        cost = np.hstack([cost, np.repeat(no_seat[:, None], extra, axis=1)])
+    rows, cols = solve_assignment(cost)
+    order = [None] * len(seat_positions)
+    for student, seat in zip(rows.tolist(), cols.tolist()):
+        if seat < len(seat_positions):
+            order[seat] = student
+    return order
+
+
+def unmet_seat_requirements(students, seat_positions, seat_data):
+    """检查座位表中未满足座位要求的学生（按姓名对应座位）
+
+    Returns:
+        list: (姓名, 未满足的必须要求列表)，没有座位的学生也算未满足
+    """
+    masks, _ = seat_zone_masks(seat_positions)
+    index = {pos: i for i, pos in enumerate(seat_positions)}
+    seat_of = {entry["name"]: pos for pos, entry in seat_data.items() if entry["name"] != "空"}
+    unmet = []
+    for stu in students:
+        hard, _ = parse_seat_requirements(stu.get(SEAT_REQUIREMENT_COLUMN))
+        if not hard:
+            continue
+        pos = seat_of.get(stu["姓名"])
+        missing = sorted(hard) if pos is None else sorted(zone for zone in hard if not masks[zone][index[pos]])
+        if missing:
+            unmet.append((stu["姓名"], missing))
+    return unmet
+
+
+def _strategy_worker_main(conn, plugin_dir):
+    """策略进程入口：读取自定义策略后循环处理请求
+
+    请求为("list",)（返回自定义策略的描述和读取错误）或("arrange", 策略名称, 学生, 座位, 种子, 参数, 策略版本)
+    （返回学生下标列表；策略版本不为None且与本进程读取的策略文件不同时报错），结果为("ok", 内容)或("error", 说明)。
+    """
+    errors = load_strategy_plugins(plugin_dir)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            if request[0] == "list":
+                result = ("ok", {"strategies": custom_strategy_infos(), "errors": errors})
+            else:
+                _, method, students, seat_positions, seed, params, version = request
+                strategy = ARRANGE_STRATEGIES.get(method)
+                if version is not None and (strategy is None or strategy.version != version):
+                    # 进程重新启动时读取了修改后的策略文件，与请求方记录的版本不同
+                    raise RuntimeError("策略文件已修改，请先重新读取自定义策略")
+                order = compute_arrangement_order(students, seat_positions, method, random.Random(seed), params)
+                result = ("ok", order)
+        except Exception as e:
+            result = ("error", f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+
+class StrategyWorker:
+    """在独立进程中读取和运行排座策略（自定义策略和耗时的内置策略）
+
+    界面轮询结果（submit/submit_list + poll），接口服务和监视模式阻塞等待（run/list_strategies）。
+    进程第一次使用时启动并读取策略文件夹，之后常驻复用；超时或取消时直接结束进程，
+    下次使用时重新启动，因此策略文件中的死循环或很慢的策略不会让界面、服务卡住。
+    """
+
+    def __init__(self, plugin_dir=None):
+        self.plugin_dir = plugin_dir or os.path.join(get_base_dir(), STRATEGY_DIR_NAME)
+        # spawn：不复制界面进程（Tk、数据库连接、线程），各平台行为一致
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._deadline = None
+        # 正在运行的请求类型（"list"或"arrange"），只在busy时有意义
+        self._request = None
+        # 阻塞调用可能来自多个工作线程，同一时间只运行一个请求
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self):
+        return self._deadline is not None
+
+    @property
+    def listing(self):
+        """是否正在读取策略文件夹（读取完成前提交的排座可以等待，而不是直接拒绝）"""
+        return self.busy and self._request == "list"
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self.stop()
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_strategy_worker_main, args=(child_conn, self.plugin_dir), name="排座策略", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def submit(self, method, students, seat_positions, seed=None, params=None, timeout=10.0, version=None):
+        """提交一次排座（同一时间只能运行一个），timeout秒内没有结果时poll返回超时错误
+
+        version: 请求方登记的策略版本（ArrangeStrategy.version），与策略进程中的不同时返回错误
+        """
+        self._send(("arrange", method, list(students), list(seat_positions), seed, dict(params or {}), version),
+                   timeout)
+
+    def submit_list(self, timeout=10.0):
+        """请求自定义策略的描述，poll的结果为{"strategies": [...], "errors": [(文件路径, 错误信息), ...]}"""
+        self._send(("list",), timeout)
+
+    def _send(self, request, timeout):
+        if self.busy:
+            raise RuntimeError("上一个排座策略仍在运行")
+        self._ensure_process()
+        self._conn.send(request)
+        self._request = request[0]
+        self._deadline = time.monotonic() + timeout
+
+    def wait(self):
+        """阻塞等待已提交请求的结果（最多到超时），返回值同poll"""
+        while self.busy:
+            result = self.poll()
+            if result is not None:
+                return result
+            # 定期醒来检查进程是否退出
+            self._conn.poll(min(max(self._deadline - time.monotonic(), 0.0), 0.5))
+        return None
+
+    def _call(self, request, timeout):
+        with self._lock:
+            self._send(request, timeout)
+            status, value = self.wait()
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    def run(self, method, students, seat_positions, seed=None, params=None, timeout=10.0, version=None):
+        """阻塞运行一次排座（可在多个线程中调用），version同submit
+
+        Returns:
+            list: 学生下标列表
+
+        Raises:
+            RuntimeError: 策略出错、超时或策略进程意外退出
+        """
+        return self._call(("arrange", method, list(students), list(seat_positions), seed, dict(params or {}),
+                           version), timeout)
+
+    def list_strategies(self, timeout=10.0):
+        """阻塞读取自定义策略的描述，返回值见submit_list，出错或超时时抛出RuntimeError"""
+        return self._call(("list",), timeout)
+
+    def poll(self):
+        """查询结果
+
+        Returns:
+            None: 仍在运行（或没有提交任务）
+            tuple: ("ok", 下标列表)或("error", 说明)
+        """
+        if not self.busy:
+            return None
+        try:
+            if self._conn.poll():
+                result = self._conn.recv()
+                self._deadline = None
+                return result
+        except (EOFError, OSError):
+            self.stop()
+            return ("error", "策略进程意外退出")
+        if not self._process.is_alive():
+            exitcode = self._process.exitcode
+            self.stop()
+            return ("error", f"策略进程意外退出（退出码{exitcode}）")
+        if time.monotonic() > self._deadline:
+            self.stop()
+            return ("error", "策略进程运行超时，已终止")
+        return None
+
+    def cancel(self):
+        """取消正在运行的排座（结束策略进程）"""
+        if self.busy:
+            self.stop()
+
+    def stop(self):
+        """结束策略进程，下次提交时重新启动（重新读取策略文件夹）"""
+        self._deadline = None
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process.join(1)
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# 排座结果缓存：指纹相同的请求直接返回已有结果，超过上限时淘汰最久未使用的
+ARRANGEMENT_CACHE_SIZE = 64
+_arrangement_cache = OrderedDict()
+_arrangement_cache_lock = threading.Lock()
+
+
+def _hash_number(value):
+    return float(value) if value is not None and pd.notna(value) else None
+
+
+def roster_hash(students):
+    """名单内容的哈希（顺序有关：随机排列的结果取决于名单顺序）
+
+    只取保存文件中也有的姓名、性别、身高，有座位要求时加上座位要求，保存后重新读取的名单得到相同的哈希。
+    """
+    rows = []
+    for stu in students:
+        row = [str(stu.get("姓名", "")), str(stu.get("性别", "")), _hash_number(stu.get("身高"))]
+        requirement = stu.get(SEAT_REQUIREMENT_COLUMN)
+        if isinstance(requirement, str) and requirement.strip():
+            row.append(requirement.strip())
+        rows.append(row)
+    content = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def scores_hash(students):
+    """按名单顺序的成绩哈希（成绩不写入保存文件，因此单独记录，不计入排座指纹）"""
+    content = json.dumps([_hash_number(stu.get("成绩")) for stu in students], separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def describe_arrangement(students, layout_config, method, reverse=True, seed=None):
+    """生成一次排座的来源记录，fingerprint由名单哈希、布局、排座方式、参数、随机种子和自定义策略版本共同决定
+
+    fingerprint只依赖保存文件中也有的数据，读取存档后仍可核对；结果与成绩有关的策略另外记录scores_hash，
+    重现这类排座需要重新导入含成绩的同一名单。
+
+    Returns:
+        dict: fingerprint、roster_hash、layout、method、params、seed（自定义策略另有version，
+              与成绩有关的策略另有scores_hash），可直接写入保存文件
+    """
+    # 已不存在的自定义策略按最保守的方式处理：成绩和种子都计入记录
+    strategy = ARRANGE_STRATEGIES.get(method)
+    randomized = strategy.randomized if strategy is not None else True
+    uses_scores = strategy.uses_scores if strategy is not None else True
+    record = {
+        "roster_hash": roster_hash(students),
+        "layout": {key: int(layout_config[key]) for key in ("podium_seats", "main_rows", "main_cols")},
+        "method": method,
+        "params": {"reverse": bool(reverse)} if uses_scores else {},
+        # 只有用到随机数的策略记录种子
+        "seed": seed if randomized else None
+    }
+    if strategy is not None and strategy.version is not None:
+        record["version"] = strategy.version
+    content = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    record["fingerprint"] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if uses_scores:
+        record["scores_hash"] = scores_hash(students)
+    return record
+
+
+def arrangement_cache_key(record):
+    """排座结果缓存的键：指纹加上成绩哈希（指纹不含成绩，成绩不同的名单不能共用结果）"""
+    return record["fingerprint"] + record.get("scores_hash", "")
+
+
+def arrangement_cache_get(record):
+    """按来源记录取缓存的排座结果（副本），没有时返回None"""
+    key = arrangement_cache_key(record)
+    with _arrangement_cache_lock:
+        cached = _arrangement_cache.get(key)
+        if cached is None:
+            return None
+        _arrangement_cache.move_to_end(key)
+        return dict(cached)
+
+
+def arrangement_cache_put(record, seat_data):
+    """缓存一次排座结果，超过上限时淘汰最久未使用的"""
+    with _arrangement_cache_lock:
+        _arrangement_cache[arrangement_cache_key(record)] = seat_data
+        while len(_arrangement_cache) > ARRANGEMENT_CACHE_SIZE:
+            _arrangement_cache.popitem(last=False)
+
+
+def run_arrangement(students, seat_positions, layout_config, method="random", reverse=True, seed=None,
+                    worker=None, timeout=10.0):
+    """可复现的排座：用到随机数的策略未指定种子时生成一个并记录下来，相同指纹的结果从缓存返回
+
+    内置策略在当前线程中运行，自定义策略交给worker（StrategyWorker）在策略进程中运行，最多等待timeout秒；
+    界面中in_process为False的内置策略也由界面交给策略进程，不经过这里。
+
+    Returns:
+        tuple: (座位数据字典, 来源记录)
+
+    Raises:
+        ValueError: 未知的排座方式
+        RuntimeError: 自定义策略出错、超时，或没有提供worker
+    """
+    strategy = ARRANGE_STRATEGIES.get(method)
+    if strategy is None:
+        raise ValueError(f"未知的排座方式：{method}")
+    if strategy.randomized and seed is None:
+        seed = random.getrandbits(32)
+    record = describe_arrangement(students, layout_config, method, reverse, seed)
+    cached = arrangement_cache_get(record)
+    if cached is not None:
+        return cached, record
+    if strategy.builtin:
+        rng = random.Random(seed) if strategy.randomized else None
+        seat_data = arrange_seats(students, seat_positions, method, reverse, rng)
+    else:
+        if worker is None:
+            raise RuntimeError(f"自定义排座策略“{strategy.title}”需要在策略进程中运行")
+        order = worker.run(method, students, seat_positions, seed, {"reverse": bool(reverse)}, timeout,
+                           strategy.version)
+        seat_data = seat_data_from_order(students, seat_positions, order)
+    arrangement_cache_put(record, seat_data)
+    return dict(seat_data), record
+
+
+def build_save_payload(layout_config, seat_data, seat_index_map, students, arrangement=None):
+    """生成保存到JSON文件的数据结构（成绩不落盘）
+
+    Args:
+        arrangement: 排座来源记录（见describe_arrangement），有则一并保存
+    """
+    students_without_scores = [{key: value for key, value in student.items() if key != "成绩"} for student in students]
+    payload = {
+        "layout_config": layout_config,
+        "seat_data": {str(pos): data for pos, data in seat_data.items()},
+        "seat_index_map": {str(pos): idx for pos, idx in seat_index_map.items()},
+        "students": students_without_scores
+    }
+    if arrangement is not None:
+        payload["arrangement"] = arrangement
+    return payload
+
+
+def score_arrangement(seat_data, height_map, layout_config):
+    """评价一种座位安排，各项数值越小越好
+
+    Args:
+        seat_data: 座位数据字典
+        height_map: 姓名到身高的映射
+        layout_config: 布局配置字典（讲台侧座位不挡主体座位的视线）
+
+    Returns:
+        dict: sightline（前排比后排高的相邻座位对数）、same_gender（左右相邻同性别的座位对数）、
+              occlusion（整列视线遮挡总量，单位cm，见sightline_occlusion）、
+              total（综合得分，视线遮挡权重更高，遮挡每5cm计1分）
+    """
+    sightline = 0
+    same_gender = 0
+    front_row = layout_config["main_rows"]
+    for (r, c), data in seat_data.items():
+        # 行号越大越靠前（讲台在最下方），检查正前方的座位；第一排前方是讲台行，不计
+        if r < front_row:
+            sightline += _blocks_sight(data, seat_data.get((r + 1, c)), height_map)
+        same_gender += _same_gender(data, seat_data.get((r, c + 1)))
+    occlusion = sum(sightline_occlusion(seat_data, height_map, layout_config).values())
+    return {
+        "sightline": sightline,
+        "same_gender": same_gender,
+        "occlusion": occlusion,
+        "total": sightline * 3 + same_gender + occlusion / 5
+    }
+
+
+def sightline_occlusion(seat_data, height_map, layout_config):
+    """按列计算每个座位的视线遮挡量
+
+    同一列中坐在前面（更靠近讲台）的学生里最高的那位比本人高出多少厘米，即为本人的遮挡量。
+    整个座位网格一次性用按列累积最大值计算，不逐对比较。
+    只计算主体座位：讲台侧座位不在任何学生看黑板的视线上，既不遮挡别人也不计遮挡量。
+
+    Args:
+        seat_data: 座位数据字典
+        height_map: 姓名到身高的映射
+        layout_config: 布局配置字典
+
+    Returns:
+        dict: 有身高数据的主体座位学生的座位坐标到遮挡量（cm，未被遮挡为0）的映射
+    """
+    front_row = layout_config["main_rows"]
+    occupied = []
+    heights = []
+    for pos, data in seat_data.items():
+        if data["name"] == "空" or pos[0] > front_row:
+            continue
+        height = height_map.get(data["name"])
+        if height is not None and pd.notna(height):
+            occupied.append(pos)
+            heights.append(float(height))
+    if not occupied:
+        return {}
+    coords = np.array(occupied)
+    heights = np.array(heights)
+    # 行号越大越靠前：翻转行号使第0行为第一排，空座位记为-inf不遮挡
+    row_index = front_row - coords[:, 0]
+    col_index = coords[:, 1] - coords[:, 1].min()
+    grid = np.full((row_index.max() + 1, col_index.max() + 1), -np.inf)
+    grid[row_index, col_index] = heights
+    # 每个座位前方（不含本人）所有座位的最高身高
+    front_max = np.empty_like(grid)
+    front_max[0] = -np.inf
+    front_max[1:] = np.maximum.accumulate(grid, axis=0)[:-1]
+    occlusion = np.clip(front_max[row_index, col_index] - heights, 0, None)
+    return dict(zip(occupied, occlusion.tolist()))
+
+
+def _blocks_sight(back, front, height_map):
+    """前排学生比正后方的学生高时返回1"""
+    if front is None or back["name"] == "空" or front["name"] == "空":
+        return 0
+    height = height_map.get(back["name"])
+    front_height = height_map.get(front["name"])
+    return int(height is not None and front_height is not None and front_height > height)
+
+
+def _same_gender(left, right):
+    """左右相邻的两个座位坐着同性别学生时返回1"""
+    if right is None or left["name"] == "空" or right["name"] == "空":
+        return 0
+    return int(left["gender"] == right["gender"])
+
+
+class ArrangementMetrics:
+    """座位安排质量指标，座位变化时只重新计算变化座位相邻的座位对
+
+    指标：视线遮挡（前排比正后方高）、同性别左右相邻对数、前后左右四个区域的平均成绩。
+    区域按主体座位网格划分，讲台侧座位不属于任何区域，也不挡第一排的视线。
+    """
+
+    # 区域名称，按(前/后, 左/右)编号
+    REGION_NAMES = ("后排左侧", "后排右侧", "前排左侧", "前排右侧")
+
+    def __init__(self, layout_config, seat_data, height_map, score_map):
+        self.height_map = height_map
+        self.score_map = score_map
+        main_cols = layout_config["main_cols"]
+        self.front_row = layout_config["main_rows"]
+        self.half_row = self.front_row / 2
+        # 主体座位第一列的列号（与build_seat_positions一致），区域按相对列号划分
+        self.start_col = (max(main_cols, 4) - main_cols) // 2
+        self.half_col = main_cols / 2
+        self.seats = dict(seat_data)
+        self.sightline = 0
+        self.same_gender = 0
+        self.region_sum = [0.0] * len(self.REGION_NAMES)
+        self.region_count = [0] * len(self.REGION_NAMES)
+        for (r, c), data in self.seats.items():
+            if r < self.front_row:
+                self.sightline += _blocks_sight(data, self.seats.get((r + 1, c)), height_map)
+            self.same_gender += _same_gender(data, self.seats.get((r, c + 1)))
+            self._add_score((r, c), data, 1)
+
+    def _region(self, pos):
+        """座位所属区域的编号，讲台侧座位返回None"""
+        r, c = pos
+        if r > self.front_row:
+            return None
+        return (2 if r > self.half_row else 0) + (1 if c - self.start_col >= self.half_col else 0)
+
+    def _add_score(self, pos, data, sign):
+        region = self._region(pos)
+        if region is None:
+            return
+        score = self.score_map.get(data["name"])
+        if score is not None:
+            self.region_sum[region] += sign * score
+            self.region_count[region] += sign
+
+    def _pairs(self, positions):
+        """与给定座位相关的全部座位对（前后对和左右对），每对只出现一次"""
+        vertical = set()
+        horizontal = set()
+        for r, c in positions:
+            vertical.add((r, c))
+            vertical.add((r - 1, c))
+            horizontal.add((r, c))
+            horizontal.add((r, c - 1))
+        return vertical, horizontal
+
+    def _pair_total(self, vertical, horizontal):
+        sightline = 0
+        same_gender = 0
+        for r, c in vertical:
+            back = self.seats.get((r, c))
+            if back is not None and r < self.front_row:
+                sightline += _blocks_sight(back, self.seats.get((r + 1, c)), self.height_map)
+        for r, c in horizontal:
+            left = self.seats.get((r, c))
+            if left is not None:
+                same_gender += _same_gender(left, self.seats.get((r, c + 1)))
+        return sightline, same_gender
+
+    def update(self, positions, seat_data):
+        """按座位数据的最新内容更新指标，代价只与变化的座位数有关
+
+        Args:
+            positions: 可能发生变化的座位坐标
+            seat_data: 最新的座位数据字典
+        """
+        changed = [pos for pos in positions if pos in seat_data and seat_data[pos] is not self.seats.get(pos)]
+        if not changed:
+            return
+        vertical, horizontal = self._pairs(changed)
+        old_sightline, old_same_gender = self._pair_total(vertical, horizontal)
+        for pos in changed:
+            if pos in self.seats:
+                self._add_score(pos, self.seats[pos], -1)
+            self.seats[pos] = seat_data[pos]
+            self._add_score(pos, self.seats[pos], 1)
+        new_sightline, new_same_gender = self._pair_total(vertical, horizontal)
+        self.sightline += new_sightline - old_sightline
+        self.same_gender += new_same_gender - old_same_gender
+
+    def region_averages(self):
+        """各区域的平均成绩，没有成绩数据的区域为None"""
+        return [total / count if count else None for total, count in zip(self.region_sum, self.region_count)]
+
+    def score_spread(self):
+        """各区域平均成绩的最大差值，没有成绩数据时为None"""
+        averages = [avg for avg in self.region_averages() if avg is not None]
+        return max(averages) - min(averages) if averages else None
+
+
+# ---------------------- 座位约束 ----------------------
+# 名单中可选的约束列：同坐、分开填写姓名（多人用顿号分隔），分组填写组名，每排最多填写该组每排的人数上限
+CONSTRAINT_COLUMNS = ("同坐", "分开", "分组", "每排最多")
+
+
+def split_names(value):
+    """拆分单元格中用顿号、逗号或空格分隔的多个姓名，空单元格返回空列表"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return []
+    return [name for name in re.split(r"[、,，;；/\s]+", str(value).strip()) if name]
+
+
+class UnionFind:
+    """按姓名的并查集，用于把“同坐”关系合并为组（A与B同坐、B与C同坐时A、B、C为一组）"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, name):
+        parent = self.parent
+        parent.setdefault(name, name)
+        while parent[name] != name:
+            # 路径减半
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self):
+        """各组的成员列表（按首次出现的顺序），只有一人的组不返回"""
+        groups = OrderedDict()
+        for name in self.parent:
+            groups.setdefault(self.find(name), []).append(name)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+def roster_constraints(students):
+    """从名单的约束列读出座位约束
+
+    Returns:
+        dict: together（同坐的组，每组为姓名列表）、apart（需分开的姓名对列表）、
+              row_limits（{组名: (每排上限, 成员列表)}）、unknown（约束中出现但名单中没有的姓名）
+    """
+    names = {str(stu.get("姓名", "")) for stu in students}
+    together = UnionFind()
+    apart = OrderedDict()
+    members = OrderedDict()
+    limits = {}
+    unknown = []
+    for stu in students:
+        name = str(stu.get("姓名", ""))
+        for other in split_names(stu.get("同坐")):
+            together.union(name, other)
+        for other in split_names(stu.get("分开")):
+            if other != name:
+                apart[tuple(sorted((name, other)))] = True
+        for other in split_names(stu.get("同坐")) + split_names(stu.get("分开")):
+            if other not in names and other not in unknown:
+                unknown.append(other)
+        group = stu.get("分组")
+        if group is not None and not (not isinstance(group, str) and pd.isna(group)) and str(group).strip():
+            group = str(group).strip()
+            members.setdefault(group, []).append(name)
+            limit = pd.to_numeric(stu.get("每排最多"), errors="coerce")
+            if pd.notna(limit):
+                limits[group] = min(int(limit), limits.get(group, int(limit)))
+    # 名单中没有的学生（如已转学）不参与约束
+    groups = [[name for name in group if name in names] for group in together.groups()]
+    return {
+        "together": [group for group in groups if len(group) > 1],
+        "apart": [list(pair) for pair in apart if pair[0] in names and pair[1] in names],
+        "row_limits": {group: (limits[group], members[group]) for group in members if group in limits},
+        "unknown": unknown
+    }
+
+
+def format_constraint_text(constraints):
+    """把约束写成可编辑的文字，每行一条（见parse_constraint_text）"""
+    lines = [f"同坐：{'、'.join(group)}" for group in constraints["together"]]
+    lines += [f"分开：{'、'.join(pair)}" for pair in constraints["apart"]]
+    lines += [f"{group}（每排最多{limit}人）：{'、'.join(names)}"
+              for group, (limit, names) in constraints["row_limits"].items()]
+    return "\n".join(lines)
+
+
+def parse_constraint_text(text):
+    """解析约束文字，每行一条：
+
+        同坐：张三、李四            这些学生坐在同一排且左右相邻
+        分开：王五、赵六、孙七      这些学生两两不相邻（前后左右及斜对角）
+        一组（每排最多2人）：…      列出的学生每排最多2人
+
+    Returns:
+        dict: 与roster_constraints相同的结构（不含unknown），格式有误时抛出ValueError
+    """
+    together = UnionFind()
+    apart = OrderedDict()
+    row_limits = OrderedDict()
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        head, sep, body = line.replace(":", "：").partition("：")
+        names = split_names(body)
+        if not sep or not names:
+            raise ValueError(f"第{line_no}行格式有误：{line}")
+        if head == "同坐":
+            if len(names) < 2:
+                raise ValueError(f"第{line_no}行：同坐至少需要两名学生")
+            for other in names[1:]:
+                together.union(names[0], other)
+        elif head == "分开":
+            if len(names) < 2:
+                raise ValueError(f"第{line_no}行：分开至少需要两名学生")
+            for i, a in enumerate(names):
+                for b in names[i + 1:]:
+                    apart[tuple(sorted((a, b)))] = True
+        else:
+            match = re.fullmatch(r"(.+?)[（(]每排最多(\d+)人[)）]", head)
+            if match is None:
+                raise ValueError(f"第{line_no}行应以“同坐”“分开”或“组名（每排最多N人）”开头：{line}")
+            group, limit = match.group(1).strip(), int(match.group(2))
+            if limit < 1:
+                raise ValueError(f"第{line_no}行：每排最多人数需≥1")
+            row_limits[group] = (limit, names)
+    return {"together": together.groups(), "apart": [list(pair) for pair in apart], "row_limits": row_limits}
+
+
+def apply_constraints_to_students(students, constraints):
+    """把约束写回名单的约束列，返回新的学生记录列表（原记录不修改）"""
+    fields = {str(stu["姓名"]): {} for stu in students}
+
+    def add_names(name, column, others):
+        if name in fields:
+            existing = split_names(fields[name].get(column))
+            fields[name][column] = "、".join(existing + [other for other in others if other not in existing])
+
+    for group in constraints["together"]:
+        for name in group:
+            add_names(name, "同坐", [other for other in group if other != name])
+    for a, b in constraints["apart"]:
+        add_names(a, "分开", [b])
+        add_names(b, "分开", [a])
+    for group, (limit, names) in constraints["row_limits"].items():
+        for name in names:
+            if name in fields:
+                fields[name].update({"分组": group, "每排最多": limit})
+    result = []
+    for stu in students:
+        record = {key: value for key, value in stu.items() if key not in CONSTRAINT_COLUMNS}
+        record.update(fields.get(str(stu["姓名"]), {}))
+        result.append(record)
+    return result
+
+
+class SeatConstraints:
+    """座位约束检查：同坐用并查集合并成组，分开用座位邻接位集，每排人数上限按排计数
+
+    座位邻接关系预先算成整数位集（near：前后左右及斜对角，beside：同排左右），检查两人是否相邻只需一次位运算；
+    调换两个座位是否产生新的冲突只检查与这两名学生有关的约束，代价与班级人数无关。
+    """
+
+    def __init__(self, constraints, layout_config, seat_positions, seat_data):
+        self.main_rows = layout_config["main_rows"]
+        self.positions = list(seat_positions)
+        self.index = {pos: i for i, pos in enumerate(self.positions)}
+        self.near = [0] * len(self.positions)
+        self.beside = [0] * len(self.positions)
+        for i, (r, c) in enumerate(self.positions):
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    j = self.index.get((r + dr, c + dc))
+                    if j is None or j == i:
+                        continue
+                    self.near[i] |= 1 << j
+                    if dr == 0:
+                        self.beside[i] |= 1 << j
+
+        self.groups = [list(group) for group in constraints["together"]]
+        self.group_of = {name: g for g, group in enumerate(self.groups) for name in group}
+        self.apart = {}
+        for a, b in constraints["apart"]:
+            self.apart.setdefault(a, set()).add(b)
+            self.apart.setdefault(b, set()).add(a)
+        self.limits = [(group, limit) for group, (limit, _) in constraints["row_limits"].items()]
+        self.limits_of = {}
+        for k, (_, names) in enumerate(constraints["row_limits"].values()):
+            for name in names:
+                self.limits_of.setdefault(name, []).append(k)
+        # 参与约束的学生，其余学生移动时不需要检查
+        self.tracked = set(self.group_of) | set(self.apart) | set(self.limits_of)
+
+        self.occupant = [None] * len(self.positions)
+        self.seat_of = {}
+        self.row_counts = [{} for _ in self.limits]
+        for pos, data in seat_data.items():
+            i = self.index.get(pos)
+            if i is not None and data["name"] != "空":
+                self._place(data["name"], i)
+        self.active = set()
+        for name in self.tracked:
+            self.active |= self._keys_for(name)
+
+    def _place(self, name, seat):
+        self.occupant[seat] = name
+        if name in self.seat_of:
+            # 重名时只按第一个座位计算
+            return
+        self.seat_of[name] = seat
+        row = self.positions[seat][0]
+        for k in self.limits_of.get(name, ()):
+            self.row_counts[k][row] = self.row_counts[k].get(row, 0) + 1
+
+    def _remove(self, seat):
+        name = self.occupant[seat]
+        self.occupant[seat] = None
+        if name is None or self.seat_of.get(name) != seat:
+            return
+        del self.seat_of[name]
+        row = self.positions[seat][0]
+        for k in self.limits_of.get(name, ()):
+            self.row_counts[k][row] -= 1
+
+    def _group_ok(self, g):
+        seats = [self.seat_of.get(name) for name in self.groups[g]]
+        if None in seats:
+            return False
+        if len(seats) == 2:
+            return bool(self.beside[seats[0]] >> seats[1] & 1)
+        rows = {self.positions[s][0] for s in seats}
+        cols = sorted(self.positions[s][1] for s in seats)
+        return len(rows) == 1 and cols[-1] - cols[0] == len(cols) - 1
+
+    def _valid(self, key):
+        """某条冲突在当前座位下是否仍然存在"""
+        kind = key[0]
+        if kind == "apart":
+            a, b = self.seat_of.get(key[1]), self.seat_of.get(key[2])
+            return a is not None and b is not None and bool(self.near[a] >> b & 1)
+        if kind == "together":
+            return not self._group_ok(key[1])
+        k, row = key[1], key[2]
+        return self.row_counts[k].get(row, 0) > self.limits[k][1]
+
+    def _keys_for(self, name):
+        """与某名学生有关、当前存在的冲突"""
+        keys = set()
+        seat = self.seat_of.get(name)
+        for other in self.apart.get(name, ()):
+            key = ("apart",) + tuple(sorted((name, other)))
+            if self._valid(key):
+                keys.add(key)
+        g = self.group_of.get(name)
+        if g is not None and not self._group_ok(g):
+            keys.add(("together", g))
+        if seat is not None:
+            row = self.positions[seat][0]
+            for k in self.limits_of.get(name, ()):
+                if self.row_counts[k].get(row, 0) > self.limits[k][1]:
+                    keys.add(("row_limit", k, row))
+        return keys
+
+    def _move(self, assignments):
+        """按{座位下标: 姓名或None}修改座位，返回与之有关的冲突在修改前后的集合"""
+        names = {self.occupant[i] for i in assignments} | set(assignments.values())
+        names = [name for name in names if name in self.tracked]
+        before = set()
+        for name in names:
+            before |= self._keys_for(name)
+        for i in assignments:
+            self._remove(i)
+        for i, name in assignments.items():
+            if name is not None:
+                self._place(name, i)
+        after = set()
+        for name in names:
+            after |= self._keys_for(name)
+        # 学生离开后人数仍超限的排也要保留
+        after |= {key for key in before if self._valid(key)}
+        return before, after
+
+    def check_swap(self, pos_a, pos_b):
+        """调换两个座位会新产生（或人数超限更多）的冲突说明（不修改状态）"""
+        a, b = self.index.get(pos_a), self.index.get(pos_b)
+        if a is None or b is None:
+            return []
+        name_a, name_b = self.occupant[a], self.occupant[b]
+        if name_a not in self.tracked and name_b not in self.tracked:
+            return []
+        before, after = self._move({a: name_b, b: name_a})
+        problems = [self.describe(key) for key in sorted(after - before, key=str)]
+        self._move({a: name_a, b: name_b})
+        return problems
+
+    def update(self, positions, seat_data):
+        """按座位数据的最新内容更新冲突，代价只与变化的座位数有关"""
+        assignments = {}
+        for pos in positions:
+            i = self.index.get(pos)
+            if i is None or pos not in seat_data:
+                continue
+            name = seat_data[pos]["name"]
+            name = None if name == "空" else name
+            if name != self.occupant[i]:
+                assignments[i] = name
+        if assignments:
+            before, after = self._move(assignments)
+            self.active = (self.active - before) | after
+
+    def row_name(self, row):
+        return "讲台两侧" if row > self.main_rows else f"第{self.main_rows - row + 1}排"
+
+    def describe(self, key):
+        """冲突的文字说明"""
+        if key[0] == "apart":
+            return f"{key[1]}和{key[2]}应分开坐"
+        if key[0] == "together":
+            return f"{'、'.join(self.groups[key[1]])}应在同一排相邻而坐"
+        group, limit = self.limits[key[1]]
+        return f"{group}在{self.row_name(key[2])}有{self.row_counts[key[1]].get(key[2], 0)}人，超过每排{limit}人"
+
+    def violations(self):
+        """当前全部冲突的文字说明"""
+        return [self.describe(key) for key in sorted(self.active, key=str)]
+
+
+def generate_candidates(students, seat_positions, layout_config, count, seed=None, stop_event=None):
+    """依次生成若干随机座位方案及其评分和缩略图（可在后台线程中调用）
+
+    Args:
+        students: 学生记录字典列表
+        seat_positions: 座位坐标列表
+        layout_config: 布局配置字典
+        count: 方案数量
+        seed: 随机种子，相同种子生成相同的一组方案
+        stop_event: threading.Event，设置后停止生成
+
+    Yields:
+        dict: seed（该方案的随机种子）、seat_data、scores、thumbnail（PIL不可用时为None）
+    """
+    height_map = {stu["姓名"]: stu.get("身高") for stu in students}
+    seeds = random.Random(seed)
+    for _ in range(count):
+        if stop_event is not None and stop_event.is_set():
+            return
+        candidate_seed = seeds.getrandbits(32)
+        seat_data = arrange_seats(students, seat_positions, "random", rng=random.Random(candidate_seed))
+        yield {
+            "seed": candidate_seed,
+            "seat_data": seat_data,
+            "scores": score_arrangement(seat_data, height_map, layout_config),
+            "thumbnail": render_seat_thumbnail(layout_config, seat_data)
+        }
+
+
+# 尝试加载的中文字体（按顺序尝试多个常见的中文字体）
+PIL_FONT_PATHS = ["simhei.ttf", "simkai.ttf", "simsun.ttc", "msyh.ttc", "Arial.ttf"]
+
+
+@functools.lru_cache(maxsize=None)
+def load_pil_font(size):
+    """加载指定大小的中文字体，结果会被缓存，多次渲染无需重复读取字体文件"""
+    for font_path in PIL_FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except (IOError, OSError):
+            continue
+    # 如果所有字体都加载失败，使用默认字体
+    return ImageFont.load_default()
+
+
+# 导出场景中的座位底色（RGB）
+SEAT_FILL_COLORS = {"男": (220, 240, 255), "女": (255, 220, 230)}
+EMPTY_SEAT_FILL = (240, 240, 240)
+PODIUM_FILL = (156, 39, 176)
+EXPORT_NOTES = (
+    "1、座位安排主要依据为身高，同时参考学生性别、性格、学习成绩等因素进行互补性编排；",
+    "2、班级座位每月根据实际情况调整。"
+)
+
+
+def build_seat_scene(layout_config, seat_data, seat_index_map, config=None):
+    """生成导出用的座位表场景描述，各导出格式共用同一份几何、标题与配色，每次导出只计算一次
+
+    Args:
+        layout_config: 布局配置字典（班级名称、班主任也从这里读取）
+        seat_data: 座位数据字典
+        seat_index_map: 座位编号映射
+        config: 配置对象（读取Export、Color节中的可选设置），默认使用内置设置
+
+    Returns:
+        dict: title（主标题）、title_spacing（标题字间空格数）、title_color、title_underline_color、
+              class_name、teacher_name、rows / cols（网格行列数，第0行为最后一排，最后一行为讲台所在行）、
+              podium（讲台所在的(行, 列, 跨列数)）、
+              seats（按座位编号排列，每项含row、col、index、name（空座位为""）、gender、fill）、notes（备注行）
+    """
+    main_rows = layout_config["main_rows"]
+    main_cols = layout_config["main_cols"]
+    # 与build_seat_positions保持一致：讲台固定占2格并居中
+    total_width = max(main_cols, 4)
+    podium_start_col = (total_width - 2 + 1) // 2
+    podium_row = main_rows + 1
+    # 讲台侧座位可能位于第0列左侧，整体平移使网格列号从0开始
+    used_cols = [c for _, c in seat_data] + [0, total_width - 1]
+    col_offset = -min(used_cols)
+
+    seats = []
+    for pos in sorted(seat_data, key=lambda p: seat_index_map.get(p, 0)):
+        data = seat_data[pos]
+        name = data["name"] if data["name"] and data["name"] != "空" else ""
+        seats.append({
+            "row": pos[0] - 1,
+            "col": pos[1] + col_offset,
+            "index": seat_index_map.get(pos, 0),
+            "name": name,
+            "gender": data["gender"] if name else "空",
+            "fill": SEAT_FILL_COLORS.get(data["gender"], EMPTY_SEAT_FILL) if name else EMPTY_SEAT_FILL
+        })
+
+    if config is None:
+        config = configparser.ConfigParser()
+    return {
+        "title": config.get("Export", "main_title", fallback="座位表"),
+        "title_spacing": config.getint("Export", "title_space_count", fallback=2),
+        "title_color": config.get("Color", "title_text_color", fallback="black"),
+        "title_underline_color": config.get("Color", "title_underline_color", fallback="black"),
+        "class_name": layout_config.get("class_name", ""),
+        "teacher_name": layout_config.get("teacher_name", ""),
+        "rows": podium_row,
+        "cols": max(used_cols) + col_offset + 1,
+        "podium": (podium_row - 1, podium_start_col + col_offset, 2),
+        "seats": seats,
+        "notes": EXPORT_NOTES
+    }
+
+
+def spaced_title(scene):
+    """按设置的空格数在标题的每个字之间加空格"""
+    return (" " * max(scene["title_spacing"], 1)).join(scene["title"])
+
+
+def _write_bytes(target, content):
+    """将二进制内容写入文件路径或可写的二进制文件对象"""
+    if isinstance(target, str):
+        with open(target, "wb") as f:
+            f.write(content)
+    else:
+        target.write(content)
+
+
+def render_seat_image(layout_config, seat_data, seat_index_map, config=None):
+    """将座位表布局绘制为图片（与界面无关，可在无界面的服务模式下调用）
+
+    Returns:
+        PIL.Image: 座位表布局的图像对象，如果失败则返回None
+    """
+    if not pillow_available:
+        print("PIL库不可用")
+        return None
+    return render_scene_image(build_seat_scene(layout_config, seat_data, seat_index_map, config))
+
+
+def render_scene_image(scene):
+    """按场景描述绘制座位表图片
+
+    Returns:
+        PIL.Image: 座位表布局的图像对象，如果失败则返回None
+    """
+    try:
+        rows = scene["rows"]
+        cols = scene["cols"]
+
+        # 每个座位100x100像素，列数较多时缩小座位，确保图像不会过大
+        base_seat_size = 100
+        max_seats_per_row = 10
+        if cols > max_seats_per_row:
+            seat_size = int(base_seat_size * max_seats_per_row / cols)
+        else:
+            seat_size = base_seat_size
+
+        # 限制最大尺寸，防止内存问题
+        max_size = 3000
+        margin = 150  # 留出顶部空间显示标题
+        img_width = cols * seat_size + margin * 2
+        img_height = rows * seat_size + margin * 2
+        if img_width > max_size or img_height > max_size:
+            scale_factor = max_size / max(img_width, img_height)
+            seat_size = max(int(seat_size * scale_factor), 1)
+            margin = int(margin * scale_factor)
+            img_width = cols * seat_size + margin * 2
+            img_height = rows * seat_size + margin * 2
+
+        # 创建白色背景图像
+        image = Image.new('RGB', (img_width, img_height), color='white')
+        draw = ImageDraw.Draw(image)
+
+        # 加载不同大小的字体
+        font = load_pil_font(16)
+        title_font = load_pil_font(24)
+        small_font = load_pil_font(12)
+
+        # 标题：班级名称与班主任（都为空时显示主标题）
+        title_text = scene["class_name"] or scene["title"]
+        if scene["teacher_name"]:
+            title_text += f" - 班主任：{scene['teacher_name']}"
+        title_width = draw.textlength(title_text, font=title_font)
+        draw.text((img_width // 2 - title_width // 2, margin // 3), title_text, font=title_font, fill='black')
+
+        # 绘制座位
+        for seat in scene["seats"]:
+            x = margin + seat["col"] * seat_size
+            y = margin + seat["row"] * seat_size
+            draw.rectangle([x, y, x + seat_size - 5, y + seat_size - 5], fill=seat["fill"], outline='black')
+            # 座位号
+            if seat["index"]:
+                draw.text((x + 5, y + 5), str(seat["index"]), font=small_font, fill='black')
+            # 学生姓名
+            if seat["name"]:
+                name_width = draw.textlength(seat["name"], font=font)
+                draw.text((x + seat_size // 2 - name_width // 2, y + seat_size // 2 - 8),
+                          seat["name"], font=font, fill='black')
+
+        # 绘制讲台（位于最前排下方）
+        podium_row, podium_col, span = scene["podium"]
+        x = margin + podium_col * seat_size
+        y = margin + podium_row * seat_size
+        draw.rectangle([x, y, x + seat_size * span - 5, y + seat_size - 5], fill='lightgray', outline='black')
+        podium_width = draw.textlength("讲台", font=font)
+        draw.text((x + (seat_size * span - 5) // 2 - podium_width // 2, y + seat_size // 2 - 10),
+                  "讲台", font=font, fill='black')
+
+        return image
+    except Exception as e:
+        print(f"创建座位布局图片失败：{str(e)}")
+        return None
+
+
+def write_png_scene(target, scene):
+    if not pillow_available:
+        raise ImportError("pillow")
+    image = render_scene_image(scene)
+    if image is None:
+        raise ValueError("座位布局图片生成失败")
+    image.save(target, format="PNG")
+
+
+def render_seat_thumbnail(layout_config, seat_data, cell_size=12):
+    """快速绘制座位表缩略图：只画按性别着色的座位方块，不加载字体也不绘制文字
+
+    Returns:
+        PIL.Image: 缩略图，PIL不可用时返回None
+    """
+    if not pillow_available:
+        return None
+    rows = layout_config["main_rows"] + 1
+    min_col = min(0, min((c for _, c in seat_data), default=0))
+    max_col = max(layout_config["main_cols"] - 1, max((c for _, c in seat_data), default=0))
+    gap = 2
+    image = Image.new("RGB", ((max_col - min_col + 1) * cell_size + gap,
+                              rows * cell_size + gap), color="white")
+    draw = ImageDraw.Draw(image)
+    colors = {"男": (120, 180, 240), "女": (240, 150, 180)}
+    for (row, col), data in seat_data.items():
+        x = (col - min_col) * cell_size + gap
+        y = (row - 1) * cell_size + gap
+        draw.rectangle([x, y, x + cell_size - gap - 1, y + cell_size - gap - 1],
+                       fill=colors.get(data["gender"], (225, 225, 225)))
+    return image
+
+
+_pdf_fonts = None
+
+
+def register_pdf_fonts():
+    """注册PDF导出用的中文字体（进程内只注册一次）
+
+    Returns:
+        tuple: (标题字体名, 正文字体名)；Windows字体不可用时使用reportlab内置的中文字体STSong-Light
+    """
+    global _pdf_fonts
+    if _pdf_fonts is not None:
+        return _pdf_fonts
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    try:
+        # 尝试注册Windows系统中的宋体
+        pdfmetrics.registerFont(TTFont('SimSun', 'simsun.ttc'))
+        body_font = 'SimSun'
+    except Exception:
+        pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+        body_font = 'STSong-Light'
+    try:
+        # 尝试注册Windows系统中的微软雅黑
+        pdfmetrics.registerFont(TTFont('MicrosoftYaHei', 'msyh.ttc'))
+        title_font = 'MicrosoftYaHei'
+    except Exception:
+        title_font = body_font
+    _pdf_fonts = (title_font, body_font)
+    return _pdf_fonts
+
+
+def write_pdf_scene(target, scene):
+    """按场景描述生成PDF：标题、班级信息、座位表格（矢量绘制，不嵌入图片）和备注"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.units import cm
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    title_font, body_font = register_pdf_fonts()
+    doc = SimpleDocTemplate(target, pagesize=A4)
+    styles = getSampleStyleSheet()
+    # 标题：小初大小（约36pt）居中；正文：四号（约14pt）居左
+    title_style = ParagraphStyle(
+        'SeatTitle', parent=styles['Title'], fontName=title_font, fontSize=36, leading=44, alignment=1,
+        textColor=getattr(colors, scene["title_color"], colors.black)
+    )
+    body_style = ParagraphStyle('SeatBody', parent=styles['BodyText'], fontName=body_font, fontSize=14,
+                                leading=20, alignment=0)
+    info_style = ParagraphStyle('SeatInfo', parent=body_style, alignment=1)
+
+    underline_color = scene["title_underline_color"]
+    if not hasattr(colors, underline_color):
+        underline_color = "black"
+    elements = [
+        Paragraph(f'<u color="{underline_color}">{html.escape(spaced_title(scene))}</u>', title_style),
+        Spacer(1, 0.3 * cm)
+    ]
+
+    # 班级和班主任信息（仅在有信息时显示，姓名带下划线）
+    info_parts = []
+    if scene["class_name"]:
+        info_parts.append(f"班级：<u>{html.escape(scene['class_name'])}</u>")
+    if scene["teacher_name"]:
+        info_parts.append(f"班主任：<u>{html.escape(scene['teacher_name'])}</u>")
+    if info_parts:
+        elements.append(Paragraph("  ".join(info_parts), info_style))
+    elements.append(Spacer(1, 0.5 * cm))
+
+    # 座位表格：列宽按页面宽度均分，行高不超过页面剩余高度
+    rows, cols = scene["rows"], scene["cols"]
+    col_width = min(doc.width / cols, 2.6 * cm)
+    row_height = max(min(col_width * 0.75, (doc.height - 9 * cm) / rows), 0.5 * cm)
+    font_size = max(5, min(14, col_width / 4.5))
+    cell_style = ParagraphStyle('SeatCell', fontName=body_font, fontSize=font_size,
+                                leading=font_size * 1.25, alignment=1)
+    data = [[""] * cols for _ in range(rows)]
+    commands = [
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    for seat in scene["seats"]:
+        r, c = seat["row"], seat["col"]
+        data[r][c] = Paragraph(
+            f'<font size="{max(font_size * 0.6, 4):.1f}" color="#666666">{seat["index"]}</font><br/>'
+            f'{html.escape(seat["name"])}', cell_style
+        )
+        commands.append(('BACKGROUND', (c, r), (c, r), colors.Color(*[v / 255 for v in seat["fill"]])))
+        commands.append(('BOX', (c, r), (c, r), 0.5, colors.grey))
+    podium_row, podium_col, span = scene["podium"]
+    podium_style = ParagraphStyle('SeatPodium', parent=cell_style, textColor=colors.white)
+    data[podium_row][podium_col] = Paragraph("讲台", podium_style)
+    commands += [
+        ('SPAN', (podium_col, podium_row), (podium_col + span - 1, podium_row)),
+        ('BACKGROUND', (podium_col, podium_row), (podium_col + span - 1, podium_row),
+         colors.Color(*[v / 255 for v in PODIUM_FILL])),
+    ]
+    elements.append(Table(data, colWidths=[col_width] * cols, rowHeights=[row_height] * rows,
+                          style=TableStyle(commands)))
+
+    # 备注信息
+    elements.append(Spacer(1, 1 * cm))
+    elements.append(Paragraph("备注：", body_style))
+    for note in scene["notes"]:
+        elements.append(Paragraph(note, body_style))
+
+    doc.build(elements)
+
+
+_docx_template_bytes = None
+
+
+def new_word_document():
+    """基于缓存的默认模板创建Word文档，避免每次导出都从磁盘读取模板"""
+    global _docx_template_bytes
+    if _docx_template_bytes is None:
+        buffer = io.BytesIO()
+        Document().save(buffer)
+        _docx_template_bytes = buffer.getvalue()
+    return Document(io.BytesIO(_docx_template_bytes))
+
+
+def build_scene_document(scene):
+    """按场景描述生成Word文档对象
+
+    Returns:
+        docx.Document: 座位表文档
+    """
+    # 导入必要的docx模块
+    from docx.shared import Pt, Cm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.enum.table import WD_ALIGN_VERTICAL
+
+    class_info = scene["class_name"]
+    teacher_info = scene["teacher_name"]
+
+    doc = new_word_document()
+
+    # 添加居中的座位表标题，设置为微软雅黑，小初大小（约36pt）
+    title = doc.add_heading('', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # 创建标题run并设置字体样式：微软雅黑，小初大小，加粗，黑色文本，下划线为黑色填充
+    title_run = title.add_run(spaced_title(scene))
+    title_run.font.name = '微软雅黑'
+    title_run.font.size = Pt(36)  # 小初大小约为36pt
+    title_run.bold = True
+    title_run.font.color.rgb = RGBColor(0, 0, 0)  # 黑色
+    # 下划线颜色与文本颜色相同
+    title_run.underline = True
+
+    # 添加空行作为标题和班级信息之间的间距，避免标题遮挡班级信息
+    doc.add_paragraph()
+
+    # 添加班级和班主任信息（仅在有信息时显示，居中显示，班级和班主任姓名带下划线）
+    if class_info or teacher_info:
+        info_paragraph = doc.add_paragraph()
+        info_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER  # 确保班级信息居中显示
+
+        # 分别处理班级和班主任信息，为姓名添加下划线，所有文本设置为宋体四号
+        if class_info:
+            run1 = info_paragraph.add_run("班级：")
+            run1.font.name = '宋体'
+            run1.font.size = Pt(14)  # 四号字体
+            # 班级名称带下划线
+            class_run = info_paragraph.add_run(class_info)
+            class_run.underline = True
+            class_run.font.name = '宋体'
+            class_run.font.size = Pt(14)  # 四号字体
+
+        if class_info and teacher_info:
+            run_space = info_paragraph.add_run("  ")
+            run_space.font.name = '宋体'
+            run_space.font.size = Pt(14)  # 四号字体
+
+        if teacher_info:
+            run2 = info_paragraph.add_run("班主任：")
+            run2.font.name = '宋体'
+            run2.font.size = Pt(14)  # 四号字体
+            # 班主任姓名带下划线
+            teacher_run = info_paragraph.add_run(teacher_info)
+            teacher_run.underline = True
+            teacher_run.font.name = '宋体'
+            teacher_run.font.size = Pt(14)  # 四号字体
+
+    # 创建一个表格来表示座位布局，行列与场景网格一致
+    rows, cols = scene["rows"], scene["cols"]
+    table = doc.add_table(rows=rows, cols=cols)
+    table.style = 'Table Grid'  # 设置表格样式为网格
+
+    # 设置表格为自动调整以适应窗口宽度
+    # 使用try-except块确保兼容性
+    try:
+        from docx.oxml.shared import OxmlElement, qn
+        tbl = table._tbl
+        tblPr = tbl.tblPr
+        tblW = tblPr.find(qn('w:tblW'))
+        if tblW is None:
+            tblW = OxmlElement('w:tblW')
+            tblPr.append(tblW)
+        tblW.set(qn('w:type'), 'auto')
+        tblW.set(qn('w:w'), '0')
+    except Exception as e:
+        # 记录错误但不中断程序执行
+        print(f"设置表格自动调整属性时出错: {e}")
+
+    # 设置所有单元格格式：宋体四号，垂直居中，行高1.5CM，水平居中
+    for row in table.rows:
+        row.height = Cm(1.5)
+        for cell in row.cells:
+            cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+            cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # 填充讲台信息 - 独立居中显示，紫色底白字
+    podium_row, podium_col, span = scene["podium"]
+    podium_cell = table.cell(podium_row, podium_col)
+    podium_cell = podium_cell.merge(table.cell(podium_row, podium_col + span - 1))
+    podium_cell.text = ""
+    podium_run = podium_cell.paragraphs[0].add_run("讲台")
+    podium_run.font.name = '宋体'
+    podium_run.font.size = Pt(14)
+    podium_run.font.color.rgb = RGBColor(255, 255, 255)  # 白色文字
+    podium_cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    shading_elm = parse_xml(r'<w:shd {} w:fill="{:02X}{:02X}{:02X}"/>'.format(nsdecls('w'), *PODIUM_FILL))
+    podium_cell._tc.get_or_add_tcPr().append(shading_elm)
+
+    # 填充座位信息：座位有学生时显示名字，无学生时为空白单元格
+    for seat in scene["seats"]:
+        if seat["name"]:
+            run = table.cell(seat["row"], seat["col"]).paragraphs[0].add_run(seat["name"])
+            run.font.name = '宋体'
+            run.font.size = Pt(14)
+
+    # 添加备注信息
+    # 添加空行作为间距
+    doc.add_paragraph()
+
+    # 添加备注标题（加粗，居左显示）
+    note_title = doc.add_paragraph()
+    note_run = note_title.add_run("备注：")
+    note_run.bold = True
+    note_title.alignment = WD_ALIGN_PARAGRAPH.LEFT  # 设置备注标题居左
+
+    # 添加备注内容（居左显示）
+    for note in scene["notes"]:
+        doc.add_paragraph(note).alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    return doc
+
+
+def write_docx_scene(target, scene):
+    if not docx_available:
+        raise ImportError("python-docx")
+    build_scene_document(scene).save(target)
+
+
+# 网页导出的公共样式：内容固定，相同输入生成的页面逐字节相同，便于门户网站缓存
+HTML_PAGE_STYLE = (
+    "body{font-family:'微软雅黑','Microsoft YaHei',sans-serif;margin:24px;color:#333}"
+    "h1{text-align:center;text-decoration:underline}"
+    ".info{text-align:center;font-size:18px}"
+    ".chart{display:block;margin:16px auto;max-width:100%;height:auto}"
+    ".classes{display:flex;flex-wrap:wrap;gap:16px;list-style:none;padding:0}"
+    ".classes li{border:1px solid #ddd;border-radius:6px;padding:8px;text-align:center}"
+    ".classes a{color:#333;text-decoration:none}"
+)
+SVG_CELL_SIZE = 80
+SVG_CELL_GAP = 6
+
+
+def _rgb(color):
+    return "#{:02X}{:02X}{:02X}".format(*color)
+
+
+def iter_scene_svg(scene, cell_size=SVG_CELL_SIZE, gap=SVG_CELL_GAP, show_text=True, header=False):
+    """逐段生成座位表的SVG（座位网格与讲台），不依赖PIL和python-docx
+
+    Args:
+        cell_size: 每个座位格的边长（像素）
+        gap: 座位格间距（像素）
+        show_text: 为False时只画色块，用于索引页的小缩略图
+        header: 是否在顶部加上标题与班级信息（单独导出SVG文件时使用）
+
+    Yields:
+        str: SVG片段
+    """
+    step = cell_size + gap
+    top = 70 if header else 0
+    width = scene["cols"] * step + gap
+    height = scene["rows"] * step + gap + top
+    yield (f'<svg class="chart" xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'viewBox="0 0 {width} {height}" font-family="微软雅黑, Microsoft YaHei, sans-serif">\n')
+    if header:
+        yield (f'<text x="{width // 2}" y="30" font-size="26" font-weight="bold" text-anchor="middle" '
+               f'text-decoration="underline">{html.escape(spaced_title(scene))}</text>\n')
+        info = "  ".join(part for part in (
+            f"班级：{scene['class_name']}" if scene["class_name"] else "",
+            f"班主任：{scene['teacher_name']}" if scene["teacher_name"] else ""
+        ) if part)
+        if info:
+            yield f'<text x="{width // 2}" y="58" font-size="16" text-anchor="middle">{html.escape(info)}</text>\n'
+    name_size = max(cell_size // 5, 8)
+    index_size = max(cell_size // 7, 6)
+    for seat in scene["seats"]:
+        x = gap + seat["col"] * step
+        y = top + gap + seat["row"] * step
+        yield (f'<rect x="{x}" y="{y}" width="{cell_size}" height="{cell_size}" rx="4" '
+               f'fill="{_rgb(seat["fill"])}" stroke="#999"/>')
+        if show_text:
+            yield (f'<text x="{x + 4}" y="{y + index_size + 2}" font-size="{index_size}" fill="#666">'
+                   f'{seat["index"]}</text>')
+            if seat["name"]:
+                yield (f'<text x="{x + cell_size // 2}" y="{y + cell_size // 2 + name_size // 2}" '
+                       f'font-size="{name_size}" text-anchor="middle">{html.escape(seat["name"])}</text>')
+        yield "\n"
+    podium_row, podium_col, span = scene["podium"]
+    x = gap + podium_col * step
+    y = top + gap + podium_row * step
+    podium_width = span * step - gap
+    yield (f'<rect x="{x}" y="{y}" width="{podium_width}" height="{cell_size}" rx="4" '
+           f'fill="{_rgb(PODIUM_FILL)}"/>')
+    if show_text:
+        yield (f'<text x="{x + podium_width // 2}" y="{y + cell_size // 2 + name_size // 2}" '
+               f'font-size="{name_size}" font-weight="bold" fill="#fff" text-anchor="middle">讲台</text>')
+    yield "\n</svg>\n"
+
+
+def _scene_info_html(scene):
+    info_parts = []
+    if scene["class_name"]:
+        info_parts.append(f"班级：<u>{html.escape(scene['class_name'])}</u>")
+    if scene["teacher_name"]:
+        info_parts.append(f"班主任：<u>{html.escape(scene['teacher_name'])}</u>")
+    return "&nbsp;&nbsp;".join(info_parts)
+
+
+def iter_scene_html(scene):
+    """逐段生成独立的座位表网页（班级信息标题 + 内联SVG座位网格 + 备注），内联样式不依赖外部文件
+
+    Yields:
+        str: HTML片段
+    """
+    yield '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+    yield f"<title>{html.escape(scene['class_name'] or scene['title'])}</title>\n"
+    yield f"<style>{HTML_PAGE_STYLE}</style>\n</head>\n<body>\n"
+    yield (f'<h1 style="letter-spacing:{scene["title_spacing"] * 0.5}em;color:{html.escape(scene["title_color"])}">'
+           f"{html.escape(scene['title'])}</h1>\n")
+    info = _scene_info_html(scene)
+    if info:
+        yield f'<p class="info">{info}</p>\n'
+    yield from iter_scene_svg(scene)
+    yield "<p><b>备注：</b></p>\n"
+    for note in scene["notes"]:
+        yield f"<p>{html.escape(note)}</p>\n"
+    yield "</body>\n</html>\n"
+
+
+def iter_class_index_html(classes, title="班级座位表"):
+    """逐段生成多班级索引页：每个班级一张小缩略图和链接，班级数据可以是生成器，一次遍历即可写完
+
+    Args:
+        classes: 可迭代对象，每项为dict：class_name、teacher_name、href（班级页面链接），
+                 可选scene（有则显示缩略图）
+
+    Yields:
+        str: HTML片段
+    """
+    yield '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+    yield f"<title>{html.escape(title)}</title>\n<style>{HTML_PAGE_STYLE}</style>\n</head>\n<body>\n"
+    yield f"<h1>{html.escape(title)}</h1>\n<ul class=\"classes\">\n"
+    count = 0
+    for entry in classes:
+        count += 1
+        yield f'<li><a href="{html.escape(entry["href"], quote=True)}">'
+        if entry.get("scene") is not None:
+            yield from iter_scene_svg(entry["scene"], cell_size=10, gap=2, show_text=False)
+        yield f"<div>{html.escape(entry['class_name'] or '（未命名）')}</div>"
+        if entry.get("teacher_name"):
+            yield f"<div>班主任：{html.escape(entry['teacher_name'])}</div>"
+        yield "</a></li>\n"
+    yield f"</ul>\n<p>共{count}个班级</p>\n</body>\n</html>\n"
+
+
+def write_text_stream(target, chunks):
+    """将文本片段逐段以UTF-8写入文件路径或可写的二进制文件对象，不在内存中拼接整个文档"""
+    if isinstance(target, str):
+        with open(target, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(chunks)
+        return
+    stream = io.TextIOWrapper(target, encoding="utf-8", newline="\n", write_through=True)
+    try:
+        stream.writelines(chunks)
+        stream.flush()
+    finally:
+        # 只解除包装，不关闭调用方的文件对象
+        stream.detach()
+
+
+def write_html_scene(target, scene):
+    write_text_stream(target, iter_scene_html(scene))
+
+
+def write_svg_scene(target, scene):
+    write_text_stream(target, iter_scene_svg(scene, header=True))
+
+
+def _xlsx_sheet_title(name, used):
+    """Excel工作表名：去掉不允许的字符，最多31个字符，重名时加序号"""
+    base = "".join("_" if ch in '[]:*?/\\' else ch for ch in name).strip()[:31] or "未命名"
+    title = base
+    suffix = 2
+    while title in used:
+        tail = f"({suffix})"
+        title = base[:31 - len(tail)] + tail
+        suffix += 1
+    used.add(title)
+    return title
+
+
+def write_xlsx_workbook(target, scenes):
+    """以只写（流式）模式把一个或多个班级的座位表写入Excel
+
+    第一个工作表“座位清单”逐行列出所有班级的座位，之后每个班级一个工作表，按教室布局排列，
+    座位按性别着色（与界面配色相同）。scenes可以是生成器：班级逐个写出，内存占用与班级数量无关。
+
+    Args:
+        target: 输出文件路径或可写的二进制文件对象
+        scenes: 场景描述（见build_seat_scene）的可迭代对象
+
+    Returns:
+        int: 写入的班级数
+
+    Raises:
+        ImportError: 未安装openpyxl
+    """
+    if not openpyxl_available:
+        raise ImportError("openpyxl")
+    workbook = Workbook(write_only=True)
+    seat_list = workbook.create_sheet("座位清单")
+    seat_list.append(["班级", "班主任", "座位号", "排（从前往后，0为讲台两侧）", "列（从左往右）", "姓名", "性别"])
+
+    # 样式注册为命名样式，单元格只引用样式名，避免每个单元格重复比较样式对象
+    side = Side(style="thin", color="999999")
+    border = Border(left=side, right=side, top=side, bottom=side)
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    seat_styles = {}
+    for gender, color in GENDER_COLORS.items():
+        seat_styles[gender] = f"座位_{gender}"
+        workbook.add_named_style(NamedStyle(
+            name=seat_styles[gender], font=Font(name="宋体", size=12), alignment=center, border=border,
+            fill=PatternFill("solid", fgColor=color.lstrip("#"))
+        ))
+    workbook.add_named_style(NamedStyle(
+        name="讲台", font=Font(name="宋体", size=12, bold=True, color="FFFFFF"), alignment=center,
+        fill=PatternFill("solid", fgColor="{:02X}{:02X}{:02X}".format(*PODIUM_FILL))
+    ))
+    workbook.add_named_style(NamedStyle(name="座位表标题", font=Font(name="微软雅黑", size=14, bold=True)))
+
+    used_titles = {"座位清单"}
+    count = 0
+    for scene in scenes:
+        count += 1
+        class_name = scene["class_name"]
+        sheet = workbook.create_sheet(_xlsx_sheet_title(class_name or f"班级{count}", used_titles))
+        for col in range(scene["cols"]):
+            sheet.column_dimensions[get_column_letter(col + 1)].width = 12
+
+        header = WriteOnlyCell(sheet, value="  ".join(part for part in (
+            scene["title"],
+            f"班级：{class_name}" if class_name else "",
+            f"班主任：{scene['teacher_name']}" if scene["teacher_name"] else ""
+        ) if part))
+        header.style = "座位表标题"
+        sheet.append([header])
+        sheet.append([])
+
+        # 按行写出教室布局：只写当前一行的单元格
+        rows = {}
+        for seat in scene["seats"]:
+            rows.setdefault(seat["row"], []).append(seat)
+        podium_row, podium_col, span = scene["podium"]
+        front_row = scene["rows"] - 1
+        for r in range(scene["rows"]):
+            line = [None] * scene["cols"]
+            for seat in rows.get(r, ()):
+                cell = WriteOnlyCell(sheet, value=f"{seat['index']}\n{seat['name']}" if seat["name"]
+                                     else str(seat["index"]))
+                cell.style = seat_styles.get(seat["gender"], seat_styles["空"])
+                line[seat["col"]] = cell
+                seat_list.append([class_name, scene["teacher_name"], seat["index"], front_row - seat["row"],
+                                  seat["col"] + 1, seat["name"], seat["gender"] if seat["name"] else ""])
+            if r == podium_row:
+                for c in range(podium_col, podium_col + span):
+                    cell = WriteOnlyCell(sheet, value="讲台" if c == podium_col else None)
+                    cell.style = "讲台"
+                    line[c] = cell
+            sheet.append(line)
+    workbook.save(target)
+    return count
+
+
+def write_xlsx_scene(target, scene):
+    write_xlsx_workbook(target, [scene])
+
+
+def scene_from_payload(payload, config=None):
+    """由保存文件结构（build_save_payload的返回值）生成场景描述"""
+    def parse_pos(key):
+        return tuple(int(v) for v in key.strip("()").split(","))
+
+    seat_data = {parse_pos(key): data for key, data in payload["seat_data"].items()}
+    seat_index_map = {parse_pos(key): idx for key, idx in payload["seat_index_map"].items()}
+    return build_seat_scene(payload["layout_config"], seat_data, seat_index_map, config)
+
+
+def safe_filename(name, default="未命名"):
+    """去掉文件名中不允许的字符"""
+    name = "".join("_" if ch in '\\/:*?"<>|' else ch for ch in name).strip()
+    return name or default
+
+
+def write_class_portal(store, output_dir, config=None):
+    """将数据库中所有班级导出为网页并生成索引页index.html
+
+    班级逐个读取、写出，再交给索引页生成器，内存占用与班级数量无关。
+
+    Returns:
+        int: 导出的班级数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    exported = [0]
+
+    used = set()
+
+    def entries():
+        for info in store.list_classes():
+            payload = store.load_class(info["class_id"])
+            if payload is None:
+                continue
+            scene = scene_from_payload(payload, config)
+            # 重名或未命名的班级在文件名后加上班级编号
+            stem = safe_filename(info["class_name"])
+            if stem.lower() in used:
+                stem = f"{stem}_{info['class_id']}"
+            used.add(stem.lower())
+            filename = stem + ".html"
+            write_html_scene(os.path.join(output_dir, filename), scene)
+            exported[0] += 1
+            yield {
+                "class_name": info["class_name"],
+                "teacher_name": info["teacher_name"],
+                "href": urllib.parse.quote(filename),
+                "scene": scene
+            }
+
+    write_text_stream(os.path.join(output_dir, "index.html"), iter_class_index_html(entries()))
+    return exported[0]
+
+
+def write_class_workbook(store, target, config=None):
+    """将数据库中所有班级导出到一个Excel文件（只写模式，逐个班级读取并写出）
+
+    Returns:
+        int: 导出的班级数
+    """
+    def scenes():
+        for info in store.list_classes():
+            payload = store.load_class(info["class_id"])
+            if payload is not None:
+                yield scene_from_payload(payload, config)
+
+    return write_xlsx_workbook(target, scenes())
+
+
+# 支持的导出格式；除JSON外都由场景描述生成
+EXPORT_WRITERS = {
+    "png": write_png_scene,
+    "pdf": write_pdf_scene,
+    "docx": write_docx_scene,
+    "html": write_html_scene,
+    "svg": write_svg_scene,
+    "xlsx": write_xlsx_scene,
+}
+EXPORT_FORMATS = ("json",) + tuple(EXPORT_WRITERS)
+
+
+def write_export(target, output_format, layout_config, seat_data, seat_index_map, seat_positions, students, config,
+                 arrangement=None, scene=None):
+    """按格式导出座位表到文件路径或二进制文件对象
+
+    Args:
+        arrangement: 排座来源记录，导出JSON时一并写入
+        scene: 已生成的场景描述（见build_seat_scene），同一座位表导出多种格式时传入以免重复计算
+
+    Raises:
+        ImportError: 导出该格式所需的库未安装
+        ValueError: 不支持的格式
+    """
+    if output_format == "json":
+        payload = build_save_payload(layout_config, seat_data, seat_index_map, students, arrangement)
+        _write_bytes(target, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+        return
+    writer = EXPORT_WRITERS.get(output_format)
+    if writer is None:
+        raise ValueError(f"不支持的导出格式：{output_format}")
+    if scene is None:
+        scene = build_seat_scene(layout_config, seat_data, seat_index_map, config)
+    writer(target, scene)
+
+
+def export_all_formats(output_dir, basename, formats, layout_config, seat_data, seat_index_map, seat_positions,
+                       students, config, arrangement=None, max_workers=None):
+    """场景只生成一次，各格式在线程池中同时导出，总耗时接近最慢的单个格式
+
+    Returns:
+        dict: 格式到输出文件路径的映射，导出失败的格式对应异常对象
+    """
+    scene = build_seat_scene(layout_config, seat_data, seat_index_map, config)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(formats) or 1) as executor:
+        futures = {}
+        for output_format in formats:
+            path = os.path.join(output_dir, f"{basename}.{output_format}")
+            futures[output_format] = (path, executor.submit(
+                write_export, path, output_format, layout_config, seat_data, seat_index_map, seat_positions,
+                students, config, arrangement, scene
+            ))
+        for output_format, (path, future) in futures.items():
+            try:
+                future.result()
+                results[output_format] = path
+            except Exception as e:
+                results[output_format] = e
+    return results
+
+
+# config.ini中各配置项的默认值，值的类型即该配置项的类型
+SETTINGS_DEFAULTS = {
+    "Layout": {"class_name": "", "teacher_name": "", "podium_seats": 0, "main_rows": 6, "main_cols": 8},
+    "Export": {"main_title": "座位表", "title_space_count": 2},
+    "Color": {"title_text_color": "black", "title_underline_color": "black"},
+    "Storage": {"backend": "json", "path": "座位表数据.db"},
+    # 同时保留界面控件的班级标签页数量，其余标签页切换到时重新创建
+    "Workspace": {"max_views": 3},
+    # 自定义排座策略的运行时间上限（秒），超时后结束策略进程
+    "Strategy": {"timeout": 10.0},
+}
+
+
+class SettingsSnapshot:
+    """某一时刻的配置（只读），提供与ConfigParser相同的get/getint等方法，可直接代替配置对象使用
+
+    配置值在内存中以字符串保存，读取时按默认值的类型转换，不涉及磁盘读写。
+    """
+
+    def __init__(self, values, defaults=SETTINGS_DEFAULTS, version=0, warned=None):
+        self._values = values
+        self.defaults = defaults
+        self.version = version
+        # 已提示过的无效配置值，每个只提示一次
+        self._warned = set() if warned is None else warned
+
+    def _raw(self, section, option):
+        return self._values.get(section, {}).get(option.lower())
+
+    def _convert(self, raw, kind, section, option, fallback):
+        try:
+            if kind is bool:
+                value = raw.strip().lower()
+                if value not in configparser.ConfigParser.BOOLEAN_STATES:
+                    raise ValueError(raw)
+                return configparser.ConfigParser.BOOLEAN_STATES[value]
+            return kind(raw)
+        except ValueError:
+            if (section, option, raw) not in self._warned:
+                self._warned.add((section, option, raw))
+                print(f"配置项[{section}] {option}的值无效：{raw}，使用默认值")
+            return fallback
+
+    def _get(self, section, option, kind, fallback):
+        if fallback is None:
+            fallback = self.defaults.get(section, {}).get(option)
+        raw = self._raw(section, option)
+        if raw is None:
+            return fallback
+        if kind is None:
+            # 未指定类型时按默认值的类型转换，没有默认值的配置项返回字符串
+            kind = type(fallback) if fallback is not None else str
+        return self._convert(raw, kind, section, option, fallback)
+
+    def get(self, section, option, fallback=None):
+        return self._get(section, option, None, fallback)
+
+    def getint(self, section, option, fallback=None):
+        return self._get(section, option, int, fallback)
+
+    def getfloat(self, section, option, fallback=None):
+        return self._get(section, option, float, fallback)
+
+    def getboolean(self, section, option, fallback=None):
+        return self._get(section, option, bool, fallback)
+
+    def has_option(self, section, option):
+        return self._raw(section, option) is not None
+
+    def section(self, section):
+        """返回一个配置节的全部配置（含默认值），已按类型转换"""
+        options = dict.fromkeys(self.defaults.get(section, {}))
+        options.update(dict.fromkeys(self._values.get(section, {})))
+        return {option: self.get(section, option) for option in options}
+
+
+class SettingsService(SettingsSnapshot):
+    """config.ini的内存副本：启动时读取一次，修改时原子写回文件并通知订阅者
+
+    修改时整体替换内部字典（写时复制），读取无需加锁；后台线程应使用snapshot()，
+    一次导出中读到的配置始终一致。
+    """
+
+    def __init__(self, path, defaults=SETTINGS_DEFAULTS):
+        self.path = path
+        super().__init__(self._read(), defaults)
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def _read(self):
+        parser = configparser.ConfigParser()
+        self.exists = os.path.exists(self.path)
+        if self.exists:
+            parser.read(self.path, encoding='utf-8')
+        return {section: dict(parser.items(section)) for section in parser.sections()}
+
+    def snapshot(self):
+        with self._lock:
+            return SettingsSnapshot(self._values, self.defaults, self.version, self._warned)
+
+    def subscribe(self, callback, sections=None):
+        """订阅配置变化，callback(section, changed)在修改配置的线程中调用
+
+        Args:
+            callback: 回调函数，changed为发生变化的配置项集合
+            sections: 只关心的配置节，默认全部
+
+        Returns:
+            function: 取消订阅的函数
+        """
+        entry = (callback, None if sections is None else frozenset(sections))
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def update(self, section, values, persist=True):
+        """修改一个配置节中的若干配置项
+
+        Args:
+            values: {配置项: 值}，值按字符串保存（布尔值保存为true/false）
+            persist: 是否立即写回config.ini
+
+        Returns:
+            set: 发生变化的配置项
+
+        Raises:
+            OSError: 写回文件失败（内存中的配置已经更新）
+        """
+        texts = {option.lower(): (str(value).lower() if isinstance(value, bool) else str(value))
+                 for option, value in values.items()}
+        with self._lock:
+            current = self._values.get(section, {})
+            changed = {option for option, text in texts.items() if current.get(option) != text}
+            if not changed:
+                return changed
+            self._values = dict(self._values, **{section: dict(current, **texts)})
+            self.version += 1
+            subscribers = self._subscribers_of(section)
+            error = None
+            if persist:
+                try:
+                    self._write(self._values)
+                except OSError as e:
+                    error = e
+        for callback in subscribers:
+            callback(section, changed)
+        if error is not None:
+            raise error
+        return changed
+
+    def reload(self):
+        """重新读取config.ini（如在程序外修改后），按配置节通知订阅者
+
+        Returns:
+            dict: {配置节: 发生变化的配置项集合}，没有变化时为空
+        """
+        values = self._read()
+        with self._lock:
+            changes = {}
+            for section in self._values.keys() | values.keys():
+                old, new = self._values.get(section, {}), values.get(section, {})
+                changed = {option for option in old.keys() | new.keys() if old.get(option) != new.get(option)}
+                if changed:
+                    changes[section] = changed
+            if not changes:
+                return changes
+            self._values = values
+            self.version += 1
+            notify = [(callback, section, changed) for section, changed in changes.items()
+                      for callback in self._subscribers_of(section)]
+        for callback, section, changed in notify:
+            callback(section, changed)
+        return changes
+
+    def _subscribers_of(self, section):
+        return [callback for callback, sections in self._subscribers if sections is None or section in sections]
+
+    def persist(self):
+        """把当前配置写回config.ini"""
+        with self._lock:
+            self._write(self._values)
+
+    def _write(self, values):
+        # 先写临时文件再替换，写入中途退出不会留下损坏的配置文件
+        parser = configparser.ConfigParser()
+        parser.read_dict(values)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            parser.write(f)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+
+def read_layout_config(config):
+    """从配置对象的Layout节读取布局配置，缺失的项使用默认值"""
+    return {
+        "podium_seats": config.getint("Layout", "podium_seats", fallback=0),  # 讲台侧座位数
+        "main_rows": config.getint("Layout", "main_rows", fallback=6),  # 主体座位行数
+        "main_cols": config.getint("Layout", "main_cols", fallback=8),  # 主体座位列数
+        "class_name": config.get("Layout", "class_name", fallback=""),  # 班级名称
+        "teacher_name": config.get("Layout", "teacher_name", fallback="")  # 班主任姓名
+    }
+
+# ---------------------- SQLite多班级存储（可选） ----------------------
+class SQLiteSeatStore:
+    """以SQLite数据库保存多个班级的学生、布局与座位安排
+
+    使用WAL日志模式，其他进程读取数据（如查询、导出）时不会阻塞正在编辑的程序。
+    每个班级以固定的班级编号区分（班级名称可以修改、可以重名或为空），读写的数据结构与座位表JSON文件一致。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS classes (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            teacher_name TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_classes_name ON classes(name);
+        CREATE TABLE IF NOT EXISTS layouts (
+            class_id INTEGER PRIMARY KEY REFERENCES classes(id) ON DELETE CASCADE,
+            podium_seats INTEGER NOT NULL,
+            main_rows INTEGER NOT NULL,
+            main_cols INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY,
+            class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+            sort_order INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            gender TEXT,
+            height REAL,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_students_class ON students(class_id, sort_order);
+        CREATE INDEX IF NOT EXISTS idx_students_name ON students(name);
+        CREATE TABLE IF NOT EXISTS arrangements (
+            class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+            seat_row INTEGER NOT NULL,
+            seat_col INTEGER NOT NULL,
+            seat_index INTEGER NOT NULL,
+            student_name TEXT NOT NULL,
+            gender TEXT NOT NULL,
+            PRIMARY KEY (class_id, seat_row, seat_col)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_arrangements_student ON arrangements(student_name);
+        CREATE TABLE IF NOT EXISTS arrangement_sources (
+            class_id INTEGER PRIMARY KEY REFERENCES classes(id) ON DELETE CASCADE,
+            record TEXT NOT NULL
+        );
+    """
+
+    # 旧版数据库以班级名称为唯一键：重建classes表去掉唯一约束（班级编号不变，其他表的数据保留）
+    MIGRATE_CLASSES = """
+        PRAGMA foreign_keys=OFF;
+        BEGIN;
+        CREATE TABLE classes_new (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            teacher_name TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL
+        );
+        INSERT INTO classes_new (id, name, teacher_name, updated_at)
+            SELECT id, name, teacher_name, updated_at FROM classes;
+        DROP TABLE classes;
+        ALTER TABLE classes_new RENAME TO classes;
+        COMMIT;
+        PRAGMA foreign_keys=ON;
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'classes'").fetchone()
+        if row is not None and "UNIQUE" in row[0].upper():
+            self.conn.executescript(self.MIGRATE_CLASSES)
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def save_class(self, layout_config, seat_data, seat_index_map, students, arrangement=None, class_id=None):
+        """在一个事务中保存班级的布局、学生名单、座位安排及其来源记录（覆盖该班级的旧数据）
+
+        Args:
+            class_id: 班级编号，None表示新建班级；班级名称修改后仍更新同一个班级
+
+        Returns:
+            int: 班级编号
+        """
+        payload = build_save_payload(layout_config, seat_data, seat_index_map, students)
+        values = (layout_config.get("class_name", ""), layout_config.get("teacher_name", ""), time.time())
+        with self.conn:
+            updated = class_id is not None and self.conn.execute(
+                "UPDATE classes SET name = ?, teacher_name = ?, updated_at = ? WHERE id = ?", values + (class_id,)
+            ).rowcount
+            if not updated:
+                # 新建班级，或该班级已在其他窗口中删除（按原编号重新保存）
+                class_id = self.conn.execute(
+                    "INSERT INTO classes (id, name, teacher_name, updated_at) VALUES (?, ?, ?, ?)",
+                    (class_id,) + values
+                ).lastrowid
+            self.conn.execute(
+                "INSERT OR REPLACE INTO layouts (class_id, podium_seats, main_rows, main_cols) VALUES (?, ?, ?, ?)",
+                (class_id, layout_config["podium_seats"], layout_config["main_rows"], layout_config["main_cols"])
+            )
+            self.conn.execute("DELETE FROM students WHERE class_id = ?", (class_id,))
+            self.conn.executemany(
+                "INSERT INTO students (class_id, sort_order, name, gender, height, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (class_id, order, str(stu.get("姓名", "")), stu.get("性别"), self._to_float(stu.get("身高")),
+                     json.dumps({k: v for k, v in stu.items() if k not in ("姓名", "性别", "身高")},
+                                ensure_ascii=False, default=str))
+                    for order, stu in enumerate(payload["students"])
+                ]
+            )
+            self.conn.execute("DELETE FROM arrangements WHERE class_id = ?", (class_id,))
+            self.conn.executemany(
+                "INSERT INTO arrangements (class_id, seat_row, seat_col, seat_index, student_name, gender) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (class_id, pos[0], pos[1], seat_index_map.get(pos, 0), data["name"], data["gender"])
+                    for pos, data in seat_data.items()
+                ]
+            )
+            if arrangement is None:
+                self.conn.execute("DELETE FROM arrangement_sources WHERE class_id = ?", (class_id,))
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO arrangement_sources (class_id, record) VALUES (?, ?)",
+                    (class_id, json.dumps(arrangement, ensure_ascii=False))
+                )
+        return class_id
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def find_class(self, class_name):
+        """按班级名称查找班级编号（重名时取最近修改的班级），不存在时返回None"""
+        row = self.conn.execute(
+            "SELECT id FROM classes WHERE name = ? ORDER BY updated_at DESC LIMIT 1", (class_name,)).fetchone()
+        return row[0] if row else None
+
+    def load_class(self, class_id):
+        """读取班级数据，返回与座位表JSON文件相同结构的字典（另含class_id）；班级不存在时返回None"""
+        row = self.conn.execute("SELECT name, teacher_name FROM classes WHERE id = ?", (class_id,)).fetchone()
+        if row is None:
+            return None
+        class_name, teacher_name = row
+        layout = self.conn.execute(
+            "SELECT podium_seats, main_rows, main_cols FROM layouts WHERE class_id = ?", (class_id,)).fetchone()
+        if layout is None:
+            return None
+        layout_config = {
+            "podium_seats": layout[0],
+            "main_rows": layout[1],
+            "main_cols": layout[2],
+            "class_name": class_name,
+            "teacher_name": teacher_name
+        }
+        students = []
+        for name, gender, height, extra in self.conn.execute(
+                "SELECT name, gender, height, extra FROM students WHERE class_id = ? ORDER BY sort_order",
+                (class_id,)):
+            student = {"姓名": name, "性别": gender, "身高": height}
+            student.update(json.loads(extra))
+            students.append(student)
+        seat_data = {}
+        seat_index_map = {}
+        for row, col, seat_index, name, gender in self.conn.execute(
+                "SELECT seat_row, seat_col, seat_index, student_name, gender FROM arrangements WHERE class_id = ?",
+                (class_id,)):
+            seat_data[str((row, col))] = {"name": name, "gender": gender}
+            seat_index_map[str((row, col))] = seat_index
+        load_data = {
+            "class_id": class_id,
+            "layout_config": layout_config,
+            "seat_data": seat_data,
+            "seat_index_map": seat_index_map,
+            "students": students
+        }
+        source = self.conn.execute(
+            "SELECT record FROM arrangement_sources WHERE class_id = ?", (class_id,)).fetchone()
+        if source is not None:
+            load_data["arrangement"] = json.loads(source[0])
+        return load_data
+
+    def list_classes(self):
+        """返回所有班级的概要信息，按最近修改时间排序"""
+        rows = self.conn.execute(
+            "SELECT c.id, c.name, c.teacher_name, c.updated_at, "
+            "(SELECT COUNT(*) FROM students s WHERE s.class_id = c.id) "
+            "FROM classes c ORDER BY c.updated_at DESC"
+        ).fetchall()
+        return [
+            {"class_id": class_id, "class_name": name, "teacher_name": teacher, "updated_at": updated,
+             "student_count": count}
+            for class_id, name, teacher, updated, count in rows
+        ]
+
+    def find_student(self, name):
+        """跨班级按姓名查找学生当前的座位"""
+        rows = self.conn.execute(
+            "SELECT c.id, c.name, a.seat_index, a.seat_row, a.seat_col FROM arrangements a "
+            "JOIN classes c ON c.id = a.class_id WHERE a.student_name = ? ORDER BY c.name, c.id",
+            (name,)
+        ).fetchall()
+        return [
+            {"class_id": class_id, "class_name": class_name, "seat_index": seat_index, "pos": (row, col)}
+            for class_id, class_name, seat_index, row, col in rows
+        ]
+
+    def delete_class(self, class_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM classes WHERE id = ?", (class_id,))
+
+
 
 class StudentSeatTool:
-    def __init__(self, root):
+    # 座位数超过该值时改用虚拟化显示：只为可见区域创建座位按钮
+    VIRTUAL_SEAT_THRESHOLD = 300
+    # 虚拟化显示时每个座位格的像素大小、四周留白，以及可见区域外额外保留的格数
+    VIRTUAL_CELL_WIDTH = 80
+    VIRTUAL_CELL_HEIGHT = 68
+    VIRTUAL_PADDING = 20
+    VIRTUAL_MARGIN_CELLS = 2
+
+    def __init__(self, root, timeline=None):
         self.root = root
-        
-        # 读取配置文件
-        self.config = self.load_config()
+        # 启动时间线：记录各启动阶段的耗时
+        self.timeline = timeline or StartupTimeline()
+
+        with self.timeline.stage("读取配置"):
+            # 读取配置文件（只在启动时读取一次，之后从内存中读取）
+            self.settings = self.load_config()
+            # 可选的SQLite多班级存储（config.ini中[Storage] backend = sqlite时启用）
+            self.store = self.open_store()
+            # 配置变化时刷新界面（在修改配置的线程中回调，界面只在主线程中修改配置）
+            self.settings.subscribe(self.on_settings_changed, ("Export", "Color", "Workspace", "Storage"))
         
         # 设置应用基本参数（硬编码默认值）
         self.root.title("学生座位表调整工具 v1.0 By:侯小圣")
@@ -51,25 +3725,46 @@ class StudentSeatTool:
         self.root.resizable(False, False)
 
         # 布局配置（从配置文件读取值）
-        self.layout_config = {
-            "podium_seats": self.config.getint("Layout", "podium_seats", fallback=0),  # 讲台侧座位数
-            "main_rows": self.config.getint("Layout", "main_rows", fallback=6),  # 主体座位行数
-            "main_cols": self.config.getint("Layout", "main_cols", fallback=8),  # 主体座位列数
-            "class_name": self.config.get("Layout", "class_name", fallback=""),  # 班级名称
-            "teacher_name": self.config.get("Layout", "teacher_name", fallback="")  # 班主任姓名
-        }
+        self.layout_config = read_layout_config(self.settings)
         self.seat_positions = []  # 动态生成的座位坐标
         self.seat_index_map = {}  # 座位编号映射
-        # 性别颜色（改进的配色方案，更加柔和美观）
-        self.gender_color = {
-            "男": "#64B5F6",  # 柔和的蓝色
-            "女": "#FFB7C5",  # 柔和的粉色
-            "空": "#E8EAF6"   # 柔和的灰色
-        }
+        # 性别颜色（界面与Excel导出共用）
+        self.gender_color = dict(GENDER_COLORS)
         self.students = []
         self.seat_data = {}
+        # 当前座位表的排座来源记录（指纹、方式、种子），用于审核和重新生成
+        self.arrangement_record = None
+        # 当前班级在SQLite存储中的编号（班级名称可以修改，数据库按编号保存），新班级第一次保存前为None
+        self.class_id = None
+        # 运行自定义排座策略的独立进程（第一次使用时启动）
+        self.strategy_worker = StrategyWorker(os.path.join(get_base_dir(), STRATEGY_DIR_NAME))
         self.drag_source = None
         self.seat_buttons = {}
+        # Ctrl+单击选中的座位（用于整组移动）
+        self.selected_seats = set()
+        # 虚拟化显示状态，普通布局时为None
+        self.virtual_view = None
+        self._viewport_update_pending = False
+        # 待重绘的座位（空闲时统一刷新），_redraw_all表示需要刷新全部座位
+        self._dirty_seats = set()
+        self._redraw_all = False
+        self._redraw_pending = False
+        # 排座质量指标（随座位变化增量更新），学生名单变化时重建
+        self.metrics = None
+        self._metrics_students_key = None
+        # 座位约束检查（随座位变化增量更新），学生名单变化时重建；_constraint_notice为刚拖动产生的冲突
+        self.constraint_checker = None
+        self._constraint_students_key = None
+        self._constraint_notice = ""
+        # 插班/离班用的身高插入位置索引和候补学生（随座位变化增量更新），第一次插班/离班时建立
+        self.repair_index = None
+        self._repair_students_key = None
+        # 视线遮挡叠加显示：座位坐标到遮挡量（cm）的映射，关闭叠加显示时为空
+        self.occlusion = {}
+        # 撤销/重做历史
+        self.history = SeatHistory()
+        # 启动时存档尚未读取完成，此期间不自动保存，避免覆盖存档
+        self.restoring = True
         
         # 创建ttk样式，用于实现圆角效果
         self.style = ttk.Style()
@@ -84,39 +3779,54 @@ class StudentSeatTool:
         self.style.configure("RoundedFrame.TLabelframe", 
                              background="#f8f8f8")
 
-        # 构建UI
-        self.create_header()
-        self.create_toolbar()
-        self.create_seat_container()
-        # 初始化座位布局
-        self.generate_seat_positions()
-        # 程序启动时自动尝试读取数据文件
-        self.auto_load_data()
+        # 构建UI（座位按钮在存档读取完成后一次性创建）
+        with self.timeline.stage("构建界面"):
+            self.create_menu()
+            self.create_header()
+            self.create_toolbar()
+            self.create_class_tabs()
+            self.create_seat_container()
+        # 工作区：打开的班级（标签页）及保留界面的班级（按最近使用排序）
+        self.session = ClassSession()
+        self.sessions = [self.session]
+        self.view_lru = OrderedDict([(self.session, True)])
+        self.add_session_tab(self.session)
+        # 先显示窗口，存档在后台线程读取解析
+        self.seat_positions = build_seat_positions(self.layout_config)
+        self.seat_index_map = {pos: idx + 1 for idx, pos in enumerate(self.seat_positions)}
+        self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
+        tk.Label(
+            self.seat_frame, text="正在加载座位表…", font=("微软雅黑", 12), fg="#888888"
+        ).grid(row=0, column=0, padx=40, pady=40)
+        self.update_seat_frame_title()
+        self.root.after_idle(lambda: self.timeline.mark("窗口显示"))
+        self.start_session_restore()
+        # 自定义排座策略在策略进程中读取，读取完成后加入排座策略菜单
+        self.root.after_idle(self.load_custom_strategies)
 
     def load_config(self):
-        """加载配置文件，仅读取班级信息和座位行列配置"""
-        config = configparser.ConfigParser()
-        
-        # 获取程序运行时的基础目录（考虑PyInstaller单文件打包情况）
-        if hasattr(sys, '_MEIPASS'):
-            # 打包后的临时目录
-            base_dir = os.path.dirname(os.path.abspath(sys.executable))
-        else:
-            # 正常运行时的目录
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            
-        config_file = os.path.join(base_dir, "config.ini")
-        
-        # 如果配置文件存在，读取配置
-        if os.path.exists(config_file):
-            config.read(config_file, encoding='utf-8')
-        else:
-            # 如果配置文件不存在，创建默认配置
-            self.create_default_config(config, config_file)
-        
-        return config
-        
-    def parse_tuple_str(self, tuple_str):
+        """加载配置文件，不存在时创建默认配置"""
+        settings = SettingsService(os.path.join(get_base_dir(), "config.ini"))
+        if not settings.exists:
+            try:
+                settings.update("Layout", SETTINGS_DEFAULTS["Layout"])
+            except OSError as e:
+                print(f"创建默认配置文件失败：{str(e)}")
+        return settings
+
+    def open_store(self):
+        """按配置打开SQLite存储，未启用或打开失败时返回None（使用JSON文件保存）"""
+        if self.settings.get("Storage", "backend").lower() != "sqlite":
+            return None
+        db_path = os.path.join(get_base_dir(), self.settings.get("Storage", "path"))
+        try:
+            return SQLiteSeatStore(db_path)
+        except sqlite3.Error as e:
+            print(f"打开SQLite数据库失败，改用JSON文件保存：{str(e)}")
+            return None
+
+    @staticmethod
+    def parse_tuple_str(tuple_str):
         """安全地将元组字符串转换为元组
         
         Args:
@@ -136,20 +3846,62 @@ class StudentSeatTool:
             print(f"解析元组时出错: {e}")
             return None
     
-    def create_default_config(self, config, config_file):
-        """创建默认配置文件，仅包含班级信息和座位行列配置"""
-        config['Layout'] = {
-            'class_name': '',
-            'teacher_name': '',
-            'podium_seats': '0',
-            'main_rows': '6',
-            'main_cols': '8'
-        }
-        
-        # 保存配置文件
-        with open(config_file, 'w', encoding='utf-8') as f:
-            config.write(f)
-    
+    def create_menu(self):
+        """菜单栏（工具栏放不下的功能放在菜单中）"""
+        self.menubar = tk.Menu(self.root)
+        self.edit_menu = tk.Menu(self.menubar, tearoff=0)
+        self.edit_menu.add_command(label="撤销", accelerator="Ctrl+Z", command=self.undo)
+        self.edit_menu.add_command(label="重做", accelerator="Ctrl+Y", command=self.redo)
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label="排座来源…", command=self.show_arrangement_record)
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label="导出标题设置…", command=self.open_export_settings)
+        self.edit_menu.add_command(label="重新读取config.ini", command=self.reload_settings)
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label="关闭当前班级标签页", accelerator="Ctrl+W",
+                                   command=lambda: self.close_session(self.session))
+        self.menubar.add_cascade(label="编辑", menu=self.edit_menu)
+
+        # 整体调整：每项操作只重排一次、刷新一次、保存一次
+        self.arrange_menu = tk.Menu(self.menubar, tearoff=0)
+        self.arrange_menu.add_command(label="交换两排…", command=lambda: self.ask_grid_operation("swap_rows"))
+        self.arrange_menu.add_command(label="交换两列…", command=lambda: self.ask_grid_operation("swap_cols"))
+        self.arrange_menu.add_command(label="前后轮换…", command=lambda: self.ask_grid_operation("shift_rows"))
+        self.arrange_menu.add_command(label="左右轮换…", command=lambda: self.ask_grid_operation("shift_cols"))
+        self.arrange_menu.add_command(label="左右镜像", command=lambda: self.apply_grid_operation("mirror"))
+        self.arrange_menu.add_command(label="旋转180°", command=lambda: self.apply_grid_operation("rotate"))
+        self.arrange_menu.add_separator()
+        self.arrange_menu.add_command(label="移动选中座位…（Ctrl+单击选择）", command=self.move_selected_seats)
+        self.arrange_menu.add_command(label="取消选择", command=self.clear_seat_selection)
+        self.arrange_menu.add_separator()
+        self.arrange_menu.add_command(label="座位约束…", command=self.edit_constraints)
+        self.menubar.add_cascade(label="座位调整", menu=self.arrange_menu)
+
+        # 排座策略：内置策略与策略文件夹中的自定义策略
+        self.strategy_menu = tk.Menu(self.menubar, tearoff=0)
+        self.fill_strategy_menu()
+        self.menubar.add_cascade(label="排座策略", menu=self.strategy_menu)
+
+        self.export_menu = tk.Menu(self.menubar, tearoff=0)
+        self.export_menu.add_command(label="导出PDF…", command=self.export_pdf)
+        self.export_menu.add_command(label="导出Word…", command=self.export_layout_to_word)
+        self.export_menu.add_command(label="导出图片…", command=self.export_image)
+        self.export_menu.add_command(label="导出网页…", command=self.export_html)
+        self.export_menu.add_command(label="导出SVG…", command=self.export_svg)
+        self.export_menu.add_command(label="导出Excel…", command=self.export_xlsx)
+        self.export_menu.add_separator()
+        self.export_menu.add_command(label="全部导出…", command=self.export_all)
+        if self.store is not None:
+            self.export_menu.add_command(label="导出所有班级网页…", command=self.export_class_portal)
+            self.export_menu.add_command(label="导出所有班级Excel…", command=self.export_class_workbook)
+        self.menubar.add_cascade(label="导出", menu=self.export_menu)
+        self.root.config(menu=self.menubar)
+
+        self.root.bind("<Control-w>", lambda e: self.close_session(self.session))
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-Shift-Z>", lambda e: self.redo())
+
     def create_header(self):
         # 改进的标题栏设计
         header_frame = tk.Frame(self.root, bg="#2196F3", height=65, bd=0, relief=tk.FLAT)
@@ -165,6 +3917,31 @@ class StudentSeatTool:
             font=("微软雅黑", 21, "bold"), fg="white", bg="#2196F3"
         ).pack(pady=10, side=tk.LEFT, padx=15)
 
+        # 导出文件使用的标题（随导出标题设置更新）
+        self.export_title_label = tk.Label(header_frame, font=("微软雅黑", 11), bg="#BBDEFB", padx=8)
+        self.export_title_label.pack(pady=18, side=tk.RIGHT, padx=15)
+        self.update_export_title_label()
+
+    def update_export_title_label(self):
+        """在标题栏右侧按当前配置显示导出标题（字间空格与标题颜色同导出文件）"""
+        scene = {"title": self.settings.get("Export", "main_title"),
+                 "title_spacing": self.settings.getint("Export", "title_space_count")}
+        self.export_title_label.config(text=f"导出标题：{spaced_title(scene)}")
+        try:
+            self.export_title_label.config(fg=self.settings.get("Color", "title_text_color"))
+        except tk.TclError:
+            # 颜色写法与PDF等导出不同、界面无法识别时使用默认颜色
+            self.export_title_label.config(fg="black")
+
+    def on_settings_changed(self, section, changed):
+        """配置变化时刷新依赖该配置的界面"""
+        if section in ("Export", "Color"):
+            self.update_export_title_label()
+        elif section == "Workspace":
+            self.trim_views()
+        elif section == "Storage":
+            messagebox.showinfo("提示", "存储方式的修改将在重新启动程序后生效")
+
     def create_toolbar(self):
         toolbar_frame = tk.Frame(self.root, bg="#f5f5f5", padx=8, pady=4)
         toolbar_frame.pack(fill=tk.X, anchor="n")
@@ -205,6 +3982,12 @@ class StudentSeatTool:
         )
         self.score_btn.pack(side=tk.LEFT, padx=3)
 
+        self.candidates_btn = tk.Button(
+            arrange_frame, text="多方案比较", bg="#00BCD4", fg="white",
+            font=("微软雅黑", 11), padx=10, pady=4, relief=tk.RAISED, bd=2, command=self.open_candidates_window
+        )
+        self.candidates_btn.pack(side=tk.LEFT, padx=3)
+
         # 分隔线
         tk.Frame(left_frame, width=2, bg="#ddd").pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=2)
 
@@ -259,32 +4042,51 @@ class StudentSeatTool:
         )
         self.layout_btn.pack(side=tk.RIGHT, padx=3)
 
+        # 启用SQLite多班级存储时显示班级管理按钮
+        if self.store is not None:
+            self.class_btn = tk.Button(
+                right_frame, text="班级管理", bg="#607D8B", fg="white",
+                font=("微软雅黑", 11), padx=12, pady=4, relief=tk.RAISED, bd=2, command=self.open_class_window
+            )
+            self.class_btn.pack(side=tk.RIGHT, padx=3)
+
     def create_seat_container(self):
         # 创建外层容器，用于放置滚动条和座位框架
         self.seat_outer_container = tk.Frame(self.root, bg="#f8f8f8")
         self.seat_outer_container.pack(fill=tk.BOTH, expand=True, padx=8, pady=4)
 
         # 创建水平滚动条
-        h_scrollbar = tk.Scrollbar(self.seat_outer_container, orient=tk.HORIZONTAL)
-        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.h_scrollbar = tk.Scrollbar(self.seat_outer_container, orient=tk.HORIZONTAL)
+        self.h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
 
         # 创建垂直滚动条
-        v_scrollbar = tk.Scrollbar(self.seat_outer_container, orient=tk.VERTICAL)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.v_scrollbar = tk.Scrollbar(self.seat_outer_container, orient=tk.VERTICAL)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # 右侧排座质量指标栏
+        self.create_metrics_panel(self.seat_outer_container)
+
+        # 配置滚动条与画布的关联（滚动后更新虚拟化显示的可见座位），滚动的总是当前班级的画布
+        self.h_scrollbar.config(command=self._on_xscroll)
+        self.v_scrollbar.config(command=self._on_yscroll)
+
+        self.create_seat_canvas()
+
+        # 使画布可以通过鼠标滚轮滚动
+        self.seat_canvas.bind_all("<MouseWheel>", self._on_mousewheel)
 
-        # 创建画布，用于放置座位框架并支持滚动
+    def create_seat_canvas(self):
+        """创建当前班级的座位画布和座位框架，每个保留界面的班级各有一个画布"""
         self.seat_canvas = tk.Canvas(
             self.seat_outer_container, 
             bg="#f8f8f8",
-            xscrollcommand=h_scrollbar.set,
-            yscrollcommand=v_scrollbar.set,
+            xscrollcommand=self.h_scrollbar.set,
+            yscrollcommand=self.v_scrollbar.set,
             highlightthickness=0
         )
         self.seat_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # 配置滚动条与画布的关联
-        h_scrollbar.config(command=self.seat_canvas.xview)
-        v_scrollbar.config(command=self.seat_canvas.yview)
+        self.seat_buttons = {}
+        self.virtual_view = None
 
         # 创建座位框架，作为画布的子组件
         # 使用普通的tk.Frame替代ttk.LabelFrame，避免样式问题
@@ -296,7 +4098,7 @@ class StudentSeatTool:
         )
         
         # 将座位框架添加到画布中，并使其居中显示
-        self.seat_canvas.create_window((0, 0), window=self.seat_frame, anchor="nw")
+        self.seat_frame_window = self.seat_canvas.create_window((0, 0), window=self.seat_frame, anchor="nw")
         
         # 绑定大小变化事件，确保画布能够正确调整滚动区域
         self.seat_frame.bind("<Configure>", self.on_seat_frame_configure)
@@ -304,15 +4106,23 @@ class StudentSeatTool:
         # 绑定画布大小变化事件，确保座位框架始终居中
         self.seat_canvas.bind("<Configure>", self.on_canvas_configure)
         
-        # 使画布可以通过鼠标滚轮滚动
-        self.seat_canvas.bind_all("<MouseWheel>", self._on_mousewheel)
-        
     def on_seat_frame_configure(self, event):
         """调整画布的滚动区域以适应座位框架的大小"""
+        if event.widget is not self.seat_frame:
+            # 其他班级（已隐藏）的座位框架
+            return
+        if self.virtual_view is not None:
+            # 虚拟化显示时滚动区域按整个座位网格计算
+            return
         self.seat_canvas.configure(scrollregion=self.seat_canvas.bbox("all"))
     
     def on_canvas_configure(self, event):
         """确保座位框架在画布中居中显示"""
+        if event.widget is not self.seat_canvas:
+            return
+        if self.virtual_view is not None:
+            self.schedule_viewport_update()
+            return
         # 获取画布和座位框架的尺寸
         canvas_width = event.width
         seat_frame_width = self.seat_frame.winfo_width()
@@ -321,13 +4131,22 @@ class StudentSeatTool:
         x_pos = max(0, (canvas_width - seat_frame_width) // 2)
         
         # 更新座位框架在画布中的位置
-        self.seat_canvas.coords(1, x_pos, 0)  # 1是create_window返回的ID
+        self.seat_canvas.coords(self.seat_frame_window, x_pos, 0)
         
     def _on_mousewheel(self, event):
         """处理鼠标滚轮事件，实现垂直滚动"""
         self.seat_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.schedule_viewport_update()
         # 阻止事件传播，避免影响其他控件
         return "break"
+
+    def _on_xscroll(self, *args):
+        self.seat_canvas.xview(*args)
+        self.schedule_viewport_update()
+
+    def _on_yscroll(self, *args):
+        self.seat_canvas.yview(*args)
+        self.schedule_viewport_update()
     
     def lighten_color(self, color, percent):
         """将颜色调亮指定百分比"""
@@ -384,22 +4203,81 @@ class StudentSeatTool:
             command=lambda: self.apply_layout(layout_win)
         ).grid(row=5, column=0, columnspan=2, pady=10)
 
+    def open_export_settings(self):
+        """修改导出文件的标题、字间空格数和标题颜色（保存到config.ini，界面随之刷新）"""
+        win = tk.Toplevel(self.root)
+        win.title("导出标题设置")
+        win.resizable(False, False)
+        fields = [
+            ("Export", "main_title", "标题："),
+            ("Export", "title_space_count", "字间空格数："),
+            ("Color", "title_text_color", "标题颜色："),
+            ("Color", "title_underline_color", "下划线颜色："),
+        ]
+        entries = {}
+        for row, (section, option, label) in enumerate(fields):
+            tk.Label(win, text=label, font=("微软雅黑", 10)).grid(row=row, column=0, padx=10, pady=8, sticky="w")
+            entry = ttk.Entry(win, width=20)
+            entry.grid(row=row, column=1, padx=10, pady=8, sticky="w")
+            entry.insert(0, str(self.settings.get(section, option)))
+            entries[section, option] = entry
+
+        def apply():
+            values = {key: entry.get().strip() for key, entry in entries.items()}
+            if not values["Export", "main_title"]:
+                messagebox.showerror("错误", "标题不能为空", parent=win)
+                return
+            try:
+                if int(values["Export", "title_space_count"]) < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "字间空格数需为≥0的整数", parent=win)
+                return
+            try:
+                for section in ("Export", "Color"):
+                    self.settings.update(section, {option: value for (sec, option), value in values.items()
+                                                   if sec == section})
+            except OSError as e:
+                messagebox.showerror("错误", f"配置文件保存失败：{str(e)}", parent=win)
+            win.destroy()
+
+        ttk.Button(win, text="确认设置", command=apply).grid(row=len(fields), column=0, columnspan=2, pady=10)
+
+    def reload_settings(self):
+        """重新读取在程序外修改的config.ini（布局以当前班级为准，不从文件恢复）"""
+        try:
+            changes = self.settings.reload()
+        except configparser.Error as e:
+            messagebox.showerror("错误", f"配置文件格式错误：{str(e)}")
+            return
+        if "Layout" in changes:
+            # 布局属于当前班级，写回当前班级的布局
+            self.persist_layout()
+        sections = [section for section in changes if section != "Layout"]
+        messagebox.showinfo("提示", f"已重新读取配置：{'、'.join(sections)}发生变化" if sections else "配置没有变化")
+
     def save_config(self):
         """保存配置到config.ini文件"""
-        config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
-        config = configparser.ConfigParser()
-        config['Layout'] = {
-            'class_name': self.layout_config['class_name'],
-            'teacher_name': self.layout_config['teacher_name'],
-            'podium_seats': str(self.layout_config['podium_seats']),
-            'main_rows': str(self.layout_config['main_rows']),
-            'main_cols': str(self.layout_config['main_cols'])
-        }
-        with open(config_file, 'w', encoding='utf-8') as f:
-            config.write(f)
+        self.persist_layout()
         # 配置更改后也自动保存座位数据
         self.auto_save_data()
     
+    def persist_layout(self):
+        """把当前班级的布局写入config.ini的Layout节（保留Storage等其他配置节），下次启动时打开该班级
+
+        使用JSON文件保存时只记录默认班级的布局，从其他文件打开的班级不影响启动时恢复的座位表。
+        """
+        if self.store is None and self.session.file_path is not None:
+            return
+        values = self.layout_config
+        if self.store is not None:
+            # 同时记录班级编号，重名或改名的班级也能在启动时找到
+            values = dict(values, class_id="" if self.class_id is None else self.class_id)
+        try:
+            self.settings.update("Layout", values)
+        except OSError as e:
+            messagebox.showerror("错误", f"配置文件保存失败：{str(e)}")
+
     def apply_layout(self, layout_win):
         try:
             podium_seats = int(self.podium_entry.get())
@@ -416,6 +4294,7 @@ class StudentSeatTool:
         class_name = self.class_entry.get().strip()
         teacher_name = self.teacher_entry.get().strip()
 
+        old_config = self.layout_config
         self.layout_config = {
             "podium_seats": podium_seats,
             "main_rows": main_rows,
@@ -423,52 +4302,189 @@ class StudentSeatTool:
             "class_name": class_name,
             "teacher_name": teacher_name
         }
-        
-        # 保存配置到config.ini
+
+        # 按相对位置迁移已有座位安排，避免调整布局后需要重新排座
+        migrated, unplaced = migrate_seat_data(
+            old_config, self.seat_data, self.layout_config, build_seat_positions(self.layout_config)
+        )
+        self.history.push(HistoryEntry("调整布局", layout=(
+            old_config, self.layout_config, occupied_seats(self.seat_data), occupied_seats(migrated)
+        ), arrangement=self.mark_arrangement_adjusted()))
+        self.generate_seat_positions(migrated)
+
+        # 保存配置到config.ini（同时自动保存迁移后的座位数据）
         self.save_config()
-        
-        self.generate_seat_positions()
         layout_win.destroy()
+        if unplaced:
+            messagebox.showwarning(
+                "提示", f"新布局座位不足，{len(unplaced)}名学生未安排座位：\n"
+                + "、".join(entry["name"] for entry in unplaced)
+            )
+        self.update_seat_frame_title()
+
+    def update_seat_frame_title(self):
         self.seat_frame.config(
-            text=f"教室座位布局（讲台侧{podium_seats}个座位 + {main_rows}×{main_cols}座位）"
+            text=f"教室座位布局（讲台侧{self.layout_config['podium_seats']}个座位 + "
+                 f"{self.layout_config['main_rows']}×{self.layout_config['main_cols']}座位）"
         )
-    def generate_seat_positions(self):
-        self.seat_positions = []
-        main_cols = self.layout_config["main_cols"]
-        podium_seats = self.layout_config["podium_seats"]
-        main_rows = self.layout_config["main_rows"]
-        # 计算总宽度与讲台参数 - 讲台独立居中，不与座位列对齐
-        total_width = max(main_cols, 4)  # 增加最小宽度以适应2格讲台
-        podium_width = 2  # 讲台固定占用2格
-        podium_start_col = (total_width - podium_width + 1) // 2  # 讲台始终居中，不考虑座位列
-        podium_row = main_rows + 1  # 讲台行位置（教师视角：讲台在下方）
-
-        # 1. 讲台侧座位（若数量>0则生成）- 围绕讲台左右排列
-        # 教师视角：讲台侧座位位于讲台同一行的左右两侧
-        if podium_seats > 0:
-            # 计算左侧和右侧座位数
-            left_seats = podium_seats // 2
-            right_seats = podium_seats - left_seats
-            
-            # 左侧座位（从教师视角看是左侧，位于讲台左边）
-            for i in range(left_seats):
-                self.seat_positions.append((podium_row, podium_start_col - (left_seats - i)))
-            
-            # 右侧座位（从教师视角看是右侧，位于讲台右边）
-            for i in range(right_seats):
-                self.seat_positions.append((podium_row, podium_start_col + podium_width + i))
-
-        # 2. 主体座位 - 教师视角：左下角为起始号
-        # 从下往上遍历行，从左到右遍历列，确保左下角座位先被添加（起始号）
-        start_col = (total_width - main_cols) // 2
-        for r in range(self.layout_config["main_rows"], 0, -1):
-            # 从左到右遍历列（教师视角）
-            for c in range(start_col, start_col + main_cols):
-                self.seat_positions.append((r, c))
+        # 班级名称可能已修改，同时更新标签页标题
+        self.class_tabs.tab(self.session.tab, text=self.session_title(self.session))
+
+    # ---------------------- 多班级标签页 ----------------------
+    def create_class_tabs(self):
+        """座位区上方的班级标签页，每个打开的班级一个标签"""
+        self.class_tabs = ttk.Notebook(self.root)
+        self.class_tabs.pack(fill=tk.X, padx=8, pady=(4, 0))
+        self.class_tabs.bind("<<NotebookTabChanged>>", self.on_class_tab_changed)
+
+    def add_session_tab(self, session):
+        # 标签页只用作切换按钮，座位画布不放在标签页里（界面被释放的班级没有画布）
+        session.tab = tk.Frame(self.class_tabs, height=0)
+        self.class_tabs.add(session.tab, text=self.session_title(session))
+
+    def session_value(self, session, field):
+        """读取某个班级的数据：当前班级的数据在本对象的属性上，其他班级的在会话中"""
+        return getattr(self, field) if session is self.session else session.model[field]
+
+    def session_title(self, session):
+        layout_config = self.session_value(session, "layout_config")
+        if layout_config["class_name"]:
+            return layout_config["class_name"]
+        if session.file_path:
+            return os.path.splitext(os.path.basename(session.file_path))[0]
+        return "未命名班级"
+
+    def on_class_tab_changed(self, event):
+        selected = self.class_tabs.select()
+        for session in self.sessions:
+            if str(session.tab) == selected:
+                self.activate_session(session)
+                return
+
+    def open_session(self, session):
+        """新开一个班级标签页并切换到该班级"""
+        self.sessions.append(session)
+        self.add_session_tab(session)
+        self.activate_session(session)
+
+    def activate_session(self, session):
+        """切换到另一个班级：界面仍保留时直接显示，已释放时重新创建"""
+        if session is self.session:
+            return
+        # 当前班级尚未刷新的座位先刷新，再把数据和界面存回会话
+        if self._redraw_pending:
+            self.flush_seat_redraw()
+        current = self.session
+        current.model = {field: getattr(self, field) for field in ClassSession.MODEL_FIELDS}
+        current.view = {field: getattr(self, field) for field in ClassSession.VIEW_FIELDS}
+        self.seat_canvas.pack_forget()
+
+        self.session = session
+        for field in ClassSession.MODEL_FIELDS:
+            setattr(self, field, session.model[field])
+        session.model = {}
+        self.drag_source = None
+        if session.view is None:
+            self.create_seat_canvas()
+            self.refresh_seat_buttons()
+        else:
+            for field in ClassSession.VIEW_FIELDS:
+                setattr(self, field, session.view[field])
+            self.seat_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            self.h_scrollbar.set(*self.seat_canvas.xview())
+            self.v_scrollbar.set(*self.seat_canvas.yview())
+            if self.occlusion and not self.show_occlusion.get():
+                # 该班级隐藏期间关闭了视线遮挡显示
+                self.occlusion = {}
+                self.mark_seats_dirty()
+            else:
+                # 界面与数据一致，只需刷新指标栏（开启遮挡显示时只重绘遮挡量变化的座位）
+                self.mark_seats_dirty([])
+
+        # 最近使用的班级排在最后，超出上限时释放最久未使用的班级的界面
+        self.view_lru[session] = True
+        self.view_lru.move_to_end(session)
+        self.trim_views()
+
+        self.class_tabs.select(session.tab)
+        self.update_seat_frame_title()
+        self.persist_layout()
+
+    def trim_views(self):
+        """保留界面的班级超出[Workspace] max_views时，释放最久未使用的班级的界面（当前班级除外）"""
+        limit = max(1, self.settings.getint("Workspace", "max_views"))
+        while len(self.view_lru) > limit:
+            self.release_view(next(iter(self.view_lru)))
+
+    def release_view(self, session):
+        """销毁一个（非当前）班级的座位画布及其上的全部控件，数据保留"""
+        self.view_lru.pop(session, None)
+        if session.view is not None:
+            session.view["seat_canvas"].destroy()
+            session.view = None
+
+    def close_session(self, session):
+        """关闭一个班级标签页（至少保留一个）"""
+        if len(self.sessions) == 1:
+            return
+        if session is self.session:
+            self.auto_save_data()
+            index = self.sessions.index(session)
+            self.activate_session(self.sessions[index - 1] if index > 0 else self.sessions[1])
+        self.release_view(session)
+        self.class_tabs.forget(session.tab)
+        session.tab.destroy()
+        self.sessions.remove(session)
 
+    def find_session(self, class_id=None, file_path=None):
+        """按班级编号（SQLite存储）或保存文件路径查找已打开的班级"""
+        for session in self.sessions:
+            if class_id is not None and self.session_value(session, "class_id") == class_id:
+                return session
+            if file_path is not None and same_path(self.session_file(session), file_path):
+                return session
+        return None
+
+    def session_file(self, session):
+        """使用JSON文件保存时班级的自动保存文件"""
+        return session.file_path or os.path.join(get_base_dir(), "座位表数据.json")
+
+    def session_from_payload(self, load_data, file_path=None):
+        """由保存的数据（build_save_payload的结构）创建班级会话"""
+        layout_config = load_data["layout_config"]
+        seat_data = {}
+        seat_index_map = {}
+        for pos_str, data in load_data["seat_data"].items():
+            pos = self.parse_tuple_str(pos_str)
+            if pos:
+                seat_data[pos] = data
+        for pos_str, idx in load_data["seat_index_map"].items():
+            pos = self.parse_tuple_str(pos_str)
+            if pos:
+                seat_index_map[pos] = idx
+        # 仅在索引映射有效时使用
+        if not all(pos in seat_index_map for pos in build_seat_positions(layout_config)):
+            seat_index_map = None
+        return ClassSession(ClassSession.new_model(
+            layout_config, seat_data, seat_index_map, load_data["students"], load_data.get("arrangement"),
+            load_data.get("class_id")
+        ), file_path)
+
+    def generate_seat_positions(self, seat_data=None, seat_index_map=None):
+        """按当前布局配置生成座位坐标并重建座位按钮
+
+        Args:
+            seat_data: 迁移后的座位数据，默认所有座位为空
+            seat_index_map: 存档中的座位编号映射，默认按座位顺序编号
+        """
+        self.seat_positions = build_seat_positions(self.layout_config)
         # 座位编号映射
-        self.seat_index_map = {pos: idx + 1 for idx, pos in enumerate(self.seat_positions)}
-        self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
+        self.seat_index_map = seat_index_map or {pos: idx + 1 for idx, pos in enumerate(self.seat_positions)}
+        if seat_data is None:
+            seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
+        self.seat_data = seat_data
+        # 布局重建后原先选中的座位不再有效
+        self.selected_seats = set()
         self.refresh_seat_buttons()
 
     def refresh_seat_buttons(self):
@@ -476,6 +4492,11 @@ class StudentSeatTool:
         for widget in self.seat_frame.winfo_children():
             widget.destroy()
 
+        if len(self.seat_positions) > self.VIRTUAL_SEAT_THRESHOLD:
+            self.build_virtual_seats()
+            return
+        self.clear_virtual_seats()
+
         main_cols = self.layout_config["main_cols"]
         podium_seats = self.layout_config["podium_seats"]
         main_rows = self.layout_config["main_rows"]
@@ -538,17 +4559,12 @@ class StudentSeatTool:
         self.seat_buttons = {}
         for pos in self.seat_positions:
             r, c = pos
-            seat_idx = self.seat_index_map[pos]
-            student_info = self.seat_data[pos]
-            
-            # 创建座位按钮 - 原始版本
+            # 创建座位按钮，文字和颜色在空闲重绘时统一设置
             btn = tk.Button(
                 self.seat_frame, 
-                text=f"{seat_idx}\n{student_info['name']}",
                 width=7,  # 原始宽度设置
                 height=3,  # 原始高度设置
                 font=('微软雅黑', 9, 'bold'),  # 原始字体大小
-                bg=self.gender_color[student_info['gender']],  # 原始颜色设置
                 fg="#333333",
                 relief=tk.FLAT,  # 原始边框样式
                 bd=1,
@@ -556,7 +4572,7 @@ class StudentSeatTool:
             )
             
             # 使用原始的grid布局设置
-            btn.grid(row=r, column=c, padx=5, pady=3)
+            btn.grid(row=r, column=c, padx=10, pady=8)
             
             # 存储位置信息
             btn.pos_info = pos
@@ -566,52 +4582,196 @@ class StudentSeatTool:
             btn.bind("<Button-1>", lambda e, p=pos: self.on_drag_start(e, p))
             btn.bind("<B1-Motion>", lambda e, p=pos: self.on_drag_motion(e, p))
             btn.bind("<ButtonRelease-1>", lambda e, p=pos: self.on_drag_end(e, p))
+            # Ctrl+单击多选座位
+            btn.bind("<Control-Button-1>", lambda e, p=pos: self.toggle_seat_selection(p))
+            # 右键菜单：学生离开 / 插班生
+            btn.bind("<Button-3>", lambda e, p=pos: self.show_seat_menu(e, p))
             
             # 鼠标悬停效果 - 恢复原始功能
             btn.bind("<Enter>", lambda e: e.widget.config(bg=self.lighten_color(e.widget.cget("bg"), 0.1)))
-            btn.bind("<Leave>", lambda e: e.widget.config(bg=self.gender_color[student_info['gender']]))
+            btn.bind("<Leave>", lambda e, p=pos: e.widget.config(bg=self.gender_color[self.seat_data[p]["gender"]]))
+
+        # 新建的按钮在空闲时统一绘制一次，此前登记的待重绘座位一并处理
+        self.mark_seats_dirty()
+
+    # ---------------------- 大型布局虚拟化显示 ----------------------
+    def build_virtual_seats(self):
+        """大型布局不创建全部座位按钮，只为可见区域（及边缘若干格）创建，并随滚动循环复用"""
+        canvas = self.seat_canvas
+        # 隐藏普通布局使用的座位框架，讲台和班级信息直接画在画布上
+        canvas.itemconfigure(self.seat_frame_window, state="hidden")
+        canvas.delete("virtual_static")
+        pool = []
+        if self.virtual_view is not None:
+            pool = self.virtual_view["pool"]
+            for wid, btn in self.virtual_view["active"].values():
+                canvas.itemconfigure(wid, state="hidden")
+                pool.append((wid, btn))
+
+        main_rows = self.layout_config["main_rows"]
+        main_cols = self.layout_config["main_cols"]
+        min_col = min(0, min(c for _, c in self.seat_positions))
+        max_col = max(max(main_cols, 4) - 1, max(c for _, c in self.seat_positions))
+        self.virtual_view = {"col_offset": -min_col, "active": {}, "pool": pool}
+        self.seat_buttons = {}
+
+        cw, ch, pad = self.VIRTUAL_CELL_WIDTH, self.VIRTUAL_CELL_HEIGHT, self.VIRTUAL_PADDING
+        width = (max_col - min_col + 1) * cw + pad * 2
+        height = (main_rows + 2) * ch + pad * 2
+        canvas.configure(scrollregion=(0, 0, width, height))
+
+        # 讲台（教师视角位于下方居中，占2格）
+        podium_start_col = (max(main_cols, 4) - 2 + 1) // 2
+        x, y = self.virtual_seat_xy((main_rows + 1, podium_start_col))
+        canvas.create_rectangle(x, y, x + cw * 2 - 8, y + ch - 8, fill="#8E24AA", outline="",
+                                tags="virtual_static")
+        canvas.create_text(x + cw - 4, y + ch // 2 - 4, text="讲 台", fill="white",
+                           font=("微软雅黑", 18, "bold"), tags="virtual_static")
+        info_text = ""
+        if self.layout_config["class_name"]:
+            info_text += f"班级：{self.layout_config['class_name']}  "
+        if self.layout_config["teacher_name"]:
+            info_text += f"班主任：{self.layout_config['teacher_name']}"
+        if info_text:
+            canvas.create_text(width // 2, pad + ch // 2, text=info_text, fill="#555555",
+                               font=("微软雅黑", 12, "italic"), tags="virtual_static")
+        self.update_virtual_viewport()
+
+    def clear_virtual_seats(self):
+        """切换回普通布局：销毁虚拟化显示的按钮并恢复座位框架"""
+        if self.virtual_view is None:
+            return
+        for wid, btn in list(self.virtual_view["active"].values()) + self.virtual_view["pool"]:
+            self.seat_canvas.delete(wid)
+            btn.destroy()
+        self.seat_canvas.delete("virtual_static")
+        self.seat_canvas.itemconfigure(self.seat_frame_window, state="normal")
+        self.virtual_view = None
+
+    def virtual_seat_xy(self, pos):
+        """虚拟化显示时座位格左上角的画布坐标"""
+        r, c = pos
+        return (
+            (c + self.virtual_view["col_offset"]) * self.VIRTUAL_CELL_WIDTH + self.VIRTUAL_PADDING,
+            r * self.VIRTUAL_CELL_HEIGHT + self.VIRTUAL_PADDING
+        )
+
+    def virtual_seat_at(self, x, y):
+        """虚拟化显示时画布坐标所在的座位，不在座位上时返回None"""
+        pos = (
+            int((y - self.VIRTUAL_PADDING) // self.VIRTUAL_CELL_HEIGHT),
+            int((x - self.VIRTUAL_PADDING) // self.VIRTUAL_CELL_WIDTH) - self.virtual_view["col_offset"]
+        )
+        return pos if pos in self.seat_data else None
+
+    def create_virtual_seat_button(self):
+        """创建一个可复用的座位按钮，事件处理按按钮当前对应的座位进行"""
+        btn = tk.Button(
+            self.seat_canvas,
+            width=7,
+            height=3,
+            font=('微软雅黑', 9, 'bold'),
+            fg="#333333",
+            relief=tk.FLAT,
+            bd=1,
+            cursor="hand2"
+        )
+        btn.bind("<Button-1>", lambda e, b=btn: self.on_drag_start(e, b.pos_info))
+        btn.bind("<B1-Motion>", lambda e, b=btn: self.on_drag_motion(e, b.pos_info))
+        btn.bind("<ButtonRelease-1>", lambda e, b=btn: self.on_drag_end(e, b.pos_info))
+        btn.bind("<Control-Button-1>", lambda e, b=btn: self.toggle_seat_selection(b.pos_info))
+        btn.bind("<Button-3>", lambda e, b=btn: self.show_seat_menu(e, b.pos_info))
+        btn.bind("<Enter>", lambda e: e.widget.config(bg=self.lighten_color(e.widget.cget("bg"), 0.1)))
+        btn.bind("<Leave>", lambda e, b=btn: b.config(
+            bg=self.gender_color[self.seat_data[b.pos_info]["gender"]]))
+        wid = self.seat_canvas.create_window(0, 0, window=btn, anchor="nw")
+        return wid, btn
+
+    def schedule_viewport_update(self):
+        """滚动或窗口变化后在空闲时更新一次可见座位（连续滚动只处理一次）"""
+        if self.virtual_view is None or self._viewport_update_pending:
+            return
+        self._viewport_update_pending = True
+        self.root.after_idle(self.update_virtual_viewport)
+
+    def update_virtual_viewport(self):
+        """回收移出可见区域的座位按钮，并为新进入可见区域的座位分配按钮"""
+        self._viewport_update_pending = False
+        view = self.virtual_view
+        if view is None:
+            return
+        canvas = self.seat_canvas
+        cw, ch, pad = self.VIRTUAL_CELL_WIDTH, self.VIRTUAL_CELL_HEIGHT, self.VIRTUAL_PADDING
+        margin = self.VIRTUAL_MARGIN_CELLS
+        x0, y0 = canvas.canvasx(0), canvas.canvasy(0)
+        # 窗口尚未显示时按窗口默认大小估算
+        x1 = x0 + max(canvas.winfo_width(), 1200)
+        y1 = y0 + max(canvas.winfo_height(), 600)
+        row_range = range(max(int((y0 - pad) // ch) - margin, 0), int((y1 - pad) // ch) + margin + 1)
+        col_range = range(int((x0 - pad) // cw) - margin - view["col_offset"],
+                          int((x1 - pad) // cw) + margin - view["col_offset"] + 1)
+        visible = {(r, c) for r in row_range for c in col_range if (r, c) in self.seat_data}
+
+        active = view["active"]
+        for pos in list(active):
+            # 正在拖拽的按钮不回收
+            if pos not in visible and pos != self.drag_source:
+                wid, btn = active.pop(pos)
+                canvas.itemconfigure(wid, state="hidden")
+                view["pool"].append((wid, btn))
+                del self.seat_buttons[pos]
+        new_positions = [pos for pos in visible if pos not in active]
+        for pos in new_positions:
+            wid, btn = view["pool"].pop() if view["pool"] else self.create_virtual_seat_button()
+            btn.pos_info = pos
+            active[pos] = (wid, btn)
+            self.seat_buttons[pos] = btn
+            canvas.itemconfigure(wid, state="normal")
+        self.update_seat_buttons(new_positions)
 
     # ---------------------- 原有功能保留 ----------------------
     def import_excel(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel文件", "*.xlsx;*.xls")])
+        file_path = filedialog.askopenfilename(filetypes=ROSTER_FILETYPES)
         if not file_path:
             return
         try:
-            df = pd.read_excel(file_path)
-            required_cols = ["姓名", "性别", "身高"]
-            if not all(col in df.columns for col in required_cols):
-                messagebox.showerror("错误", "Excel需包含：姓名、性别、身高列")
+            try:
+                students = load_roster(file_path)
+            except ValueError as e:
+                messagebox.showerror("错误", str(e))
+                return
+            # 排座之前先整体校验名单
+            report = validate_roster(students, len(self.seat_positions))
+            if report["errors"]:
+                messagebox.showerror("名单有误", "名单未导入，请修正后重新导入：\n" + format_roster_report(report))
                 return
-            self.students = df.to_dict("records")
+            if report["warnings"] and not messagebox.askyesno(
+                    "名单提示", format_roster_report(report) + "\n\n是否继续导入？"):
+                return
+            self.students = coerce_roster_numbers(students)
             messagebox.showinfo("成功", f"已导入{len(self.students)}名学生")
             # 导入数据后自动保存
             self.auto_save_data()
         except Exception as e:
             messagebox.showerror("导入失败", str(e))
 
+    def unseated_note(self):
+        """名单人数超出座位数时的提示文字，未超出时为空字符串"""
+        extra = len(self.students) - len(self.seat_positions)
+        if extra <= 0:
+            return ""
+        return f"\n名单共{len(self.students)}人，座位只有{len(self.seat_positions)}个，有{extra}名学生没有安排座位"
+
+    def warn_unseated(self):
+        note = self.unseated_note()
+        if note:
+            messagebox.showwarning("座位不足", note.strip() + "，请在“基础设置”中增加行数或列数")
+
     def random_arrange(self):
-        if not self.students:
-            messagebox.showwarning("提示", "请先导入学生数据")
-            return
-        self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-        random_students = random.sample(self.students, min(len(self.students), len(self.seat_positions)))
-        for pos, stu in zip(self.seat_positions, random_students):
-            self.seat_data[pos] = {"name": stu["姓名"], "gender": stu["性别"]}
-        self.update_seat_buttons()
-        # 随机排列后自动保存
-        self.auto_save_data()
+        self.arrange("random", "随机排列")
 
     def sort_by_height(self):
-        if not self.students:
-            messagebox.showwarning("提示", "请先导入学生数据")
-            return
-        sorted_stu = sorted(self.students, key=lambda x: x["身高"])
-        self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-        for pos, stu in zip(self.seat_positions, sorted_stu):
-            self.seat_data[pos] = {"name": stu["姓名"], "gender": stu["性别"]}
-        self.update_seat_buttons()
-        # 排序后自动保存
-        self.auto_save_data()
+        self.arrange("height", "按身高排序")
         
     def sort_by_score(self):
         if not self.students:
@@ -635,25 +4795,222 @@ class StudentSeatTool:
         # 根据选择进行排序
         reverse = result == "1"  # 1表示从高到低，2表示从低到高
         
-        # 排序学生，使用默认值处理没有成绩的学生
-        sorted_stu = sorted(
-            self.students,
-            key=lambda x: x.get("成绩", 0),
-            reverse=reverse
-        )
-        
-        # 清空座位数据并重新分配
-        self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-        for pos, stu in zip(self.seat_positions, sorted_stu):
-            self.seat_data[pos] = {"name": stu["姓名"], "gender": stu["性别"]}
-        
-        # 更新界面和保存数据
-        self.update_seat_buttons()
-        self.auto_save_data()
-        
-        # 显示排序成功的提示
+        # 排序后显示排序成功的提示
         order_text = "从高到低" if reverse else "从低到高"
-        messagebox.showinfo("成功", f"已按成绩{order_text}排序")
+        self.arrange("score", "按成绩排序", reverse,
+                     on_done=lambda: messagebox.showinfo("成功", f"已按成绩{order_text}排序" + self.unseated_note()))
+
+    def optimal_arrange(self):
+        """按座位要求和身高求最优分配，完成后列出无法满足要求的学生"""
+        def report():
+            unmet = unmet_seat_requirements(self.students, self.seat_positions, self.seat_data)
+            if unmet:
+                lines = [f"{name}：{'、'.join(zones)}" for name, zones in unmet[:10]]
+                more = f"\n……共{len(unmet)}人" if len(unmet) > 10 else ""
+                messagebox.showwarning("提示", "以下学生的座位要求无法全部满足（符合要求的座位不够）：\n"
+                                       + "\n".join(lines) + more + self.unseated_note())
+            else:
+                messagebox.showinfo("成功", "已按座位要求和身高完成最优分配" + self.unseated_note())
+        self.arrange("optimal", "最优分配", on_done=report)
+
+    # ---------------------- 排座策略 ----------------------
+    def arrange(self, method, label, reverse=True, seed=None, on_done=None):
+        """按排座策略重新安排座位：内置策略直接计算，自定义策略在策略进程中运行，运行期间界面可操作、可取消
+
+        Args:
+            method: 策略名称（见ARRANGE_STRATEGIES）
+            label: 撤销记录中的操作名称
+            seed: 随机种子，重现排座时传入
+            on_done: 座位表更新后调用，默认提示没有座位的学生
+        """
+        if not self.students:
+            messagebox.showwarning("提示", "请先导入学生数据")
+            return
+        strategy = ARRANGE_STRATEGIES.get(method)
+        if strategy is None:
+            messagebox.showerror("错误", f"排座策略“{method}”不存在（策略文件可能已被删除或改名）")
+            return
+        if strategy.in_process:
+            seat_data, record = run_arrangement(
+                self.students, self.seat_positions, self.layout_config, method, reverse, seed)
+            self.apply_arrangement(label, seat_data, record, on_done)
+            return
+        if strategy.randomized and seed is None:
+            seed = random.getrandbits(32)
+        record = describe_arrangement(self.students, self.layout_config, method, reverse, seed)
+        cached = arrangement_cache_get(record)
+        if cached is not None:
+            self.apply_arrangement(label, cached, record, on_done)
+            return
+        self.run_strategy_process(strategy, label, reverse, seed, record, on_done)
+
+    def apply_arrangement(self, label, seat_data, record, on_done=None):
+        """使用排座结果：记录撤销、刷新、自动保存"""
+        before, record_before = self.seat_data, self.arrangement_record
+        self.seat_data, self.arrangement_record = seat_data, record
+        self.record_history(label, before, records=(record_before, record))
+        self.mark_seats_dirty()
+        # 排座后自动保存
+        self.auto_save_data()
+        if on_done is not None:
+            on_done()
+        else:
+            self.warn_unseated()
+
+    def run_strategy_process(self, strategy, label, reverse, seed, record, on_done):
+        """在策略进程中运行策略，显示可取消的进度窗口，轮询到结果后应用
+
+        策略进程正在读取策略文件夹（如启动时）时先等待读取完成再提交，不拒绝内置策略的排座。
+        """
+        if self.strategy_worker.busy and not self.strategy_worker.listing:
+            messagebox.showwarning("提示", "上一个排座策略仍在运行，请稍候或先取消")
+            return
+        # 运行期间切换班级、修改名单或布局时丢弃结果
+        session, students, positions = self.session, self.students, list(self.seat_positions)
+        timeout = self.settings.getfloat("Strategy", "timeout")
+        state = {"done": False, "submitted": False}
+
+        def submit():
+            if self.strategy_worker.busy:
+                # 等待读取策略期间又提交了另一次排座
+                messagebox.showwarning("提示", "上一个排座策略仍在运行，请稍候或先取消")
+                return False
+            try:
+                self.strategy_worker.submit(strategy.name, students, positions, seed, {"reverse": bool(reverse)},
+                                            timeout, strategy.version)
+            except (OSError, RuntimeError, pickle.PicklingError) as e:
+                self.strategy_worker.stop()
+                messagebox.showerror("错误", f"无法启动排座策略进程：{str(e)}")
+                return False
+            state["submitted"] = True
+            return True
+
+        if not self.strategy_worker.busy and not submit():
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("正在排座")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+
+        def finish():
+            state["done"] = True
+            dialog.destroy()
+            self.root.config(cursor="")
+
+        def cancel():
+            # 尚未提交时只放弃本次排座，不中断策略文件夹的读取
+            if state["submitted"]:
+                self.strategy_worker.cancel()
+            finish()
+
+        def poll():
+            if state["done"]:
+                return
+            if not state["submitted"]:
+                # 读取策略的结果由load_custom_strategies轮询，读取完成后再提交
+                if self.strategy_worker.listing:
+                    self.root.after(50, poll)
+                elif submit():
+                    self.root.after(50, poll)
+                else:
+                    finish()
+                return
+            result = self.strategy_worker.poll()
+            if result is None:
+                self.root.after(50, poll)
+                return
+            finish()
+            status, value = result
+            if status != "ok":
+                messagebox.showerror("排座失败", f"排座策略“{strategy.title}”运行失败：\n{value}")
+                return
+            if self.session is not session or self.students is not students or self.seat_positions != positions:
+                messagebox.showwarning("提示", "排座期间切换了班级或修改了名单、布局，本次结果已丢弃")
+                return
+            seat_data = seat_data_from_order(students, positions, value)
+            arrangement_cache_put(record, seat_data)
+            self.apply_arrangement(label, dict(seat_data), record, on_done)
+
+        tk.Label(dialog, text=f"正在运行排座策略“{strategy.title}”…", font=("微软雅黑", 10),
+                 padx=24, pady=12).pack()
+        ttk.Button(dialog, text="取消", command=cancel).pack(pady=(0, 12))
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+        self.root.config(cursor="watch")
+        self.root.after(50, poll)
+
+    def fill_strategy_menu(self):
+        """按注册表重建排座策略菜单"""
+        self.strategy_menu.delete(0, tk.END)
+        builtin_commands = {"random": self.random_arrange, "height": self.sort_by_height, "score": self.sort_by_score,
+                            "optimal": self.optimal_arrange}
+        for name, strategy in ARRANGE_STRATEGIES.items():
+            command = builtin_commands.get(name) or functools.partial(self.arrange, name, strategy.title)
+            self.strategy_menu.add_command(label=strategy.title, command=command)
+        self.strategy_menu.add_separator()
+        self.strategy_menu.add_command(label="重新读取自定义策略", command=self.reload_strategies)
+
+    def load_custom_strategies(self, report=False):
+        """让策略进程读取策略文件夹（界面进程不执行策略文件），轮询到结果后更新排座策略菜单
+
+        Args:
+            report: 是否总是显示读取结果（默认只在读取出错时提示）
+        """
+        if self.strategy_worker.busy:
+            if report:
+                messagebox.showwarning("提示", "排座策略正在运行，请稍候或先取消")
+            return
+        plugin_dir = self.strategy_worker.plugin_dir
+
+        def show(errors):
+            self.fill_strategy_menu()
+            if not report and not errors:
+                return
+            custom = [strategy.title for strategy in ARRANGE_STRATEGIES.values() if not strategy.builtin]
+            text = f"策略文件夹：{plugin_dir}\n自定义策略：{'、'.join(custom) if custom else '无'}"
+            if errors:
+                text += "\n\n读取失败：\n" + "\n".join(f"{os.path.basename(path)}：{error}" for path, error in errors)
+                messagebox.showwarning("排座策略", text)
+            else:
+                messagebox.showinfo("排座策略", text)
+
+        if not strategy_plugin_files(plugin_dir):
+            # 没有策略文件时不启动策略进程
+            register_worker_strategies([])
+            show([])
+            return
+        try:
+            self.strategy_worker.submit_list(self.settings.getfloat("Strategy", "timeout"))
+        except (OSError, RuntimeError) as e:
+            self.strategy_worker.stop()
+            messagebox.showerror("错误", f"无法启动排座策略进程：{str(e)}")
+            return
+
+        def poll():
+            result = self.strategy_worker.poll()
+            if result is None:
+                if self.strategy_worker.busy:
+                    self.root.after(100, poll)
+                return
+            status, value = result
+            if status == "ok":
+                register_worker_strategies(value["strategies"])
+                show(value["errors"])
+            else:
+                # 读取超时（如策略文件顶层死循环）或进程出错：自定义策略全部不可用
+                register_worker_strategies([])
+                show([(plugin_dir, value)])
+
+        self.root.after(100, poll)
+
+    def reload_strategies(self):
+        """重新读取策略文件夹（修改策略文件后无需重启程序）"""
+        if self.strategy_worker.busy:
+            messagebox.showwarning("提示", "排座策略正在运行，请稍候或先取消")
+            return
+        # 重新启动策略进程，读取修改后的策略文件
+        self.strategy_worker.stop()
+        self.load_custom_strategies(report=True)
 
     def on_drag_start(self, event, pos):
         # 记录拖拽源信息
@@ -668,6 +5025,13 @@ class StudentSeatTool:
         # 只有当当前按钮是拖拽源时才处理移动
         if self.drag_source == pos:
             btn = self.seat_buttons[pos]
+            if self.virtual_view is not None:
+                # 虚拟化显示：直接移动画布上的按钮窗口
+                canvas = self.seat_canvas
+                x = canvas.canvasx(event.x_root - canvas.winfo_rootx()) - self.drag_x_offset
+                y = canvas.canvasy(event.y_root - canvas.winfo_rooty()) - self.drag_y_offset
+                canvas.coords(self.virtual_view["active"][pos][0], x, y)
+                return
             # 先将按钮从grid布局中移除，改用place布局
             btn.grid_forget()
             # 获取窗口中的绝对位置
@@ -687,48 +5051,310 @@ class StudentSeatTool:
             
             # 查找鼠标释放位置下的目标按钮
             target_pos = None
-            for btn_pos, btn in self.seat_buttons.items():
-                # 获取按钮的边界框
-                btn_x1 = btn.winfo_x()
-                btn_y1 = btn.winfo_y()
-                btn_x2 = btn_x1 + btn.winfo_width()
-                btn_y2 = btn_y1 + btn.winfo_height()
-                
-                # 检查鼠标是否在按钮范围内
-                if btn_x1 <= x_rel <= btn_x2 and btn_y1 <= y_rel <= btn_y2:
-                    target_pos = btn_pos
-                    break
+            if self.virtual_view is not None:
+                # 虚拟化显示：根据画布坐标直接计算所在座位
+                canvas = self.seat_canvas
+                target_pos = self.virtual_seat_at(
+                    canvas.canvasx(x - canvas.winfo_rootx()), canvas.canvasy(y - canvas.winfo_rooty())
+                )
+            else:
+                for btn_pos, btn in self.seat_buttons.items():
+                    # 获取按钮的边界框
+                    btn_x1 = btn.winfo_x()
+                    btn_y1 = btn.winfo_y()
+                    btn_x2 = btn_x1 + btn.winfo_width()
+                    btn_y2 = btn_y1 + btn.winfo_height()
+
+                    # 检查鼠标是否在按钮范围内
+                    if btn_x1 <= x_rel <= btn_x2 and btn_y1 <= y_rel <= btn_y2:
+                        target_pos = btn_pos
+                        break
             
             # 如果找到目标按钮且不是拖拽源本身，则交换数据
+            changed = [self.drag_source]
             if target_pos and target_pos != self.drag_source:
+                # 交换前检查是否违反座位约束（只检查这两名学生的约束），交换后立即提示
+                source = self.drag_source
+                if self._redraw_pending:
+                    self.flush_seat_redraw()
+                if self.constraint_checker is not None:
+                    problems = self.constraint_checker.check_swap(source, target_pos)
+                    if problems:
+                        self._constraint_notice = "这次调换：" + "；".join(problems)
                 # 交换座位数据
+                self.history.push(HistoryEntry("交换座位", (
+                    (source, self.seat_data[source], self.seat_data[target_pos]),
+                    (target_pos, self.seat_data[target_pos], self.seat_data[source]),
+                ), arrangement=self.mark_arrangement_adjusted()))
                 temp = self.seat_data[self.drag_source]
                 self.seat_data[self.drag_source] = self.seat_data[target_pos]
                 self.seat_data[target_pos] = temp
+                changed.append(target_pos)
             
-            # 无论是否交换，都需要重置所有按钮布局
-            self.update_seat_buttons()
+            # 无论是否交换，拖拽源都需要回到grid布局，只刷新涉及的两个座位
+            self.mark_seats_dirty(changed)
             # 重置拖拽源
             self.drag_source = None
             # 拖拽结束后自动保存
             self.auto_save_data()
 
-    def update_seat_buttons(self):
-        for pos in self.seat_positions:
+    def mark_seats_dirty(self, positions=None):
+        """登记需要重绘的座位，同一轮事件中的多次修改在空闲时合并为一次重绘
+
+        Args:
+            positions: 发生变化的座位坐标，默认全部座位
+        """
+        if positions is None:
+            self._redraw_all = True
+        else:
+            self._dirty_seats.update(positions)
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.root.after_idle(self.flush_seat_redraw)
+
+    def flush_seat_redraw(self):
+        """一次性应用所有待重绘的座位"""
+        self._redraw_pending = False
+        if self._redraw_all:
+            positions = None
+        else:
+            # 布局重建后旧坐标可能已不存在
+            positions = [pos for pos in self._dirty_seats if pos in self.seat_data]
+        self._redraw_all = False
+        self._dirty_seats.clear()
+        if self.show_occlusion.get():
+            positions = self.refresh_occlusion(positions)
+        self.update_seat_buttons(positions)
+        self.update_metrics(positions)
+        self.update_constraints(positions)
+        self.update_repair_index(positions)
+
+    # ---------------------- 排座质量指标 ----------------------
+    def create_metrics_panel(self, parent):
+        """右侧指标栏：视线遮挡、同性相邻、各区域平均成绩"""
+        panel = tk.LabelFrame(parent, text="排座质量", font=("微软雅黑", 10, "bold"),
+                              bg="#f8f8f8", fg="#333333", padx=8, pady=6)
+        panel.pack(side=tk.RIGHT, fill=tk.Y, padx=(6, 4))
+        self.metrics_vars = {}
+        rows = [("sightline", "视线遮挡"), ("same_gender", "同性相邻"), ("constraints", "约束冲突")]
+        rows += [(f"region{i}", name) for i, name in enumerate(ArrangementMetrics.REGION_NAMES)]
+        rows.append(("spread", "成绩差"))
+        for key, title in rows:
+            tk.Label(panel, text=title, font=("微软雅黑", 9), fg="#777777", bg="#f8f8f8").pack(anchor="w")
+            var = tk.StringVar(value="-")
+            tk.Label(panel, textvariable=var, font=("微软雅黑", 12, "bold"), fg="#333333",
+                     bg="#f8f8f8", width=8, anchor="w").pack(anchor="w", pady=(0, 4))
+            self.metrics_vars[key] = var
+
+        # 在座位上叠加显示被前排遮挡的厘米数
+        self.show_occlusion = tk.BooleanVar(value=False)
+        tk.Checkbutton(panel, text="显示视线遮挡", variable=self.show_occlusion, font=("微软雅黑", 9),
+                       bg="#f8f8f8", command=self.toggle_occlusion_overlay).pack(anchor="w", pady=(6, 0))
+        self.occlusion_var = tk.StringVar(value="")
+        tk.Label(panel, textvariable=self.occlusion_var, font=("微软雅黑", 9), fg="#D32F2F",
+                 bg="#f8f8f8").pack(anchor="w")
+        # 座位约束冲突提示（拖动座位或排座后立即显示）
+        self.constraint_var = tk.StringVar(value="")
+        tk.Label(panel, textvariable=self.constraint_var, font=("微软雅黑", 9), fg="#D32F2F", bg="#f8f8f8",
+                 wraplength=110, justify=tk.LEFT).pack(anchor="w", pady=(6, 0))
+
+    def toggle_occlusion_overlay(self):
+        if not self.show_occlusion.get():
+            self.occlusion = {}
+            self.occlusion_var.set("")
+        self.mark_seats_dirty()
+
+    def refresh_occlusion(self, positions):
+        """重新计算视线遮挡，返回需要重绘的座位（加上遮挡量发生变化的座位）"""
+        occlusion = sightline_occlusion(self.seat_data, self.get_height_map(), self.layout_config)
+        if positions is not None:
+            changed = {pos for pos in self.occlusion.keys() | occlusion.keys()
+                       if self.occlusion.get(pos) != occlusion.get(pos)}
+            positions = [pos for pos in set(positions) | changed if pos in self.seat_data]
+        self.occlusion = occlusion
+        blocked = sum(1 for value in occlusion.values() if value >= 1)
+        self.occlusion_var.set(f"{blocked}人被遮挡，共{sum(occlusion.values()):.0f}cm")
+        return positions
+
+    def update_metrics(self, positions=None):
+        """更新指标：座位变化时只计算变化座位周围的增量，名单或布局变化时整体重算
+
+        Args:
+            positions: 发生变化的座位坐标，None表示整体重算
+        """
+        students_key = (id(self.students), len(self.students))
+        if positions is None or self.metrics is None or students_key != self._metrics_students_key:
+            height_map = self.get_height_map()
+            score_map = {stu["姓名"]: stu["成绩"] for stu in self.students if pd.notna(stu.get("成绩"))}
+            self.metrics = ArrangementMetrics(self.layout_config, self.seat_data, height_map, score_map)
+            self._metrics_students_key = students_key
+        else:
+            self.metrics.update(positions, self.seat_data)
+
+        self.metrics_vars["sightline"].set(str(self.metrics.sightline))
+        self.metrics_vars["same_gender"].set(str(self.metrics.same_gender))
+        for i, average in enumerate(self.metrics.region_averages()):
+            self.metrics_vars[f"region{i}"].set("-" if average is None else f"{average:.1f}")
+        spread = self.metrics.score_spread()
+        self.metrics_vars["spread"].set("-" if spread is None else f"{spread:.1f}")
+
+    def update_constraints(self, positions=None):
+        """更新座位约束冲突：座位变化时只检查变化座位上学生的约束，名单或布局变化时整体重建
+
+        Args:
+            positions: 发生变化的座位坐标，None表示整体重建
+        """
+        students_key = (id(self.students), len(self.students))
+        if positions is None or self.constraint_checker is None or students_key != self._constraint_students_key:
+            constraints = roster_constraints(self.students)
+            self.constraint_checker = SeatConstraints(
+                constraints, self.layout_config, self.seat_positions, self.seat_data)
+            self._constraint_students_key = students_key
+        else:
+            self.constraint_checker.update(positions, self.seat_data)
+
+        count = len(self.constraint_checker.active)
+        self.metrics_vars["constraints"].set(str(count) if self.constraint_checker.tracked else "-")
+        if self._constraint_notice:
+            self.constraint_var.set(self._constraint_notice)
+            self._constraint_notice = ""
+        elif count:
+            self.constraint_var.set(f"有{count}处不满足座位约束（座位调整 → 座位约束）")
+        else:
+            self.constraint_var.set("")
+
+    def update_seat_buttons(self, positions=None):
+        """刷新座位按钮显示（立即执行，一般通过mark_seats_dirty在空闲时调用）
+
+        Args:
+            positions: 需要刷新的座位坐标，默认刷新全部座位
+        """
+        for pos in (list(self.seat_buttons) if positions is None else positions):
+            btn = self.seat_buttons.get(pos)
+            if btn is None:
+                # 虚拟化显示时不在可见区域的座位没有按钮，滚动到时再显示
+                continue
             seat_idx = self.seat_index_map[pos]
             data = self.seat_data[pos]
-            btn = self.seat_buttons[pos]
-            # 重置按钮状态和样式
+            # 重置按钮状态和样式，开启视线遮挡显示时标出被遮挡的厘米数
+            text = f"{seat_idx}\n{data['name']}"  # 移除性别信息
+            blocked = self.occlusion.get(pos, 0)
+            if blocked >= 1:
+                text += f"\n遮挡{blocked:.0f}cm"
             btn.config(
-                text=f"{seat_idx}\n{data['name']}",  # 移除性别信息
+                text=text,
+                fg="#D32F2F" if blocked >= 1 else "#333333",
                 bg=self.gender_color[data["gender"]],
-                relief=tk.RAISED
+                # 选中的座位显示为凹陷
+                relief=tk.SUNKEN if pos in self.selected_seats else tk.RAISED
             )
-            # 确保按钮回到grid布局
-            r, c = pos
-            # 首先取消place布局，然后重新应用grid布局
-            btn.place_forget()
-            btn.grid(row=r, column=c, padx=10, pady=8)
+            if self.virtual_view is not None:
+                # 虚拟化显示：按钮回到所在座位格
+                self.seat_canvas.coords(self.virtual_view["active"][pos][0], *self.virtual_seat_xy(pos))
+                continue
+            # 拖拽后的按钮使用place布局，需回到grid布局；其余按钮位置不变
+            if btn.winfo_manager() != "grid":
+                r, c = pos
+                btn.place_forget()
+                btn.grid(row=r, column=c, padx=10, pady=8)
+
+    # ---------------------- 多方案比较 ----------------------
+    CANDIDATE_COUNT = 12
+    CANDIDATE_COLUMNS = 4
+
+    def open_candidates_window(self):
+        """后台生成多个随机方案，逐个显示缩略图和评分，点击即可采用"""
+        if not self.students:
+            messagebox.showwarning("提示", "请先导入学生数据")
+            return
+        win = tk.Toplevel(self.root)
+        win.title("多方案比较")
+        win.geometry("760x560")
+
+        status_var = tk.StringVar(value="正在生成方案…")
+        tk.Label(win, textvariable=status_var, font=("微软雅黑", 10), fg="#555555").pack(anchor="w", padx=10, pady=5)
+        canvas = tk.Canvas(win, bg="#f8f8f8", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(win, orient=tk.VERTICAL, command=canvas.yview)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        cards_frame = tk.Frame(canvas, bg="#f8f8f8")
+        canvas.create_window((0, 0), window=cards_frame, anchor="nw")
+        cards_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+
+        # 后台线程只负责生成数据和PIL图片，界面控件全部在主线程中创建
+        results = queue.Queue()
+        stop_event = threading.Event()
+        students = list(self.students)
+        positions = list(self.seat_positions)
+        layout_config = dict(self.layout_config)
+        session = self.session
+
+        def worker():
+            for candidate in generate_candidates(students, positions, layout_config,
+                                                 self.CANDIDATE_COUNT, stop_event=stop_event):
+                results.put(candidate)
+            results.put(None)
+
+        candidates = []
+        photos = []
+        labels = []
+
+        def apply_candidate(candidate):
+            if self.session is not session:
+                messagebox.showwarning("提示", "已切换到其他班级，请切换回原班级后再采用", parent=win)
+                return
+            if self.seat_positions != positions:
+                messagebox.showwarning("提示", "座位布局已改变，请重新生成方案", parent=win)
+                return
+            before, record_before = self.seat_data, self.arrangement_record
+            self.seat_data = dict(candidate["seat_data"])
+            self.arrangement_record = describe_arrangement(
+                students, layout_config, "random", seed=candidate["seed"])
+            self.record_history("采用候选方案", before, records=(record_before, self.arrangement_record))
+            self.mark_seats_dirty()
+            self.auto_save_data()
+
+        def add_card(candidate):
+            index = len(candidates)
+            candidates.append(candidate)
+            card = tk.Frame(cards_frame, bg="white", bd=1, relief=tk.SOLID, padx=6, pady=6)
+            card.grid(row=index // self.CANDIDATE_COLUMNS, column=index % self.CANDIDATE_COLUMNS, padx=6, pady=6)
+            if candidate["thumbnail"] is not None:
+                photo = ImageTk.PhotoImage(candidate["thumbnail"], master=win)
+                photos.append(photo)
+                tk.Label(card, image=photo, bg="white").pack()
+            scores = candidate["scores"]
+            label = tk.Label(
+                card, text=f"方案{index + 1}  遮挡{scores['occlusion']:.0f}cm  同性相邻{scores['same_gender']}",
+                font=("微软雅黑", 9), bg="white"
+            )
+            label.pack(pady=2)
+            labels.append(label)
+            ttk.Button(card, text="采用", command=lambda: apply_candidate(candidate)).pack()
+
+        def poll():
+            if stop_event.is_set():
+                return
+            try:
+                while True:
+                    candidate = results.get_nowait()
+                    if candidate is None:
+                        # 全部生成完毕：标出综合得分最好的方案
+                        best = min(range(len(candidates)), key=lambda i: candidates[i]["scores"]["total"])
+                        labels[best].config(fg="#E91E63", text="★ " + labels[best].cget("text"))
+                        status_var.set(f"已生成{len(candidates)}个方案，★为推荐方案，点击“采用”应用到座位表")
+                        return
+                    add_card(candidate)
+                    status_var.set(f"正在生成方案…（{len(candidates)}/{self.CANDIDATE_COUNT}）")
+            except queue.Empty:
+                pass
+            win.after(50, poll)
+
+        # 关闭窗口时通知后台线程停止
+        win.bind("<Destroy>", lambda e: stop_event.set() if e.widget is win else None)
+        threading.Thread(target=worker, daemon=True).start()
+        win.after(50, poll)
 
     def show_seat_info(self, pos):
         data = self.seat_data[pos]
@@ -743,34 +5369,481 @@ class StudentSeatTool:
 
     def reset_seats(self):
         if messagebox.askyesno("确认", "确定重置所有座位吗？"):
+            before, record_before = self.seat_data, self.arrangement_record
             self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-            self.update_seat_buttons()
+            self.arrangement_record = None
+            self.record_history("重置座位", before, records=(record_before, None))
+            self.mark_seats_dirty()
             # 重置座位后自动保存
             self.auto_save_data()
-    
+
+    # ---------------------- 插班/离班增量调整 ----------------------
+    def show_seat_menu(self, event, pos):
+        """座位右键菜单"""
+        menu = tk.Menu(self.root, tearoff=0)
+        if self.seat_data[pos]["name"] != "空":
+            menu.add_command(label="学生离开（就近补位）", command=lambda: self.remove_student_at(pos))
+        menu.add_command(label="插班生（按身高就近插入）…", command=self.add_student)
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def get_height_map(self):
+        """返回姓名到身高的映射"""
+        return {stu["姓名"]: stu.get("身高") for stu in self.students}
+
+    def get_repair_index(self):
+        """插班/离班用的索引：先应用尚未刷新的座位变化，名单或布局变化后重建"""
+        if self._redraw_pending:
+            self.flush_seat_redraw()
+        students_key = (id(self.students), len(self.students))
+        index = self.repair_index
+        if index is None or index.positions is not self.seat_positions or students_key != self._repair_students_key:
+            self.repair_index = SeatRepairIndex(self.seat_positions, self.seat_data, self.get_height_map(),
+                                                self.students)
+            self._repair_students_key = students_key
+        return self.repair_index
+
+    def update_repair_index(self, positions=None):
+        """插班/离班索引随座位变化增量更新；整体变化或名单变化时丢弃，下次使用时重建"""
+        if self.repair_index is None:
+            return
+        if positions is None or (id(self.students), len(self.students)) != self._repair_students_key:
+            self.repair_index = None
+        else:
+            self.repair_index.update(positions, self.seat_data)
+
+    def note_roster_change(self, students_key, added=None, removed=None):
+        """名单只增加（added）或去掉（removed）一名学生：就地更新指标、约束检查和插班/离班索引，不必整体重建
+
+        Args:
+            students_key: 修改名单前的(id, 人数)
+        """
+        new_key = (id(self.students), len(self.students))
+        if self.repair_index is not None and self._repair_students_key == students_key:
+            if added is not None:
+                self.repair_index.add_student(added)
+            else:
+                self.repair_index.remove_student(removed)
+            self._repair_students_key = new_key
+        if self.metrics is not None and self._metrics_students_key == students_key:
+            if added is not None:
+                self.metrics.height_map[added["姓名"]] = added.get("身高")
+            self._metrics_students_key = new_key
+        if self.constraint_checker is not None and self._constraint_students_key == students_key:
+            # 插班生没有座位约束；离开的学生参与约束时约束随之改变，需要重建
+            if added is not None or removed not in self.constraint_checker.tracked:
+                self._constraint_students_key = new_key
+
+    def add_student(self):
+        """插班生：录入信息后按身高插入，尽量少移动已有学生"""
+        name = simpledialog.askstring("插班生", "姓名：")
+        if not name or not name.strip():
+            return
+        gender = simpledialog.askstring("插班生", "性别（男/女）：", initialvalue="男")
+        if gender not in ("男", "女"):
+            messagebox.showerror("错误", "性别只能为“男”或“女”")
+            return
+        height = simpledialog.askfloat("插班生", "身高（cm）：", minvalue=50, maxvalue=250)
+        if height is None:
+            return
+        student = {"姓名": name.strip(), "性别": gender, "身高": height}
+        index = self.get_repair_index()
+        students_key = (id(self.students), len(self.students))
+        students_before = tuple(self.students)
+        self.students.append(student)
+        self.note_roster_change(students_key, added=student)
+        # 只记下被挪动座位原来的条目，不复制整个座位表
+        before = {}
+        entry = {"name": student["姓名"], "gender": student["性别"]}
+        changed = insert_with_min_shift(self.seat_positions, self.seat_data, index.find_slot(height), entry,
+                                        before, index)
+        self.record_history("插班生", before, changed, students_before)
+        if not changed:
+            messagebox.showwarning("提示", "没有空座位，已加入学生名单但未安排座位")
+        else:
+            self.mark_seats_dirty(changed)
+        self.auto_save_data()
+
+    def remove_student_at(self, pos):
+        """学生离开：空出座位，若有未入座的学生则选挪动最少的一位补入"""
+        name = self.seat_data[pos]["name"]
+        if name == "空" or not messagebox.askyesno("确认", f"确定让{name}离开座位表吗？"):
+            return
+        index = self.get_repair_index()
+        students_key = (id(self.students), len(self.students))
+        students_before = tuple(self.students)
+        before = {pos: self.seat_data[pos]}
+        self.seat_data[pos] = {"name": "空", "gender": "空"}
+        # 同名学生只移除一位
+        for i, stu in enumerate(self.students):
+            if stu["姓名"] == name:
+                del self.students[i]
+                break
+        self.note_roster_change(students_key, removed=name)
+        index.update([pos], self.seat_data)
+        changed = [pos]
+
+        # 候补学生：名单中有但未安排座位的学生
+        waiting = index.waiting()
+        if waiting:
+            freed_idx = index.index[pos]
+            slots = [index.find_slot(stu.get("身高")) for stu in waiting]
+            # 插入位置离空出的座位越近，需要顺移的学生越少
+            best = min(range(len(waiting)), key=lambda i: abs(slots[i] - freed_idx))
+            entry = {"name": waiting[best]["姓名"], "gender": waiting[best]["性别"]}
+            changed.extend(insert_with_min_shift(self.seat_positions, self.seat_data, slots[best], entry,
+                                                 before, index))
+        self.record_history("学生离开", before, changed, students_before)
+        self.mark_seats_dirty(changed)
+        self.auto_save_data()
+
+    # ---------------------- 整体调整（行列交换、轮换、镜像、旋转、整组移动） ----------------------
+    def apply_seat_permutation(self, mapping, label):
+        """一次性应用{目标座位: 来源座位}的重排：只刷新变化的座位，只保存一次"""
+        before = self.seat_data
+        self.seat_data = dict(before)
+        for target, source in mapping.items():
+            self.seat_data[target] = before[source]
+        self.record_history(label, before, list(mapping))
+        self.mark_seats_dirty(list(mapping))
+        self.auto_save_data()
+
+    def apply_grid_operation(self, operation, *args):
+        labels = {
+            "swap_rows": "交换两排", "swap_cols": "交换两列", "shift_rows": "前后轮换",
+            "shift_cols": "左右轮换", "mirror": "左右镜像", "rotate": "旋转180°"
+        }
+        try:
+            mapping = grid_permutation(self.layout_config, operation, *args)
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        self.apply_seat_permutation(mapping, labels[operation])
+
+    def ask_grid_operation(self, operation):
+        """询问整体调整的参数后执行"""
+        rows = self.layout_config["main_rows"]
+        cols = self.layout_config["main_cols"]
+        if operation in ("swap_rows", "swap_cols"):
+            unit, limit = ("排", rows) if operation == "swap_rows" else ("列", cols)
+            first = simpledialog.askinteger("交换", f"第几{unit}（从{'前' if unit == '排' else '左'}往后数）：",
+                                            minvalue=1, maxvalue=limit)
+            if first is None:
+                return
+            second = simpledialog.askinteger("交换", f"与第几{unit}交换：", minvalue=1, maxvalue=limit)
+            if second is None:
+                return
+            self.apply_grid_operation(operation, first, second)
+        else:
+            prompt = "每排向后轮换几排（最后几排轮换到最前）：" if operation == "shift_rows" else "每列向右轮换几列（负数向左）："
+            step = simpledialog.askinteger("轮换", prompt, initialvalue=1)
+            if step:
+                self.apply_grid_operation(operation, step)
+
+    def toggle_seat_selection(self, pos):
+        if pos in self.selected_seats:
+            self.selected_seats.discard(pos)
+        else:
+            self.selected_seats.add(pos)
+        self.mark_seats_dirty([pos])
+        # 阻止触发拖拽
+        return "break"
+
+    def clear_seat_selection(self):
+        selected = list(self.selected_seats)
+        self.selected_seats.clear()
+        self.mark_seats_dirty(selected)
+
+    def move_selected_seats(self):
+        if not self.selected_seats:
+            messagebox.showwarning("提示", "请先按住Ctrl单击选择要移动的座位")
+            return
+        row_offset = simpledialog.askinteger("移动选中座位", "向后移动几排（负数向前）：", initialvalue=0)
+        if row_offset is None:
+            return
+        col_offset = simpledialog.askinteger("移动选中座位", "向右移动几列（负数向左）：", initialvalue=0)
+        if col_offset is None:
+            return
+        try:
+            mapping = group_move_permutation(self.seat_positions, self.selected_seats, row_offset, col_offset)
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        # 选择跟随座位移动
+        self.selected_seats = {(r - row_offset, c + col_offset) for r, c in self.selected_seats}
+        self.apply_seat_permutation(mapping, "移动选中座位")
+        self.mark_seats_dirty(list(self.selected_seats))
+
+    # ---------------------- 多班级管理（SQLite存储） ----------------------
+    def open_class_window(self):
+        class_win = tk.Toplevel(self.root)
+        class_win.title("班级管理")
+        class_win.geometry("420x400")
+        class_win.resizable(False, False)
+
+        listbox = tk.Listbox(class_win, font=("微软雅黑", 10), height=12)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        classes = []
+
+        def refresh_list():
+            classes[:] = self.store.list_classes()
+            listbox.delete(0, tk.END)
+            for info in classes:
+                listbox.insert(
+                    tk.END,
+                    f"{info['class_name'] or '（未命名）'}  班主任：{info['teacher_name']}  {info['student_count']}人"
+                )
+
+        def selected_class():
+            selection = listbox.curselection()
+            return classes[selection[0]] if selection else None
+
+        def on_switch():
+            info = selected_class()
+            if info is not None:
+                self.switch_class(info["class_id"])
+                class_win.destroy()
+
+        def on_new():
+            name = simpledialog.askstring("新建班级", "班级名称：", parent=class_win)
+            if name and name.strip():
+                self.create_class(name.strip())
+                class_win.destroy()
+
+        def on_delete():
+            info = selected_class()
+            if info is None:
+                return
+            if info["class_id"] == self.class_id:
+                messagebox.showwarning("提示", "不能删除当前正在编辑的班级", parent=class_win)
+                return
+            name = info["class_name"] or "（未命名）"
+            if messagebox.askyesno("确认", f"确定删除班级“{name}”的全部数据吗？", parent=class_win):
+                session = self.find_session(class_id=info["class_id"])
+                if session is not None:
+                    self.close_session(session)
+                self.store.delete_class(info["class_id"])
+                refresh_list()
+
+        def on_find():
+            name = search_entry.get().strip()
+            if not name:
+                return
+            results = self.store.find_student(name)
+            if results:
+                lines = [f"{r['class_name']}：座位{r['seat_index']}" for r in results]
+                messagebox.showinfo("查找结果", f"{name}\n" + "\n".join(lines), parent=class_win)
+            else:
+                messagebox.showinfo("查找结果", f"未找到{name}", parent=class_win)
+
+        listbox.bind("<Double-Button-1>", lambda e: on_switch())
+        button_frame = tk.Frame(class_win)
+        button_frame.pack(fill=tk.X, padx=10)
+        ttk.Button(button_frame, text="打开该班级", command=on_switch).pack(side=tk.LEFT, padx=3)
+        ttk.Button(button_frame, text="新建班级", command=on_new).pack(side=tk.LEFT, padx=3)
+        ttk.Button(button_frame, text="删除班级", command=on_delete).pack(side=tk.LEFT, padx=3)
+
+        search_frame = tk.Frame(class_win)
+        search_frame.pack(fill=tk.X, padx=10, pady=10)
+        tk.Label(search_frame, text="跨班级查找学生：", font=("微软雅黑", 10)).pack(side=tk.LEFT)
+        search_entry = ttk.Entry(search_frame, width=12)
+        search_entry.pack(side=tk.LEFT, padx=3)
+        ttk.Button(search_frame, text="查找", command=on_find).pack(side=tk.LEFT, padx=3)
+
+        refresh_list()
+
+    def switch_class(self, class_id):
+        """切换到班级的标签页，班级尚未打开时从数据库读取并新开标签页（切换时记住当前班级，下次启动时自动打开）"""
+        session = self.find_session(class_id=class_id)
+        if session is not None:
+            self.activate_session(session)
+            return
+        load_data = self.store.load_class(class_id)
+        if load_data is None:
+            messagebox.showerror("错误", "该班级不存在")
+            return
+        self.open_session(self.session_from_payload(load_data))
+
+    def edit_constraints(self):
+        """编辑座位约束（同坐、分开、每排人数上限），保存到名单的约束列中，可撤销"""
+        if not self.students:
+            messagebox.showwarning("提示", "请先导入学生数据")
+            return
+        win = tk.Toplevel(self.root)
+        win.title("座位约束")
+        win.geometry("520x460")
+        win.transient(self.root)
+
+        tk.Label(win, text="每行一条约束：\n"
+                           "同坐：张三、李四（同一排左右相邻）\n"
+                           "分开：王五、赵六（两两不相邻，含前后和斜对角）\n"
+                           "一组（每排最多2人）：甲、乙、丙（每排最多2人）",
+                 font=("微软雅黑", 9), fg="#555555", justify=tk.LEFT).pack(anchor="w", padx=10, pady=(8, 4))
+        text = tk.Text(win, font=("微软雅黑", 10), height=10, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True, padx=10)
+        text.insert("1.0", format_constraint_text(roster_constraints(self.students)))
+
+        violations = self.constraint_checker.violations() if self.constraint_checker is not None else []
+        summary = "当前座位表满足全部约束" if not violations else \
+            f"当前有{len(violations)}处不满足：\n" + "\n".join(violations[:6]) + ("\n……" if len(violations) > 6 else "")
+        tk.Label(win, text=summary, font=("微软雅黑", 9), fg="#D32F2F" if violations else "#388E3C",
+                 justify=tk.LEFT, wraplength=490).pack(anchor="w", padx=10, pady=4)
+
+        def save():
+            try:
+                constraints = parse_constraint_text(text.get("1.0", tk.END))
+            except ValueError as e:
+                messagebox.showerror("错误", str(e), parent=win)
+                return
+            names = {str(stu["姓名"]) for stu in self.students}
+            unknown = sorted({name for group in constraints["together"] for name in group}
+                             | {name for pair in constraints["apart"] for name in pair}
+                             | {name for _, members in constraints["row_limits"].values() for name in members}
+                             - names)
+            if unknown:
+                messagebox.showerror("错误", f"名单中没有这些学生：{'、'.join(unknown)}", parent=win)
+                return
+            students_before = self.students
+            self.students = apply_constraints_to_students(self.students, constraints)
+            self.record_history("修改座位约束", self.seat_data, positions=[], students_before=students_before)
+            self.mark_seats_dirty([])
+            self.auto_save_data()
+            win.destroy()
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=8)
+        ttk.Button(buttons, text="保存", command=save).pack(side=tk.LEFT, padx=6)
+        ttk.Button(buttons, text="取消", command=win.destroy).pack(side=tk.LEFT, padx=6)
+
+    def show_arrangement_record(self):
+        """显示当前座位表的排座指纹，并可按记录重新生成同一结果"""
+        record = self.arrangement_record
+        if record is None:
+            messagebox.showinfo("排座来源", "当前座位表不是由自动排座生成的（或已重置）")
+            return
+        strategy = ARRANGE_STRATEGIES.get(record["method"])
+        layout = record["layout"]
+        text = (
+            f"排座方式：{strategy.title if strategy is not None else record['method']}\n"
+            f"随机种子：{record['seed'] if record['seed'] is not None else '无'}\n"
+            f"布局：{layout['main_rows']}行×{layout['main_cols']}列，讲台侧{layout['podium_seats']}座\n"
+            f"名单哈希：{record['roster_hash'][:16]}…\n"
+            f"指纹：{record['fingerprint']}\n\n"
+        )
+        if record.get("scores_hash"):
+            text += "该方式与成绩有关，成绩不保存到文件，重现需要当前名单含有原来的成绩。\n"
+        if record.get("adjusted"):
+            text += "排座后座位经过手动调整，调整不计入指纹。\n"
+        if not messagebox.askyesno("排座来源", text + "是否按该记录重新生成座位表？"):
+            return
+        reverse = record["params"].get("reverse", True)
+        current = describe_arrangement(self.students, self.layout_config, record["method"], reverse, record["seed"])
+        if current["fingerprint"] != record["fingerprint"]:
+            messagebox.showwarning("提示", "当前学生名单、座位布局或策略文件与记录不一致，无法重现该座位表")
+            return
+        if current.get("scores_hash") != record.get("scores_hash"):
+            messagebox.showwarning("提示", "当前名单的成绩与排座时不同（成绩不保存到文件，请重新导入含成绩的名单），无法重现该座位表")
+            return
+        self.arrange(record["method"], "重现排座", reverse, record["seed"], on_done=lambda: None)
+
+    # ---------------------- 撤销/重做 ----------------------
+    def record_history(self, label, before, positions=None, students_before=None, records=None):
+        """记录一步操作：只保存发生变化的座位
+
+        Args:
+            label: 操作名称
+            before: 操作前的座位数据（原字典或浅拷贝）
+            positions: 可能发生变化的座位，默认比较全部座位
+            students_before: 操作前的学生名单（名单有变化时传入）
+            records: 排座、重置等操作替换了来源记录时为(修改前记录, 修改后记录)；
+                     默认视为手动调整，座位有变化时把来源记录标记为已调整
+        """
+        changes = diff_seat_data(before, self.seat_data, positions)
+        students = None
+        if students_before is not None:
+            students = (students_before, tuple(self.students))
+        if records is None and changes:
+            records = self.mark_arrangement_adjusted()
+        elif records is not None and records[0] is records[1]:
+            records = None
+        if changes or students or records:
+            self.history.push(HistoryEntry(label, changes, students=students, arrangement=records))
+
+    def mark_arrangement_adjusted(self):
+        """座位被手动调整（或随布局迁移）后，把来源记录标记为已调整：指纹仍描述调整前的自动排座结果
+
+        Returns:
+            tuple: (修改前记录, 修改后记录)，没有记录或已标记时为None
+        """
+        record = self.arrangement_record
+        if record is None or record.get("adjusted"):
+            return None
+        self.arrangement_record = dict(record, adjusted=True)
+        return record, self.arrangement_record
+
+    def undo(self):
+        entry = self.history.pop_undo()
+        if entry is not None:
+            self.apply_history_entry(entry, reverse=True)
+
+    def redo(self):
+        entry = self.history.pop_redo()
+        if entry is not None:
+            self.apply_history_entry(entry, reverse=False)
+
+    def apply_history_entry(self, entry, reverse):
+        """应用（reverse=False）或撤销（reverse=True）一步操作，只刷新变化的座位"""
+        if entry.arrangement is not None:
+            self.arrangement_record = entry.arrangement[0 if reverse else 1]
+        if entry.students is not None:
+            self.students = list(entry.students[0] if reverse else entry.students[1])
+        if entry.layout is not None:
+            old_config, new_config, old_seats, new_seats = entry.layout
+            config, seats = (old_config, old_seats) if reverse else (new_config, new_seats)
+            self.layout_config = config
+            seat_data = {pos: {"name": "空", "gender": "空"} for pos in build_seat_positions(config)}
+            seat_data.update(seats)
+            self.generate_seat_positions(seat_data)
+            self.update_seat_frame_title()
+            # 保存配置（同时自动保存座位数据）
+            self.save_config()
+            return
+        for pos, old, new in entry.seats:
+            self.seat_data[pos] = old if reverse else new
+        self.mark_seats_dirty([pos for pos, _, _ in entry.seats])
+        self.auto_save_data()
+
+    def create_class(self, class_name):
+        """在新标签页中新建一个空班级（沿用当前的座位布局）"""
+        class_id = self.store.find_class(class_name)
+        if class_id is not None:
+            self.switch_class(class_id)
+            return
+        self.open_session(ClassSession(ClassSession.new_model(
+            dict(self.layout_config, class_name=class_name, teacher_name=""))))
+        self.save_config()
+
     def auto_save_data(self):
-        """自动保存座位表数据到根目录的JSON文件，不弹出对话框"""
-        file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "座位表数据.json")
+        """自动保存当前班级（不弹出对话框）：启用SQLite时保存到数据库，否则保存到该标签页对应的JSON文件（默认为程序目录的座位表数据.json）"""
+        if self.restoring:
+            # 存档尚未读取完成，此时保存会覆盖存档
+            return
+        # 从其他文件打开的班级保存回该文件
+        file_path = self.session_file(self.session)
         
         try:
+            if self.store is not None:
+                # 启用SQLite存储时按班级编号保存到数据库；新班级第一次保存时分配编号并记入配置
+                class_id = self.store.save_class(self.layout_config, self.seat_data, self.seat_index_map,
+                                                 self.students, self.arrangement_record, self.class_id)
+                if class_id != self.class_id:
+                    self.class_id = class_id
+                    self.persist_layout()
+                return
+
             # 准备要保存的数据
-            # 创建学生列表
-            students_without_scores = [{key: value for key, value in student.items() if key != "成绩"} for student in self.students]
-            
-            save_data = {
-                "layout_config": self.layout_config,
-                "seat_data": {str(pos): data for pos, data in self.seat_data.items()},
-                "seat_index_map": {str(pos): idx for pos, idx in self.seat_index_map.items()},
-                "students": students_without_scores
-            }
+            save_data = build_save_payload(self.layout_config, self.seat_data, self.seat_index_map, self.students,
+                                           self.arrangement_record)
             
-            # 获取程序运行时的基础目录
-            if hasattr(sys, '_MEIPASS'):
-                base_dir = os.path.dirname(os.path.abspath(sys.executable))
-            else:
-                base_dir = os.path.dirname(os.path.abspath(__file__))
-                
-            file_path = os.path.join(base_dir, "座位表数据.json")
             # 保存到文件
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(save_data, f, ensure_ascii=False, indent=2)
@@ -787,41 +5860,62 @@ class StudentSeatTool:
             # 处理其他未知错误
             print(f"自动保存失败（未知错误）：{str(e)}")
     
-    def auto_load_data(self):
-        """程序启动时自动尝试读取座位表数据文件"""
-        # 获取程序运行时的基础目录
-        if hasattr(sys, '_MEIPASS'):
-            base_dir = os.path.dirname(os.path.abspath(sys.executable))
-        else:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            
-        file_path = os.path.join(base_dir, "座位表数据.json")
-        
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            # 文件不存在时，创建初始空座位数据
-            self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-            return
-        
-        try:
-            # 读取文件
-            with open(file_path, 'r', encoding='utf-8') as f:
-                load_data = json.load(f)
-            
-            # 验证必要字段
-            required_fields = ["layout_config", "seat_data", "seat_index_map", "students"]
-            if not all(field in load_data for field in required_fields):
-                # 文件格式无效时，创建初始空座位数据
-                self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-                return
-            
-            # 恢复数据
-            # 使用try-except避免数据类型不匹配导致的程序崩溃
-            try:
-                # 如果加载的布局配置与当前配置不同，保留当前配置
-                # 只更新座位数据、学生信息等
-                self.students = load_data["students"]
-                
+    def start_session_restore(self):
+        """在后台线程读取上次保存的数据，完成后在主线程中一次性创建座位"""
+        layout_config = self.layout_config
+        seat_positions = self.seat_positions
+        # 启用SQLite存储时配置中记录的班级编号（旧版配置中没有，按班级名称查找）
+        class_id = self.settings.get("Layout", "class_id", fallback="")
+        class_id = int(class_id) if class_id.isdigit() else None
+        result = {}
+
+        def work():
+            result.update(self.read_session(layout_config, seat_positions, class_id))
+
+        worker = threading.Thread(target=work, name="存档读取", daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self.root.after(10, poll)
+                return
+            self.finish_session_restore(result, layout_config)
+
+        self.root.after(10, poll)
+
+    def read_session(self, layout_config, seat_positions, class_id=None):
+        """读取并解析上次保存的座位表数据（在后台线程中运行，不访问界面控件）
+
+        Returns:
+            dict: 可以恢复时返回class_id、students、arrangement、seat_data、seat_index_map，否则为空字典
+        """
+        file_path = os.path.join(get_base_dir(), "座位表数据.json")
+        if self.store is None and not os.path.exists(file_path):
+            return {}
+
+        try:
+            with self.timeline.stage("读取存档"):
+                if self.store is not None:
+                    # 启用SQLite存储时读取配置中当前班级的数据；SQLite连接不能跨线程使用，单独打开一个只读连接
+                    reader = SQLiteSeatStore(self.store.db_path)
+                    try:
+                        if class_id is None:
+                            class_id = reader.find_class(layout_config["class_name"])
+                        load_data = reader.load_class(class_id) or {}
+                    finally:
+                        reader.close()
+                else:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+            with self.timeline.stage("解析存档"):
+                if self.store is None:
+                    load_data = json.loads(content)
+
+                # 验证必要字段
+                required_fields = ["layout_config", "seat_data", "seat_index_map", "students"]
+                if not all(field in load_data for field in required_fields):
+                    return {}
+
                 # 使用类方法安全地解析元组字符串
                 loaded_seat_data = {}
                 loaded_seat_index_map = {}
@@ -829,186 +5923,76 @@ class StudentSeatTool:
                     pos = self.parse_tuple_str(pos_str)
                     if pos:
                         loaded_seat_data[pos] = data
-                
                 for pos_str, idx in load_data["seat_index_map"].items():
                     pos = self.parse_tuple_str(pos_str)
                     if pos:
                         loaded_seat_index_map[pos] = idx
-                
-                # 只保留当前座位布局中存在的位置数据
-                self.seat_data = {}
-                for pos in self.seat_positions:
-                    if pos in loaded_seat_data:
-                        self.seat_data[pos] = loaded_seat_data[pos]
-                    else:
-                        self.seat_data[pos] = {"name": "空", "gender": "空"}
-                
-                # 仅在索引映射有效时更新
-                if all(pos in loaded_seat_index_map for pos in self.seat_positions):
-                    self.seat_index_map = loaded_seat_index_map
-                
-                # 更新座位按钮显示
-                self.update_seat_buttons()
-                
-                # 静默加载，不显示提示
-                # print(f"已自动加载上次保存的数据，共{len(self.students)}名学生")  # 调试时可以启用
-            except (ValueError, IndexError, TypeError) as e:
-                # 处理数据类型不匹配、索引错误或类型错误
-                print(f"数据恢复失败：{str(e)}")
-                self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-                
-        except IOError as e:
-            # 处理文件IO错误
+
+                # 如果加载的布局配置与当前配置不同，保留当前配置，只恢复座位数据、学生信息等
+                saved_config = load_data["layout_config"]
+                if all(saved_config.get(key) == layout_config[key]
+                       for key in ("podium_seats", "main_rows", "main_cols")):
+                    # 只保留当前座位布局中存在的位置数据
+                    seat_data = {pos: loaded_seat_data.get(pos, {"name": "空", "gender": "空"})
+                                 for pos in seat_positions}
+                else:
+                    # 配置文件中的行列数与存档不同：按相对位置迁移存档中的座位安排
+                    seat_data, _ = migrate_seat_data(saved_config, loaded_seat_data, layout_config, seat_positions)
+
+                return {
+                    "class_id": load_data.get("class_id"),
+                    "students": load_data["students"],
+                    "arrangement": load_data.get("arrangement"),
+                    "seat_data": seat_data,
+                    # 仅在索引映射有效时使用
+                    "seat_index_map": loaded_seat_index_map
+                    if all(pos in loaded_seat_index_map for pos in seat_positions) else None
+                }
+        except (ValueError, IndexError, TypeError) as e:
+            # 处理数据类型不匹配、索引错误或类型错误（JSON解析错误也是ValueError）
+            print(f"数据恢复失败：{str(e)}")
+        except (IOError, sqlite3.Error) as e:
             print(f"自动加载数据失败（IO错误）：{str(e)}")
-            self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-        except json.JSONDecodeError as e:
-            # 处理JSON解析错误
-            print(f"自动加载数据失败（JSON解析错误）：{str(e)}")
-            self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
         except Exception as e:
             # 处理其他未知错误
             print(f"自动加载数据失败（未知错误）：{str(e)}")
-            self.seat_data = {pos: {"name": "空", "gender": "空"} for pos in self.seat_positions}
-    
-    def capture_seat_layout(self):
-        """将座位表布局转换为图片
-        
+        return {}
+
+    def finish_session_restore(self, result, layout_config):
+        """在主线程中应用读取到的数据，并一次性创建座位按钮"""
+        self.restoring = False
+        with self.timeline.stage("创建座位"):
+            # 读取期间用户已调整布局或导入名单时，以用户的操作为准
+            if result and self.layout_config is layout_config and not self.students:
+                self.class_id = result["class_id"]
+                self.students = result["students"]
+                self.arrangement_record = result["arrangement"]
+                self.generate_seat_positions(result["seat_data"], result["seat_index_map"])
+            elif self.layout_config is layout_config:
+                self.generate_seat_positions(self.seat_data)
+
+        def ready():
+            self.timeline.mark("启动完成")
+            if self.timeline.echo:
+                print(self.timeline.report())
+
+        self.root.after_idle(ready)
+
+    def capture_seat_layout(self, thumbnail=False, seat_data=None):
+        """将当前座位表布局转换为图片
+
+        Args:
+            thumbnail: 为True时走快速路径，只生成不含文字的小缩略图
+            seat_data: 要绘制的座位数据，默认当前座位表
+
         Returns:
             PIL.Image: 座位表布局的图像对象，如果失败则返回None
         """
-        try:
-            # 检查PIL库是否可用
-            if not pillow_available:
-                print("PIL库不可用")
-                return None
-            
-            # 获取座位区域的大小和布局信息
-            # 创建一个适当大小的图像（基于座位数量和布局）
-            rows = self.layout_config['main_rows']
-            cols = self.layout_config['main_cols']
-            
-            # 计算图像尺寸（每个座位100x100像素，留出边距）
-            # 根据座位数量动态调整座位大小，确保图像不会过大
-            base_seat_size = 100
-            max_seats_per_row = 10
-            
-            # 如果列数或行数较多，缩小座位尺寸
-            if cols > max_seats_per_row:
-                seat_size = int(base_seat_size * max_seats_per_row / cols)
-            else:
-                seat_size = base_seat_size
-                
-            # 限制最大尺寸，防止内存问题
-            max_size = 3000
-            margin = 150  # 留出顶部空间显示标题和底部空间显示讲台
-            
-            # 计算初始尺寸
-            img_width = cols * seat_size + margin * 2
-            img_height = rows * seat_size + margin * 2
-            
-            # 如果图像尺寸过大，等比例缩小
-            scale_factor = 1.0
-            if img_width > max_size or img_height > max_size:
-                scale_factor = max_size / max(img_width, img_height)
-                seat_size = int(seat_size * scale_factor)
-                img_width = int(img_width * scale_factor)
-                img_height = int(img_height * scale_factor)
-            
-            # 创建白色背景图像
-            image = Image.new('RGB', (img_width, img_height), color='white')
-            draw = ImageDraw.Draw(image)
-            
-            # 尝试加载中文字体（尝试多个常见的中文字体）
-            font_paths = ["simhei.ttf", "simkai.ttf", "simsun.ttc", "msyh.ttc", "Arial.ttf"]
-            
-            def load_font(size, default=False):
-                if default:
-                    return ImageFont.load_default()
-                
-                for font_path in font_paths:
-                    try:
-                        return ImageFont.truetype(font_path, size)
-                    except (IOError, OSError):
-                        continue
-                
-                # 如果所有字体都加载失败，使用默认字体
-                return ImageFont.load_default()
-            
-            # 加载不同大小的字体
-            font = load_font(16)
-            title_font = load_font(24)
-            small_font = load_font(12)
-            
-            # 添加标题
-            config = configparser.ConfigParser()
-            config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
-            class_name = ""  # 默认值
-            head_teacher = ""  # 默认值
-            
-            if os.path.exists(config_file):
-                config.read(config_file, encoding='utf-8')
-                if '班级信息' in config:
-                    class_name = config['班级信息'].get('班级名称', '')
-                    head_teacher = config['班级信息'].get('班主任', '')
-            
-            # 添加班级信息标题
-            title_text = f"{class_name}"
-            if head_teacher:
-                title_text += f" - 班主任：{head_teacher}"
-            
-            # 计算文本尺寸并居中
-            if hasattr(font, 'getsize'):
-                title_width = font.getsize(title_text)[0]
-            else:
-                title_width = draw.textlength(title_text, font=title_font)
-            
-            draw.text((img_width // 2 - title_width // 2, margin // 3), title_text, font=title_font, fill='black')
-            
-            # 绘制座位
-            for pos, data in self.seat_data.items():
-                row, col = pos
-                # 计算座位在图像中的位置
-                x = margin + col * seat_size
-                y = margin + row * seat_size
-                
-                # 绘制座位背景（根据性别设置不同颜色）
-                if data["gender"] == "男":
-                    fill_color = (220, 240, 255)  # 浅蓝色
-                elif data["gender"] == "女":
-                    fill_color = (255, 220, 230)  # 浅粉色
-                else:
-                    fill_color = (240, 240, 240)  # 浅灰色
-                
-                draw.rectangle([x, y, x + seat_size - 5, y + seat_size - 5], fill=fill_color, outline='black')
-                
-                # 添加座位号
-                seat_idx = self.seat_index_map.get(pos, "")
-                if seat_idx:
-                    if hasattr(font, 'getsize'):
-                        idx_width = font.getsize(str(seat_idx))[0]
-                    else:
-                        idx_width = draw.textlength(str(seat_idx), font=small_font)
-                    draw.text((x + 5, y + 5), str(seat_idx), font=small_font, fill='black')
-                
-                # 添加学生姓名
-                name = data["name"]
-                if name != "空":
-                    if hasattr(font, 'getsize'):
-                        name_width = font.getsize(name)[0]
-                    else:
-                        name_width = draw.textlength(name, font=font)
-                    draw.text((x + seat_size // 2 - name_width // 2, y + seat_size // 2 - 8), name, font=font, fill='black')
-            
-            # 绘制讲台（位于底部）
-            podium_height = 40
-            podium_y = img_height - margin + 20
-            draw.rectangle([img_width // 4, podium_y, img_width * 3 // 4, podium_y + podium_height], fill='lightgray', outline='black')
-            draw.text((img_width // 2 - 20, podium_y + 10), "讲台", font=font, fill='black')
-            
-            return image
-        except Exception as e:
-            print(f"创建座位布局图片失败：{str(e)}")
-            return None
+        if seat_data is None:
+            seat_data = self.seat_data
+        if thumbnail:
+            return render_seat_thumbnail(self.layout_config, seat_data)
+        return render_seat_image(self.layout_config, seat_data, self.seat_index_map, self.settings)
     
     def save_data(self):
         """保存座位布局和学生信息到本地JSON文件（用户手动保存）"""
@@ -1022,15 +6006,8 @@ class StudentSeatTool:
         
         try:
             # 准备要保存的数据
-            # 创建学生列表
-            students_without_scores = [{key: value for key, value in student.items() if key != "成绩"} for student in self.students]
-            
-            save_data = {
-                "layout_config": self.layout_config,
-                "seat_data": {str(pos): data for pos, data in self.seat_data.items()},
-                "seat_index_map": {str(pos): idx for pos, idx in self.seat_index_map.items()},
-                "students": students_without_scores
-            }
+            save_data = build_save_payload(self.layout_config, self.seat_data, self.seat_index_map, self.students,
+                                           self.arrangement_record)
             
             # 保存到文件
             with open(file_path, 'w', encoding='utf-8') as f:
@@ -1048,7 +6025,7 @@ class StudentSeatTool:
             messagebox.showerror("保存错误", f"未知错误：{str(e)}")
     
     def load_data(self):
-        """从本地JSON文件加载座位布局和学生信息"""
+        """从本地JSON文件加载座位布局和学生信息（在新的班级标签页中打开）"""
         file_path = filedialog.askopenfilename(
             filetypes=[("JSON文件", "*.json")]
         )
@@ -1066,38 +6043,21 @@ class StudentSeatTool:
                 messagebox.showerror("错误", "无效的数据文件格式")
                 return
             
-            # 恢复数据
-            self.layout_config = load_data["layout_config"]
-            # 使用类方法安全地解析元组字符串
-            self.seat_data = {}
-            self.seat_index_map = {}
-            for pos_str, data in load_data["seat_data"].items():
-                pos = self.parse_tuple_str(pos_str)
-                if pos:
-                    self.seat_data[pos] = data
-            
-            for pos_str, idx in load_data["seat_index_map"].items():
-                pos = self.parse_tuple_str(pos_str)
-                if pos:
-                    self.seat_index_map[pos] = idx
-            self.students = load_data["students"]
-            
-            # 更新座位布局
-            self.generate_seat_positions()
-            # 重新应用座位数据
-            # 使用类方法安全地解析元组字符串
-            self.seat_data = {}
-            self.seat_index_map = {}
-            for pos_str, data in load_data["seat_data"].items():
-                pos = self.parse_tuple_str(pos_str)
-                if pos:
-                    self.seat_data[pos] = data
-            
-            for pos_str, idx in load_data["seat_index_map"].items():
-                pos = self.parse_tuple_str(pos_str)
-                if pos:
-                    self.seat_index_map[pos] = idx
-            self.update_seat_buttons()
+            # 在新标签页中打开；使用数据库保存时同一班级只保留一个标签页
+            if self.store is None:
+                opened = self.find_session(file_path=file_path)
+                # 打开的是默认存档时仍按默认班级处理
+                session_file = None if same_path(file_path, self.session_file(ClassSession())) else file_path
+            else:
+                # 与数据库中同名的班级视为同一班级（覆盖该班级），未命名的班级作为新班级保存
+                class_name = load_data["layout_config"].get("class_name", "")
+                class_id = self.store.find_class(class_name) if class_name else None
+                load_data = dict(load_data, class_id=class_id)
+                opened = self.find_session(class_id=class_id)
+                session_file = None
+            self.open_session(self.session_from_payload(load_data, session_file))
+            if opened is not None:
+                self.close_session(opened)
             
             messagebox.showinfo("成功", "数据已成功加载")
             # 加载数据后自动保存（确保数据一致性）
@@ -1117,395 +6077,808 @@ class StudentSeatTool:
 
     def export_pdf(self):
         try:
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage
-            from reportlab.lib.units import cm
-            # 添加字体配置
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            # 添加样式导入
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            import reportlab
         except ImportError:
             messagebox.showerror("错误", "请先安装reportlab：pip install reportlab")
             return
-        
-        # 从布局配置中获取班级和班主任信息（非必填）
-        class_info = self.layout_config.get("class_name", "")
-        teacher_info = self.layout_config.get("teacher_name", "")
-        
-        file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
+        self.export_single("pdf", "PDF", [("PDF", "*.pdf")])
+
+    def export_layout_to_word(self):
+        if not docx_available:
+            messagebox.showerror("错误", "请先安装python-docx：pip install python-docx")
+            return
+        self.export_single("docx", "Word文档", [("Word文档", "*.docx")])
+
+    def export_image(self):
+        if not pillow_available:
+            messagebox.showerror("错误", "请先安装pillow：pip install pillow")
+            return
+        self.export_single("png", "图片", [("PNG图片", "*.png")])
+
+    def export_html(self):
+        self.export_single("html", "网页", [("网页", "*.html")])
+
+    def export_svg(self):
+        self.export_single("svg", "SVG图片", [("SVG图片", "*.svg")])
+
+    def export_xlsx(self):
+        if not openpyxl_available:
+            messagebox.showerror("错误", "请先安装openpyxl：pip install openpyxl")
+            return
+        self.export_single("xlsx", "Excel表格", [("Excel表格", "*.xlsx")])
+
+    def export_class_portal(self):
+        """把数据库中所有班级导出为网页，并生成索引页，供学校网站发布"""
+        output_dir = filedialog.askdirectory(title="选择网页导出文件夹")
+        if not output_dir:
+            return
+        # 先保存当前班级，确保网页是最新的
+        self.auto_save_data()
+        try:
+            count = write_class_portal(self.store, output_dir, self.settings)
+            messagebox.showinfo("成功", f"已导出{count}个班级的网页，索引页：index.html")
+        except Exception as e:
+            messagebox.showerror("导出错误", f"网页导出失败：{str(e)}")
+
+    def export_class_workbook(self):
+        """把数据库中所有班级导出到一个Excel文件，每个班级一个工作表"""
+        if not openpyxl_available:
+            messagebox.showerror("错误", "请先安装openpyxl：pip install openpyxl")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel表格", "*.xlsx")])
         if not file_path:
             return
-        
-        # 配置中文字体
+        self.auto_save_data()
         try:
-            # 尝试注册Windows系统中的宋体
-            pdfmetrics.registerFont(TTFont('SimSun', 'simsun.ttc'))
-            # 尝试注册Windows系统中的微软雅黑
-            pdfmetrics.registerFont(TTFont('MicrosoftYaHei', 'msyh.ttc'))
-        except:
-            # 如果注册失败，使用reportlab默认字体
+            count = write_class_workbook(self.store, file_path, self.settings)
+            messagebox.showinfo("成功", f"已导出{count}个班级的座位表")
+        except Exception as e:
+            messagebox.showerror("导出错误", f"Excel导出失败：{str(e)}")
+
+    def export_single(self, output_format, title, filetypes):
+        """选择保存位置后导出一种格式"""
+        file_path = filedialog.asksaveasfilename(defaultextension=f".{output_format}", filetypes=filetypes)
+        if not file_path:
+            return
+        try:
+            write_export(file_path, output_format, self.layout_config, self.seat_data, self.seat_index_map,
+                         self.seat_positions, self.students, self.settings, self.arrangement_record)
+            messagebox.showinfo("成功", f"座位布局已导出为{title}")
+        except Exception as e:
+            messagebox.showerror("导出错误", f"{title}导出失败：{str(e)}")
+
+    def export_all(self):
+        """选择文件夹后在后台同时导出所有格式，界面不卡顿"""
+        output_dir = filedialog.askdirectory(title="选择导出文件夹")
+        if not output_dir:
+            return
+        basename = self.layout_config["class_name"] or "座位表"
+        # 后台线程使用配置快照，导出过程中修改配置不会导致各格式不一致
+        args = (output_dir, basename, EXPORT_FORMATS, self.layout_config, dict(self.seat_data),
+                dict(self.seat_index_map), list(self.seat_positions), list(self.students),
+                self.settings.snapshot(), self.arrangement_record)
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(export_all_formats(*args)), daemon=True)
+        worker.start()
+        self.root.config(cursor="watch")
+
+        def poll():
+            if worker.is_alive():
+                self.root.after(100, poll)
+                return
+            self.root.config(cursor="")
+            lines = []
+            for output_format, outcome in result.items():
+                if isinstance(outcome, Exception):
+                    lines.append(f"{output_format}：失败（{outcome}）")
+                else:
+                    lines.append(f"{output_format}：{os.path.basename(outcome)}")
+            messagebox.showinfo("全部导出", f"已导出到{output_dir}\n" + "\n".join(lines))
+
+        self.root.after(100, poll)
+
+
+# ---------------------- HTTP接口服务模式 ----------------------
+class SeatingAPIServer:
+    """座位表HTTP接口服务（仅依赖标准库asyncio，无需图形界面）
+
+    接口：
+        GET  /health   服务状态
+        POST /arrange  上传名单与布局配置，返回排座结果
+
+    POST /arrange 支持两种请求体：
+        1. application/json：{"layout_config": {...}, "students": [...] 或 "roster": 名单文件的base64,
+           "roster_format": "xlsx|csv|tsv|...",
+           "method": "random|height|score", "reverse": true, "seed": 1, "format": "json|png|pdf|docx|html|svg|xlsx"}
+        2. 直接上传名单文件（Content-Type为text/csv时按CSV读取，否则按roster_format参数，默认xlsx），
+           参数通过查询字符串传递，如
+           /arrange?method=height&format=pdf&main_rows=6&main_cols=8
+    """
+
+    MAX_BODY_SIZE = 20 * 1024 * 1024
+    READ_TIMEOUT = 30
+    MAX_SEATS = 5000
+
+    CONTENT_TYPES = {
+        "json": "application/json; charset=utf-8",
+        "png": "image/png",
+        "pdf": "application/pdf",
+        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "html": "text/html; charset=utf-8",
+        "svg": "image/svg+xml; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+    # 上传名单的Content-Type -> 名单格式
+    ROSTER_CONTENT_TYPES = {
+        "text/csv": "csv",
+        "text/tab-separated-values": "tsv",
+    }
+
+    def __init__(self, host="127.0.0.1", port=8765, workers=4, strategy_worker=None):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # 配置只在启动时读取一次，各请求共用
+        self.settings = SettingsService(os.path.join(get_base_dir(), "config.ini"))
+        # 运行自定义排座策略的策略进程（见load_custom_strategies），没有时只能使用内置策略
+        self.strategy_worker = strategy_worker
+
+    def warm_up(self):
+        """预先加载字体与Word模板，首个请求无需等待"""
+        if pillow_available:
+            for size in (12, 16, 24):
+                load_pil_font(size)
+        if docx_available:
+            new_word_document()
+        try:
+            register_pdf_fonts()
+        except ImportError:
             pass
-        
-        # 创建PDF文档 - 使用纵向A4页面
-        doc = SimpleDocTemplate(file_path, pagesize=A4)
-        elements = []
-        
-        # 添加标题
-        styles = getSampleStyleSheet()
-        # 设置标题样式：微软雅黑，小初大小（约36pt），居中对齐
+
+    def serve_forever(self):
+        """启动服务并一直运行，直到按Ctrl+C"""
         try:
-            styles['Title'].fontName = 'MicrosoftYaHei'
-        except:
-            # 如果微软雅黑不可用，使用宋体作为备选
-            styles['Title'].fontName = 'SimSun'
-        
-        styles['Title'].fontSize = 36  # 小初大小约为36pt
-        styles['Title'].alignment = 1  # 1表示居中对齐
-        
-        # 设置正文样式为宋体四号（14pt）
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=False)
+            if self.strategy_worker is not None:
+                self.strategy_worker.stop()
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.warm_up)
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"座位表接口服务已启动：http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        """解析一个HTTP请求并返回响应（每个连接只处理一个请求）"""
         try:
-            styles['BodyText'].fontName = 'SimSun'
-        except:
-            pass  # 如果字体不可用，使用默认字体
-        styles['BodyText'].fontSize = 14  # 四号字体约为14pt
-        styles['BodyText'].alignment = 0  # 0表示居左对齐（修复备注居左显示）
-        
-        # 添加座位表标题（居中显示，每个字间隔指定空格数，从配置文件读取设置）
-        main_title = self.config.get("Export", "main_title", fallback="座位表")
-        space_count = self.config.getint("Export", "title_space_count", fallback=2)
-        
-        spaced_title = " ".join(main_title)  # 为每个字添加一个空格间隔
-        # 根据配置的空格数添加额外空格
-        if space_count > 1:
-            spaced_title = spaced_title.replace(" ", " " * space_count)
-        
-        # 设置标题为指定字体、大小、加粗、黑色文本
-        title_text_color = self.config.get("Color", "title_text_color", fallback="black")
-        if hasattr(colors, title_text_color):
-            styles['Title'].textColor = getattr(colors, title_text_color)
-        else:
-            styles['Title'].textColor = colors.black  # 默认黑色
-            
-        # 设置标题下划线颜色
-        title_underline_color = self.config.get("Color", "title_underline_color", fallback="black")
-        if hasattr(colors, title_underline_color):
-            styles['Title'].textUnderlineColor = getattr(colors, title_underline_color)
-        else:
-            styles['Title'].textUnderlineColor = colors.black  # 默认黑色
-            
-        title = Paragraph(f"<b><u>{spaced_title}</u></b>", styles['Title'])
-        elements.append(title)
-        
-        # 添加空行作为标题和班级信息之间的间距，避免标题遮挡班级信息
-        elements.append(Spacer(1, 0.3*cm))
-        
-        # 添加班级和班主任信息（仅在有信息时显示，居中显示，班级和班主任姓名带下划线）
-        if class_info or teacher_info:
-            info_parts = []
-            if class_info:
-                # 班级名称带下划线
-                info_parts.append(f"班级：<u>{class_info}</u>")
-            if teacher_info:
-                # 班主任姓名带下划线
-                info_parts.append(f"班主任：<u>{teacher_info}</u>")
-            info_text = "  ".join(info_parts)
-            # 创建一个居中对齐的样式来显示班级信息
-            info_style = ParagraphStyle('InfoText', parent=styles['BodyText'])
-            info_style.alignment = 1  # 1表示居中对齐
-            info_paragraph = Paragraph(info_text, info_style)
-            elements.append(info_paragraph)
-        
-        # 添加空行
-        elements.append(Spacer(1, 0.5*cm))
-        
-        # 使用座位布局图片替代表格
-        image_success = False
-        
+            try:
+                status, content_type, body, extra_headers = await asyncio.wait_for(
+                    self._read_and_dispatch(reader), self.READ_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                status, content_type, body, extra_headers = self._error(HTTPStatus.REQUEST_TIMEOUT, "请求超时")
+            except (ValueError, asyncio.IncompleteReadError):
+                status, content_type, body, extra_headers = self._error(HTTPStatus.BAD_REQUEST, "请求格式错误")
+            except Exception as e:
+                # 其他意外错误也要返回响应，不能直接断开连接
+                print(f"处理请求出错：{type(e).__name__}: {e}")
+                status, content_type, body, extra_headers = self._error(
+                    HTTPStatus.INTERNAL_SERVER_ERROR, f"服务器内部错误：{type(e).__name__}")
+            head = [
+                f"HTTP/1.1 {status.value} {status.phrase}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                "Connection: close",
+            ]
+            head.extend(f"{key}: {value}" for key, value in extra_headers.items())
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_and_dispatch(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, value = line.decode("latin-1").split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > self.MAX_BODY_SIZE:
+            return self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "上传内容过大")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urllib.parse.urlsplit(target)
+        query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        if url.path == "/health" and method == "GET":
+            return self._json(HTTPStatus.OK, {"status": "ok"})
+        if url.path == "/arrange" and method == "POST":
+            # 排座与导出在线程池中执行，不阻塞事件循环
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self.process_arrange, body, headers.get("content-type", ""), query
+            )
+        return self._error(HTTPStatus.NOT_FOUND, "接口不存在")
+
+    def process_arrange(self, body, content_type, query):
+        """执行一次排座请求（在工作线程中运行）"""
         try:
-            # 生成座位布局图片
-            seat_image = self.capture_seat_layout()
-            
-            if seat_image:
-                try:
-                    # 临时保存图片到内存
-                    import io
-                    img_buffer = io.BytesIO()
-                    seat_image.save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    
-                    # 计算图片大小，使其适应A4页面（减去边距）
-                    page_width, page_height = A4  # A4尺寸
-                    margin = 2 * cm  # 边距
-                    available_width = page_width - 2 * margin  # 可用宽度
-                    available_height = page_height - 6 * cm  # 可用高度（考虑标题、备注等内容）
-                    
-                    # 计算图片尺寸，保持原始宽高比
-                    img_width, img_height = seat_image.size
-                    aspect_ratio = img_height / img_width
-                    
-                    # 首先尝试按宽度缩放
-                    display_width = available_width
-                    display_height = display_width * aspect_ratio
-                    
-                    # 如果高度超出可用空间，则按高度缩放
-                    if display_height > available_height:
-                        display_height = available_height
-                        display_width = display_height / aspect_ratio
-                    
-                    # 确保图片不会太小
-                    min_size = 5 * cm
-                    if display_width < min_size or display_height < min_size:
-                        scale_factor = min_size / min(display_width, display_height)
-                        display_width *= scale_factor
-                        display_height *= scale_factor
-                    
-                    # 添加图片到PDF
-                    rl_image = RLImage(img_buffer, width=display_width, height=display_height)
-                    elements.append(rl_image)
-                    image_success = True
-                except Exception as e:
-                    print(f"添加座位布局图片到PDF失败：{str(e)}")
-                    # 如果图片添加失败，显示错误信息
-                    error_text = Paragraph(f"<b>座位布局图片添加失败：{str(e)}</b>", styles['BodyText'])
-                    elements.append(error_text)
+            if content_type.startswith("application/json"):
+                params = json.loads(body.decode("utf-8"))
+                if "students" in params:
+                    students = params["students"]
+                elif "roster" in params:
+                    students = read_roster(io.BytesIO(base64.b64decode(params["roster"])),
+                                           params.get("roster_format", "xlsx"))
+                else:
+                    return self._error(HTTPStatus.BAD_REQUEST, "需要提供students或roster")
+                layout_config = dict(DEFAULT_LAYOUT_CONFIG, **params.get("layout_config", {}))
             else:
-                # 如果图片生成失败，显示错误信息
-                error_text = Paragraph("<b>座位布局图片生成失败，请检查座位数据</b>", styles['BodyText'])
-                elements.append(error_text)
-                
-            # 如果图片添加成功，添加空行
-            if image_success:
-                elements.append(Spacer(1, 0.5*cm))
-                
-        except Exception as e:
-            # 捕获任何未预期的错误
-            print(f"处理座位布局图片时发生错误：{str(e)}")
-            error_text = Paragraph(f"<b>处理座位布局图片时发生错误：{str(e)}</b>", styles['BodyText'])
-            elements.append(error_text)
-        
-        # 添加备注信息
-        elements.append(Spacer(1, 1*cm))  # 添加垂直间距
-        note_text = Paragraph("<b>备注：</b>", styles['BodyText'])
-        elements.append(note_text)
-        note_content1 = Paragraph("1、座位安排主要依据为身高，同时参考学生性别、性格、学习成绩等因素进行互补性编排；", styles['BodyText'])
-        elements.append(note_content1)
-        note_content2 = Paragraph("2、班级座位每月根据实际情况调整。", styles['BodyText'])
-        elements.append(note_content2)
-        
-        # 构建PDF文档
+                params = query
+                mime_type = content_type.split(";")[0].strip().lower()
+                students = read_roster(io.BytesIO(body), self.ROSTER_CONTENT_TYPES.get(
+                    mime_type, query.get("roster_format", "xlsx")))
+                layout_config = dict(DEFAULT_LAYOUT_CONFIG)
+                for key in ("podium_seats", "main_rows", "main_cols"):
+                    if key in query:
+                        layout_config[key] = int(query[key])
+                for key in ("class_name", "teacher_name"):
+                    if key in query:
+                        layout_config[key] = query[key]
+
+            method = params.get("method", "random")
+            output_format = params.get("format", "json")
+            reverse = str(params.get("reverse", "true")).lower() not in ("false", "0")
+            seed = params.get("seed")
+            if method not in ARRANGE_STRATEGIES:
+                return self._error(HTTPStatus.BAD_REQUEST, f"未知的排座方式：{method}")
+            if output_format not in self.CONTENT_TYPES:
+                return self._error(HTTPStatus.BAD_REQUEST, f"不支持的输出格式：{output_format}")
+            podium_seats = int(layout_config["podium_seats"])
+            main_rows = int(layout_config["main_rows"])
+            main_cols = int(layout_config["main_cols"])
+            if podium_seats < 0 or podium_seats > 4 or main_rows < 1 or main_cols < 1:
+                return self._error(HTTPStatus.BAD_REQUEST, "行数/列数需≥1，讲台侧座位数需≥0且≤4")
+            if main_rows * main_cols > self.MAX_SEATS:
+                return self._error(HTTPStatus.BAD_REQUEST, f"座位数不能超过{self.MAX_SEATS}")
+            layout_config.update(podium_seats=podium_seats, main_rows=main_rows, main_cols=main_cols)
+            report = validate_roster(students, len(build_seat_positions(layout_config)))
+            if report["errors"]:
+                return self._json(HTTPStatus.BAD_REQUEST, {
+                    "error": "名单有误：" + format_roster_report(report), "roster_report": report})
+            students = coerce_roster_numbers(students)
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            return self._error(HTTPStatus.BAD_REQUEST, f"请求参数错误：{str(e)}")
+        except ImportError as e:
+            return self._error(HTTPStatus.NOT_IMPLEMENTED, f"服务端缺少依赖库：{str(e)}")
+
+        seat_positions = build_seat_positions(layout_config)
+        seat_index_map = {pos: idx + 1 for idx, pos in enumerate(seat_positions)}
         try:
-            doc.build(elements)
-            messagebox.showinfo("成功", "座位布局已导出为PDF")
+            seat_data, arrangement = run_arrangement(
+                students, seat_positions, layout_config, method, reverse, seed,
+                self.strategy_worker, self.settings.getfloat("Strategy", "timeout"))
+        except ValueError as e:
+            # 排座策略返回的结果不合法等
+            return self._error(HTTPStatus.BAD_REQUEST, f"排座失败：{str(e)}")
         except Exception as e:
-            messagebox.showerror("导出错误", f"PDF导出失败：{str(e)}")
-    
-    def export_layout_to_word(self):
-        if not docx_available:
-            messagebox.showerror("错误", "请先安装python-docx：pip install python-docx")
-            return
-        
-        # 导入必要的docx模块
-        from docx.shared import Inches, Pt, Cm
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.enum.table import WD_ALIGN_VERTICAL
-        
-        # 从布局配置中获取班级和班主任信息（非必填）
-        class_info = self.layout_config.get("class_name", "")
-        teacher_info = self.layout_config.get("teacher_name", "")
-        
-        file_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word文档", "*.docx")])
-        if not file_path:
-            return
-        
-        doc = Document()
-        
-        # 添加居中的座位表标题，设置为微软雅黑，小初大小（约36pt）
-        title = doc.add_heading('', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # 为标题文本添加两个空格间隔
-        title_text = "座位表"
-        spaced_title = "  ".join(title_text)  # 每个字之间添加两个空格
-        
-        # 创建标题run并设置字体样式：微软雅黑，小初大小，加粗，黑色文本，下划线为黑色填充
-        title_run = title.add_run(spaced_title)
-        title_run.font.name = '微软雅黑'
-        title_run.font.size = Pt(36)  # 小初大小约为36pt
-        title_run.bold = True
-        # 设置文本颜色为黑色
-        from docx.shared import RGBColor
-        title_run.font.color.rgb = RGBColor(0, 0, 0)  # 黑色
-        # 设置下划线为黑色填充
-        title_run.underline = True
-        # 确保下划线颜色为黑色（python-docx默认下划线颜色与文本颜色相同）
-        
-        # 添加空行作为标题和班级信息之间的间距，避免标题遮挡班级信息
-        doc.add_paragraph()
-        
-        # 添加班级和班主任信息（仅在有信息时显示，居中显示，班级和班主任姓名带下划线）
-        if class_info or teacher_info:
-            info_paragraph = doc.add_paragraph()
-            info_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER  # 确保班级信息居中显示
-            
-            # 分别处理班级和班主任信息，为姓名添加下划线，所有文本设置为宋体四号
-            if class_info:
-                run1 = info_paragraph.add_run("班级：")
-                run1.font.name = '宋体'
-                run1.font.size = Pt(14)  # 四号字体
-                # 班级名称带下划线
-                class_run = info_paragraph.add_run(class_info)
-                class_run.underline = True
-                class_run.font.name = '宋体'
-                class_run.font.size = Pt(14)  # 四号字体
-                
-            if class_info and teacher_info:
-                run_space = info_paragraph.add_run("  ")
-                run_space.font.name = '宋体'
-                run_space.font.size = Pt(14)  # 四号字体
-            
-            if teacher_info:
-                run2 = info_paragraph.add_run("班主任：")
-                run2.font.name = '宋体'
-                run2.font.size = Pt(14)  # 四号字体
-                # 班主任姓名带下划线
-                teacher_run = info_paragraph.add_run(teacher_info)
-                teacher_run.underline = True
-                teacher_run.font.name = '宋体'
-                teacher_run.font.size = Pt(14)  # 四号字体
-
-        # 获取布局配置参数
-        main_rows = self.layout_config["main_rows"]
-        main_cols = self.layout_config["main_cols"]
-        podium_seats = self.layout_config["podium_seats"]
-        
-        # 计算总宽度和讲台参数，与generate_seat_positions方法保持一致
-        total_width = max(main_cols, 4)  # 增加最小宽度以适应2格讲台
-        podium_width = 2  # 讲台固定占用2格
-        podium_start_col = (total_width - podium_width + 1) // 2  # 讲台始终居中
-        podium_row = main_rows + 1  # 讲台行位置（教师视角：讲台在下方）
-        
-        # 创建一个表格来表示座位布局，包含所有需要的行和列
-        table = doc.add_table(rows=podium_row + 1, cols=total_width)
-        table.style = 'Table Grid'  # 设置表格样式为网格
-        
-        # 设置表格为自动调整以适应窗口宽度
-        # 使用try-except块确保兼容性
+            return self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f"排座失败：{type(e).__name__}: {e}")
+
+        if output_format == "json":
+            return self._json(HTTPStatus.OK, build_save_payload(
+                layout_config, seat_data, seat_index_map, students, arrangement))
+        buffer = io.BytesIO()
         try:
-            # 获取表格的属性
-            tbl = table._tbl
-            
-            # 使用更兼容的方式设置表格宽度属性
-            if hasattr(tbl, 'get_or_add_tblPr'):
-                tblPr = tbl.get_or_add_tblPr()
-            else:
-                # 尝试其他可能的方法或直接使用XML操作
-                from docx.oxml.shared import OxmlElement, qn
-                tblPr = OxmlElement('w:tblPr')
-                tbl.insert(0, tblPr)
-            
-            # 添加自动调整属性
-            if hasattr(tblPr, 'add_tblW'):
-                tblW = tblPr.add_tblW()
-            else:
-                tblW = OxmlElement('w:tblW')
-                tblPr.append(tblW)
-            
-            tblW.set(qn('w:type'), 'auto')
-            tblW.set(qn('w:w'), '0')
+            write_export(buffer, output_format, layout_config, seat_data, seat_index_map,
+                         seat_positions, students, self.settings)
+        except ImportError as e:
+            return self._error(HTTPStatus.NOT_IMPLEMENTED, f"服务端缺少依赖库：{str(e)}")
         except Exception as e:
-            # 记录错误但不中断程序执行
-            print(f"设置表格自动调整属性时出错: {e}")
+            return self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f"导出失败：{str(e)}")
+        headers = {
+            "Content-Disposition": f'attachment; filename="seating.{output_format}"',
+            # 非JSON格式通过响应头返回指纹，便于按指纹重新生成
+            "X-Arrangement-Fingerprint": arrangement["fingerprint"],
+            "X-Arrangement-Seed": str(arrangement["seed"])
+        }
+        return HTTPStatus.OK, self.CONTENT_TYPES[output_format], buffer.getvalue(), headers
 
-        # 填充讲台信息 - 独立居中显示
-        podium_cell = table.cell(podium_row, podium_start_col)
-        podium_cell.merge(table.cell(podium_row, podium_start_col + podium_width - 1))
-        
-        # 设置讲台单元格样式：宋体四号，行高1.5CM，垂直居中
-        podium_cell.text = ""
-        podium_run = podium_cell.paragraphs[0].add_run("讲台")
-        podium_run.font.name = '宋体'
-        podium_run.font.size = Pt(14)
-        podium_cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        podium_cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-        podium_cell.height = Cm(1.5)
-        
-        # 设置讲台单元格背景色以突出显示
-        podium_run.font.color.rgb = RGBColor(255, 255, 255)  # 白色文字
-        shading_elm = parse_xml(r'<w:shd {} w:fill="9C27B0"/>'.format(nsdecls('w')))
-        podium_cell._tc.get_or_add_tcPr().append(shading_elm)
+    def _json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        return status, self.CONTENT_TYPES["json"], body, {}
 
-        # 设置所有单元格格式：宋体四号，垂直居中，行高1CM
-        
-        # 遍历所有单元格设置格式
-        for row_idx in range(podium_row + 1):
-            for col_idx in range(total_width):
-                cell = table.cell(row_idx, col_idx)
-                # 设置单元格垂直居中
-                cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                # 设置单元格行高为1.5CM
-                cell.height = Cm(1.5)
-                # 设置段落水平居中
-                for paragraph in cell.paragraphs:
-                    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    # 设置字体为宋体四号（约14pt）
-                    for run in paragraph.runs:
-                        run.font.name = '宋体'
-                        run.font.size = Pt(14)
-                    # 如果段落没有run，添加一个默认run
-                    if not cell.paragraphs[0].runs:
-                        run = cell.paragraphs[0].add_run()
-                        run.font.name = '宋体'
-                        run.font.size = Pt(14)
-        
-        # 填充座位信息
-        for pos in self.seat_positions:
-            r, c = pos
+    def _error(self, status, message):
+        return self._json(status, {"error": message})
+
+
+# ---------------------- 监视文件夹自动生成模式 ----------------------
+class RosterFolderWatcher:
+    """监视名单文件夹，只为输入发生变化的班级重新导入、排座和导出
+
+    文件夹约定：
+        <班级>.xlsx / .xls / .csv 等   班级学生名单（支持的格式见ROSTER_READERS），文件名即班级标识
+        <班级>.ini                 可选，该班级的布局配置（格式同config.ini的Layout节）
+        config.ini                 可选，文件夹内所有班级共用的布局配置
+    生成结果写入 <文件夹>/输出/ 目录，已处理输入的哈希记录在 .seat_watch_state.json 中，
+    重启后未变化的班级也不会重复生成；生成失败的班级同样记录输入哈希，输入改变后才重试。
+    """
+
+    STATE_FILE = ".seat_watch_state.json"
+    OUTPUT_DIR = "输出"
+    # 除布局外导出时用到的配置节（见build_seat_scene），修改后重新生成
+    EXPORT_SECTIONS = ("Export", "Color")
+
+    def __init__(self, folder, method="height", formats=("pdf", "docx", "png", "json"), interval=2.0, workers=4,
+                 strategy_worker=None, strategy_timeout=10.0):
+        self.folder = os.path.abspath(folder)
+        self.output_dir = os.path.join(self.folder, self.OUTPUT_DIR)
+        self.method = method
+        # 自定义排座策略在策略进程中运行，超时后终止
+        self.strategy_worker = strategy_worker
+        self.strategy_timeout = strategy_timeout
+        self.formats = tuple(formats)
+        self.interval = interval
+        self.workers = workers
+        self.state_path = os.path.join(self.folder, self.STATE_FILE)
+        self.state = self.load_state()
+        # 文件stat缓存：大小与修改时间不变时直接复用上次的哈希，不重新读取文件
+        self._hash_cache = {}
+        for class_id, recorded in self.state.items():
+            if "roster_file" in recorded and "roster_stat" in recorded:
+                path = os.path.join(self.folder, recorded["roster_file"])
+                self._hash_cache[path] = (tuple(recorded["roster_stat"]), recorded["roster_hash"])
+        self._state_dirty = False
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self):
+        # 先写临时文件再替换，避免中途退出留下损坏的状态文件
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+        self._state_dirty = False
+
+    def file_digest(self, path):
+        """返回文件内容的sha256，文件大小与修改时间未变时使用缓存"""
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._hash_cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        digest = file_sha256(path)
+        self._hash_cache[path] = (key, digest)
+        return digest
+
+    def resolve_layout(self, class_id):
+        """返回（布局配置，合并后的配置，配置哈希）：班级ini优先，其次为文件夹config.ini，最后为默认值
+
+        配置哈希包括布局和导出用到的各配置节（标题、颜色等），其中任何一项修改都会重新生成。
+        """
+        config = configparser.ConfigParser()
+        shared_path = os.path.join(self.folder, "config.ini")
+        if os.path.exists(shared_path):
+            config.read(shared_path, encoding='utf-8')
+        class_config = configparser.ConfigParser()
+        class_path = os.path.join(self.folder, f"{class_id}.ini")
+        if os.path.exists(class_path):
+            class_config.read(class_path, encoding='utf-8')
+            # 班级配置覆盖共用配置
+            config.read(class_path, encoding='utf-8')
+        layout_config = read_layout_config(config)
+        # 共用配置中的班级名称不适用于各个班级，未单独配置时使用文件名
+        if not class_config.get("Layout", "class_name", fallback=""):
+            layout_config["class_name"] = class_id
+        export_settings = {section: dict(config.items(section)) for section in self.EXPORT_SECTIONS
+                           if config.has_section(section)}
+        config_hash = hashlib.sha256(
+            json.dumps([layout_config, export_settings], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return layout_config, config, config_hash
+
+    def scan(self):
+        """扫描文件夹，返回需要重新生成的班级列表[(班级标识, 名单路径, 输入指纹)]"""
+        changed = []
+        seen = set()
+        for entry in os.scandir(self.folder):
+            # 跳过Excel打开文件时生成的锁文件，以及状态文件等隐藏文件
+            if not entry.is_file() or entry.name.startswith(("~$", ".")):
+                continue
+            class_id, ext = os.path.splitext(entry.name)
+            if ext.lower() not in ROSTER_EXTENSIONS:
+                continue
+            seen.add(class_id)
             try:
-                # 确保在表格范围内
-                if 0 <= r <= podium_row and 0 <= c < total_width:
-                    cell = table.cell(r, c)
-                    data = self.seat_data[pos]
-                    # 任务3：更新导出逻辑，使座位有学生时显示名字，无学生时显示为空
-                    if data['name'] and data['name'] != "空":
-                        # 清除现有内容，添加新的格式化文本
-                        cell.text = ""
-                        run = cell.paragraphs[0].add_run(data['name'])
-                        run.font.name = '宋体'
-                        run.font.size = Pt(14)
-                        cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    else:
-                        cell.text = ""  # 空白单元格
-            except Exception:
-                pass  # 忽略单元格填充错误
-        
-        # 添加备注信息
-        # 添加空行作为间距
-        doc.add_paragraph()
-        
-        # 添加备注标题（加粗，居左显示）
-        note_title = doc.add_paragraph()
-        note_run = note_title.add_run("备注：")
-        note_run.bold = True
-        note_title.alignment = WD_ALIGN_PARAGRAPH.LEFT  # 设置备注标题居左
-        
-        # 添加备注内容1（居左显示）
-        note_content1 = doc.add_paragraph("1、座位安排主要依据为身高，同时参考学生性别、性格、学习成绩等因素进行互补性编排；")
-        note_content1.alignment = WD_ALIGN_PARAGRAPH.LEFT  # 设置备注内容1居左
-        
-        # 添加备注内容2（居左显示）
-        note_content2 = doc.add_paragraph("2、班级座位每月根据实际情况调整。")
-        note_content2.alignment = WD_ALIGN_PARAGRAPH.LEFT  # 设置备注内容2居左
-        
+                roster_hash = self.file_digest(entry.path)
+            except OSError:
+                # 文件可能正在被复制，下一轮再处理
+                continue
+            _, _, config_hash = self.resolve_layout(class_id)
+            fingerprint = {
+                "roster_hash": roster_hash,
+                "config_hash": config_hash,
+                "method": self.method,
+                "formats": list(self.formats),
+            }
+            recorded = self.state.get(class_id, {})
+            if any(recorded.get(key) != value for key, value in fingerprint.items()):
+                changed.append((class_id, entry.path, fingerprint))
+        # 名单已删除的班级不再记录
+        for class_id in list(self.state):
+            if class_id not in seen:
+                del self.state[class_id]
+                self._state_dirty = True
+        return changed
+
+    def regenerate(self, class_id, roster_path, fingerprint):
+        """重新导入、排座并导出一个班级，返回生成的文件列表"""
+        # 连同扫描时的文件状态一起传入，扫描后名单又被修改时load_roster会重新计算哈希
+        students = load_roster(roster_path, fingerprint["roster_hash"],
+                               stat_key=self._hash_cache.get(roster_path, (None,))[0])
+        layout_config, config, _ = self.resolve_layout(class_id)
+        seat_positions = build_seat_positions(layout_config)
+        report = validate_roster(students, len(seat_positions))
+        if report["errors"]:
+            raise ValueError("名单有误\n" + format_roster_report(report))
+        if report["warnings"]:
+            print(f"[{class_id}] 名单提示\n{format_roster_report(report)}")
+        students = coerce_roster_numbers(students)
+        seat_index_map = {pos: idx + 1 for idx, pos in enumerate(seat_positions)}
+        # 随机排列以名单文件哈希为种子，同一输入总是得到同一结果
+        seat_data, arrangement = run_arrangement(
+            students, seat_positions, layout_config, self.method, True, fingerprint["roster_hash"],
+            self.strategy_worker, self.strategy_timeout)
+        # 各格式共用同一份场景描述
+        scene = build_seat_scene(layout_config, seat_data, seat_index_map, config)
+        outputs = []
+        for output_format in self.formats:
+            path = os.path.join(self.output_dir, f"{class_id}.{output_format}")
+            try:
+                write_export(path, output_format, layout_config, seat_data, seat_index_map,
+                             seat_positions, students, config, arrangement, scene)
+                outputs.append(path)
+            except ImportError as e:
+                print(f"[{class_id}] 跳过{output_format}导出：缺少依赖库{str(e)}")
+        return outputs
+
+    def run_once(self):
+        """执行一轮扫描与增量生成，返回本轮重新生成的班级数"""
+        changed = self.scan()
+        if not changed:
+            if self._state_dirty:
+                self.save_state()
+            return 0
+        os.makedirs(self.output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.regenerate, *item): item for item in changed}
+            for future, (class_id, roster_path, fingerprint) in futures.items():
+                recorded = dict(
+                    fingerprint,
+                    roster_file=os.path.basename(roster_path),
+                    roster_stat=list(self._hash_cache[roster_path][0])
+                )
+                try:
+                    outputs = future.result()
+                except Exception as e:
+                    # 记下失败时的输入：输入不变时不再每轮重试和重复输出错误，上次生成的文件保留
+                    print(f"[{class_id}] 生成失败：{str(e)}")
+                    recorded["outputs"] = self.state.get(class_id, {}).get("outputs", [])
+                    recorded["error"] = str(e)
+                    self.state[class_id] = recorded
+                    continue
+                recorded["outputs"] = [os.path.basename(p) for p in outputs]
+                self.state[class_id] = recorded
+                print(f"[{class_id}] 已重新生成：{'、'.join(os.path.basename(p) for p in outputs)}")
+        self.save_state()
+        if "html" in self.formats:
+            self.write_index()
+        return len(changed)
+
+    def write_index(self):
+        """生成输出目录下的班级索引页index.html，链接到各班级的网页"""
+        entries = [
+            {"class_name": class_id, "teacher_name": "", "href": urllib.parse.quote(f"{class_id}.html")}
+            for class_id in sorted(self.state)
+            if f"{class_id}.html" in self.state[class_id].get("outputs", [])
+        ]
+        write_text_stream(os.path.join(self.output_dir, "index.html"), iter_class_index_html(entries))
+
+    def watch_forever(self):
+        """持续轮询文件夹，直到按Ctrl+C"""
+        print(f"正在监视：{self.folder}（每{self.interval}秒检查一次，按Ctrl+C退出）")
         try:
-            doc.save(file_path)
-            messagebox.showinfo("成功", "座位布局已导出为Word文档")
-        except Exception as e:
-            messagebox.showerror("导出错误", f"Word文档导出失败：{str(e)}")
+            while True:
+                self.run_once()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+# ---------------------- 测试名单生成与压力测试 ----------------------
+# 常见姓氏（按常见程度排列，越靠前抽到的概率越大）
+ROSTER_SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤尤"
+# 名字用字（按性别）
+ROSTER_GIVEN_CHARS = {
+    "男": "伟强军勇明志健东平刚保永杰涛斌超波辉鹏华飞浩宇俊峰磊建国文博森林成龙海亮晨阳子轩",
+    "女": "美娟秀雅静红萍华娜惠玲珠芳丽敏燕霞婷雪琳晶欣怡慧佳颖璐倩梅兰月悦思彤雨涵"
+}
+# 身高（厘米）按性别的均值与标准差，成绩的均值与标准差
+ROSTER_HEIGHT_STATS = {"男": (170.0, 7.0), "女": (159.0, 6.0)}
+ROSTER_SCORE_STATS = (75.0, 12.0)
+
+
+def generate_roster(count, seed=None, female_ratio=0.48, missing_score_ratio=0.02):
+    """生成指定人数的模拟学生名单（用于演示和压力测试）
+
+    姓名为“姓+一到两个字”且不重复，身高按性别正态分布，成绩正态分布并截断在0～100，少数学生没有成绩。
+
+    Returns:
+        list: 学生记录字典列表，与导入名单的格式相同
+    """
+    rng = np.random.default_rng(seed)
+    # 姓氏按Zipf分布抽取，常见姓氏更多
+    weights = 1.0 / np.arange(1, len(ROSTER_SURNAMES) + 1)
+    weights /= weights.sum()
+    genders = np.where(rng.random(count) < female_ratio, "女", "男")
+    heights = np.empty(count)
+    for gender, (mean, std) in ROSTER_HEIGHT_STATS.items():
+        mask = genders == gender
+        heights[mask] = rng.normal(mean, std, mask.sum())
+    heights = np.clip(np.rint(heights), 135, 205).astype(int)
+    scores = np.clip(np.rint(rng.normal(*ROSTER_SCORE_STATS, count)), 0, 100)
+    scores[rng.random(count) < missing_score_ratio] = np.nan
+
+    used = set()
+    students = []
+    for i in range(count):
+        chars = ROSTER_GIVEN_CHARS[genders[i]]
+        while True:
+            length = 1 if rng.random() < 0.2 else 2
+            name = ROSTER_SURNAMES[rng.choice(len(ROSTER_SURNAMES), p=weights)]
+            name += "".join(chars[j] for j in rng.integers(0, len(chars), length))
+            if name not in used:
+                break
+            # 大名单中重名较多时加长名字
+            if len(used) > 20000:
+                name += chars[rng.integers(0, len(chars))]
+                if name not in used:
+                    break
+        used.add(name)
+        students.append({"姓名": name, "性别": str(genders[i]), "身高": int(heights[i]),
+                         "成绩": float(scores[i])})
+    return students
+
+
+def roster_layout(count, podium_seats=2, class_name="", teacher_name=""):
+    """按人数生成座位布局：列数约为行数的4/3（与常见教室相近），座位数不少于人数"""
+    main_cols = max(4, math.ceil(math.sqrt(count * 4 / 3)))
+    main_rows = max(1, math.ceil(max(count - podium_seats, 1) / main_cols))
+    return {"podium_seats": podium_seats, "main_rows": main_rows, "main_cols": main_cols,
+            "class_name": class_name, "teacher_name": teacher_name}
+
+
+def latency_summary(samples, count):
+    """耗时样本（秒）的统计：p50/p90/p99/最大值（毫秒）与吞吐量（人/秒，按中位数计算）"""
+    values = np.asarray(samples, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "runs": len(values),
+        "p50_ms": p50 * 1000, "p90_ms": p90 * 1000, "p99_ms": p99 * 1000, "max_ms": values.max() * 1000,
+        "throughput": count / p50 if p50 > 0 else float("inf")
+    }
+
+
+# 最优分配的代价矩阵为人数×座位数，超过该座位数时压力测试跳过
+LOAD_TEST_OPTIMAL_MAX_SEATS = 2500
+
+
+def load_test_stages(students, layout_config, formats, work_dir, config):
+    """压力测试的各阶段：(阶段名, 无参数函数)，按顺序执行，后面的阶段使用前面的结果
+
+    覆盖导入（xlsx、csv、解析缓存）、各种排座方式、JSON与SQLite的保存和读取，以及各导出格式。
+    """
+    seat_positions = build_seat_positions(layout_config)
+    seat_index_map = {pos: idx + 1 for idx, pos in enumerate(seat_positions)}
+    state = {}
+    roster_paths = {}
+    for ext in ("xlsx", "csv"):
+        roster_paths[ext] = os.path.join(work_dir, f"名单.{ext}")
+        write_roster(students, roster_paths[ext])
+    cache_dir = os.path.join(work_dir, "cache")
+    json_path = os.path.join(work_dir, "座位表数据.json")
+    store = SQLiteSeatStore(os.path.join(work_dir, "座位表数据.db"))
+
+    def import_roster(ext):
+        validate_roster(read_roster(roster_paths[ext]), len(seat_positions))
+
+    def import_cached():
+        load_roster(roster_paths["xlsx"], cache_dir=cache_dir)
+
+    def arrange(method):
+        state["seat_data"] = arrange_seats(students, seat_positions, method, rng=random.Random(0))
+
+    def save_json():
+        payload = build_save_payload(layout_config, state["seat_data"], seat_index_map, students)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    def load_json():
+        with open(json_path, "r", encoding="utf-8") as f:
+            load_data = json.load(f)
+        ClassSession.new_model(
+            load_data["layout_config"],
+            {StudentSeatTool.parse_tuple_str(key): data for key, data in load_data["seat_data"].items()},
+            {StudentSeatTool.parse_tuple_str(key): idx for key, idx in load_data["seat_index_map"].items()},
+            load_data["students"])
+
+    def save_sqlite():
+        # 重复运行时更新同一个班级
+        state["class_id"] = store.save_class(layout_config, state["seat_data"], seat_index_map, students,
+                                             class_id=state.get("class_id"))
+
+    def export(output_format):
+        write_export(os.path.join(work_dir, f"座位表.{output_format}"), output_format, layout_config,
+                     state["seat_data"], seat_index_map, seat_positions, students, config)
+
+    stages = [
+        ("导入xlsx", functools.partial(import_roster, "xlsx")),
+        ("导入csv", functools.partial(import_roster, "csv")),
+        ("导入（缓存）", import_cached),
+    ]
+    methods = ["random", "score"]
+    if len(seat_positions) <= LOAD_TEST_OPTIMAL_MAX_SEATS:
+        methods.append("optimal")
+    # 最后按身高排序，保存和导出使用该结果
+    methods.append("height")
+    stages += [(f"排座（{ARRANGE_STRATEGIES[method].title}）", functools.partial(arrange, method))
+               for method in methods]
+    stages += [
+        ("保存JSON", save_json),
+        ("读取JSON", load_json),
+        ("保存SQLite", save_sqlite),
+        ("读取SQLite", lambda: store.load_class(state["class_id"])),
+    ]
+    stages += [(f"导出{output_format}", functools.partial(export, output_format)) for output_format in formats]
+    return stages, store
+
+
+def run_load_test(sizes, repeat=5, formats=EXPORT_FORMATS, seed=0, stage_budget=20.0, echo=True):
+    """端到端压力测试：为每种人数生成名单和布局，依次执行各阶段并统计耗时与内存
+
+    每个阶段先在tracemalloc下运行一次记录Python堆内存峰值（同时作为预热），再计时运行repeat次；
+    累计耗时超过stage_budget秒时提前停止该阶段（至少计时一次）。依赖库缺失的阶段记为跳过。
+
+    Returns:
+        list: 每项为{size, seats, stage, runs, p50_ms, p90_ms, p99_ms, max_ms, throughput, peak_kb}或
+              {size, seats, stage, skipped: 原因}
+    """
+    config = SettingsSnapshot({})
+    results = []
+    for size in sizes:
+        students = generate_roster(size, seed)
+        layout_config = roster_layout(size, class_name=f"压力测试{size}人")
+        seats = len(build_seat_positions(layout_config))
+        with tempfile.TemporaryDirectory(prefix="seat_load_test_") as work_dir:
+            stages, store = load_test_stages(students, layout_config, formats, work_dir, config)
+            try:
+                for stage, func in stages:
+                    row = {"size": size, "seats": seats, "stage": stage}
+                    tracemalloc.start()
+                    try:
+                        func()
+                        peak = tracemalloc.get_traced_memory()[1]
+                    except ImportError as e:
+                        row["skipped"] = f"缺少依赖库：{e}"
+                    finally:
+                        tracemalloc.stop()
+                    if "skipped" not in row:
+                        samples = []
+                        while len(samples) < repeat and (not samples or sum(samples) < stage_budget):
+                            start = time.perf_counter()
+                            func()
+                            samples.append(time.perf_counter() - start)
+                        row.update(latency_summary(samples, size), peak_kb=peak / 1024)
+                    results.append(row)
+                    if echo:
+                        print(format_load_test_row(row), flush=True)
+            finally:
+                store.close()
+    return results
+
+
+def format_load_test_row(row):
+    """压力测试结果的一行文字"""
+    # 中文字符占两列宽，按显示宽度补齐阶段名
+    stage = row["stage"]
+    width = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in stage)
+    head = f"{row['size']:>6}人 {row['seats']:>6}座  {stage}{' ' * max(32 - width, 0)}"
+    if "skipped" in row:
+        return f"{head}  跳过（{row['skipped']}）"
+    return (f"{head}  p50 {row['p50_ms']:>9.1f}ms  p90 {row['p90_ms']:>9.1f}ms  p99 {row['p99_ms']:>9.1f}ms  "
+            f"最大 {row['max_ms']:>9.1f}ms  {row['throughput']:>11.0f}人/秒  内存峰值 {row['peak_kb'] / 1024:>8.1f}MB"
+            f"  （{row['runs']}次）")
+
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = StudentSeatTool(root)
-    root.mainloop()
\ No newline at end of file
+    # 打包后的程序启动策略进程时需要
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="学生座位表调整工具")
+    parser.add_argument("--serve", action="store_true", help="以HTTP接口服务模式运行（无界面）")
+    parser.add_argument("--host", default="127.0.0.1", help="服务监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="服务监听端口")
+    parser.add_argument("--workers", type=int, default=4, help="排座与导出的工作线程数")
+    parser.add_argument("--watch", metavar="文件夹", help="监视名单文件夹，名单或布局变化时自动重新生成座位表")
+    parser.add_argument("--interval", type=float, default=2.0, help="监视模式的检查间隔（秒）")
+    parser.add_argument("--method", default="height",
+                        help=f"监视模式的排座方式：{'、'.join(ARRANGE_STRATEGIES)}或自定义策略名称")
+    parser.add_argument("--formats", help="导出格式，用逗号分隔（监视模式默认pdf,docx,png,json，压力测试默认全部格式）")
+    parser.add_argument("--startup-timeline", action="store_true", help="启动完成后在控制台输出各启动阶段的耗时")
+    parser.add_argument("--generate-roster", type=int, metavar="人数", help="生成模拟学生名单（配合--output）")
+    parser.add_argument("--output", help="生成名单的保存路径（.xlsx/.csv/.tsv/.json），默认为“模拟名单_人数.xlsx”")
+    parser.add_argument("--seed", type=int, help="生成名单的随机种子，相同种子生成相同名单")
+    parser.add_argument("--load-test", action="store_true", help="无界面压力测试：导入、排座、保存读取和各格式导出")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="压力测试的名单人数，用逗号分隔")
+    parser.add_argument("--repeat", type=int, default=5, help="压力测试每个阶段的计时次数")
+    parser.add_argument("--report", help="压力测试结果另存为JSON文件")
+    args = parser.parse_args()
+
+    default_formats = ",".join(EXPORT_FORMATS) if args.load_test else "pdf,docx,png,json"
+    formats = [fmt.strip() for fmt in (args.formats or default_formats).split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        parser.error(f"不支持的导出格式：{'、'.join(unknown)}")
+
+    if args.generate_roster is not None:
+        output = args.output or f"模拟名单_{args.generate_roster}.xlsx"
+        students = generate_roster(args.generate_roster, args.seed)
+        write_roster(students, output)
+        layout = roster_layout(args.generate_roster)
+        print(f"已生成{len(students)}名学生的名单：{output}\n"
+              f"建议布局：{layout['main_rows']}行×{layout['main_cols']}列，讲台侧{layout['podium_seats']}座")
+    elif args.load_test:
+        try:
+            sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        except ValueError:
+            parser.error("--sizes应为用逗号分隔的人数")
+        results = run_load_test(sizes, max(args.repeat, 1), formats, seed=args.seed or 0)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    elif args.serve or args.watch:
+        # 自定义排座策略在策略进程中读取和运行，本进程只登记其名称
+        strategy_worker = StrategyWorker()
+        strategy_timeout = SettingsService(os.path.join(get_base_dir(), "config.ini")).getfloat("Strategy", "timeout")
+        for path, error in load_custom_strategies(strategy_worker, strategy_timeout):
+            print(f"读取排座策略失败：{path}：{error}")
+        if args.serve:
+            SeatingAPIServer(args.host, args.port, args.workers, strategy_worker).serve_forever()
+        else:
+            if args.method not in ARRANGE_STRATEGIES:
+                parser.error(f"未知的排座方式：{args.method}（可用：{'、'.join(ARRANGE_STRATEGIES)}）")
+            try:
+                RosterFolderWatcher(args.watch, args.method, formats, args.interval, args.workers,
+                                    strategy_worker, strategy_timeout).watch_forever()
+            finally:
+                strategy_worker.stop()
+    else:
+        timeline = StartupTimeline(echo=args.startup_timeline)
+        with timeline.stage("初始化Tk"):
+            root = tk.Tk()
+        app = StudentSeatTool(root, timeline)
+        root.mainloop()
\ No newline at end of file
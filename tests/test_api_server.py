@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "get_base_dir", lambda: str(tmp_path))
+    server = main.SeatingAPIServer(workers=1)
+    yield server
+    server.executor.shutdown()
+
+
+def arrange(server, payload):
+    status, content_type, body, headers = server.process_arrange(
+        json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json", {})
+    return status, json.loads(body.decode("utf-8"))
+
+
+STUDENTS = [
+    {"姓名": "甲", "性别": "男", "身高": "170"},
+    {"姓名": "乙", "性别": "女", "身高": 165},
+    {"姓名": "丙", "性别": "男", "身高": "158.5", "成绩": "90"},
+]
+LAYOUT = {"podium_seats": 0, "main_rows": 1, "main_cols": 3}
+
+
+def test_numeric_strings_are_sorted_as_numbers(server):
+    status, data = arrange(server, {"students": STUDENTS, "layout_config": LAYOUT, "method": "height"})
+    assert status == 200
+    seat_data = data["seat_data"]
+    order = [seat_data[str(pos)]["name"] for pos in main.build_seat_positions(dict(main.DEFAULT_LAYOUT_CONFIG, **LAYOUT))]
+    assert order == ["丙", "乙", "甲"]
+    status, _ = arrange(server, {"students": STUDENTS, "layout_config": LAYOUT, "method": "score"})
+    assert status == 200
+
+
+@pytest.mark.parametrize("payload, status", [
+    ({"layout_config": LAYOUT}, 400),
+    ({"students": STUDENTS, "method": "不存在"}, 400),
+    ({"students": STUDENTS, "format": "bmp"}, 400),
+    ({"students": [{"姓名": "甲", "性别": "男", "身高": "高"}]}, 400),
+    ({"students": STUDENTS, "layout_config": {"main_rows": 0}}, 400),
+    ({"roster": "不是base64"}, 400),
+])
+def test_bad_requests_get_json_errors(server, payload, status):
+    got, data = arrange(server, payload)
+    assert got == status and data["error"]
+
+
+def test_malformed_json_body(server):
+    status, _, body, _ = server.process_arrange(b"{", "application/json", {})
+    assert status == 400 and "error" in json.loads(body)
+
+
+@pytest.mark.parametrize("result, status", [("not a list", 400), (RuntimeError("boom"), 500)])
+def test_strategy_failures_become_http_errors(server, monkeypatch, result, status):
+    def strategy(students, seat_positions, rng, params):
+        if isinstance(result, Exception):
+            raise result
+        return result
+    monkeypatch.setitem(main.ARRANGE_STRATEGIES, "broken", main.ArrangeStrategy(
+        "broken", "broken", strategy, randomized=False, uses_scores=False, builtin=True))
+    got, data = arrange(server, {"students": STUDENTS, "layout_config": LAYOUT, "method": "broken"})
+    assert got == status and "排座失败" in data["error"]
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_unexpected_errors_still_get_a_response(server, monkeypatch):
+    def explode(*args):
+        raise TypeError("unexpected")
+    monkeypatch.setattr(server, "process_arrange", explode)
+
+    async def request():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"POST /arrange HTTP/1.1\r\nContent-Length: 2\r\nContent-Type: application/json\r\n\r\n{}")
+        reader.feed_eof()
+        writer = FakeWriter()
+        await server.handle_client(reader, writer)
+        return writer.data
+
+    response = asyncio.run(request())
+    assert response.startswith(b"HTTP/1.1 500")
+    assert "error" in json.loads(response.split(b"\r\n\r\n", 1)[1])
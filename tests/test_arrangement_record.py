@@ -0,0 +1,84 @@
+import types
+
+import main
+
+LAYOUT = {"podium_seats": 0, "main_rows": 2, "main_cols": 3, "class_name": "", "teacher_name": ""}
+
+
+def roster(scores):
+    return [{"姓名": f"学生{i}", "性别": "男女"[i % 2], "身高": 150.0 + i, "成绩": score}
+            for i, score in enumerate(scores)]
+
+
+def test_score_fingerprint_survives_saving_without_scores():
+    students = roster([90, 70, 80, 60])
+    record = main.describe_arrangement(students, LAYOUT, "score", reverse=True)
+    payload = main.build_save_payload(LAYOUT, {}, {}, students, record)
+    saved = payload["students"]
+    assert all("成绩" not in stu for stu in saved)
+    reloaded = main.describe_arrangement(saved, LAYOUT, "score", reverse=True)
+    assert reloaded["fingerprint"] == record["fingerprint"]
+    # 重现仍需要成绩：成绩哈希不同
+    assert reloaded["scores_hash"] != record["scores_hash"]
+    assert "scores_hash" not in main.describe_arrangement(students, LAYOUT, "height")
+
+
+def test_cache_does_not_mix_rosters_with_different_scores():
+    positions = main.build_seat_positions(LAYOUT)
+    first, record = main.run_arrangement(roster([90, 70, 80, 60]), positions, LAYOUT, "score")
+    second, other = main.run_arrangement(roster([60, 70, 80, 90]), positions, LAYOUT, "score")
+    assert record["fingerprint"] == other["fingerprint"]
+    assert [first[pos]["name"] for pos in positions[:4]] == ["学生0", "学生2", "学生1", "学生3"]
+    assert [second[pos]["name"] for pos in positions[:4]] == ["学生3", "学生2", "学生1", "学生0"]
+
+
+def test_strategy_version_is_part_of_the_fingerprint():
+    info = {"name": "by_name", "title": "按姓名排序", "randomized": False, "uses_scores": False, "source": None}
+    try:
+        main.register_worker_strategies([dict(info, version="a")])
+        old = main.describe_arrangement(roster([1]), LAYOUT, "by_name")
+        main.register_worker_strategies([dict(info, version="b")])
+        new = main.describe_arrangement(roster([1]), LAYOUT, "by_name")
+    finally:
+        main.register_worker_strategies([])
+    assert old["version"] == "a" and new["version"] == "b"
+    assert old["fingerprint"] != new["fingerprint"]
+
+
+def make_tool(seat_data, record):
+    """只有撤销/重做所需属性的StudentSeatTool替身"""
+    tool = types.SimpleNamespace(
+        seat_data=seat_data, students=[], arrangement_record=record, history=main.SeatHistory(),
+        mark_seats_dirty=lambda positions=None: None, auto_save_data=lambda: None)
+    for name in ("record_history", "mark_arrangement_adjusted", "undo", "redo", "apply_history_entry"):
+        setattr(tool, name, types.MethodType(getattr(main.StudentSeatTool, name), tool))
+    return tool
+
+
+def test_undo_and_redo_restore_the_arrangement_record():
+    positions = main.build_seat_positions(LAYOUT)
+    students = roster([90, 70, 80, 60])
+    empty = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    tool = make_tool(dict(empty), None)
+
+    arranged, record = main.run_arrangement(students, positions, LAYOUT, "height")
+    before = tool.seat_data
+    tool.seat_data, tool.arrangement_record = arranged, record
+    tool.record_history("按身高排序", before, records=(None, record))
+
+    # 手动交换：座位仍由记录生成，但已标记为调整过
+    before = dict(tool.seat_data)
+    a, b = positions[0], positions[1]
+    tool.seat_data[a], tool.seat_data[b] = tool.seat_data[b], tool.seat_data[a]
+    tool.record_history("交换座位", before, [a, b])
+    assert tool.arrangement_record["adjusted"]
+    assert tool.arrangement_record["fingerprint"] == record["fingerprint"]
+
+    tool.undo()
+    assert tool.arrangement_record is record and tool.seat_data == arranged
+    tool.undo()
+    assert tool.arrangement_record is None and tool.seat_data == empty
+    tool.redo()
+    assert tool.arrangement_record is record
+    tool.redo()
+    assert tool.arrangement_record["adjusted"]
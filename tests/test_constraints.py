@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+import main
+
+
+def layout(rows, cols, podium=2):
+    return {"podium_seats": podium, "main_rows": rows, "main_cols": cols, "class_name": "", "teacher_name": ""}
+
+
+def random_case(rng):
+    config = layout(rng.randint(1, 6), rng.randint(1, 8), rng.randint(0, 6))
+    positions = main.build_seat_positions(config)
+    seat_data, names = {}, []
+    for i, pos in enumerate(positions):
+        if rng.random() < 0.2:
+            seat_data[pos] = {"name": "空", "gender": "空"}
+        else:
+            names.append(f"学生{i}")
+            seat_data[pos] = {"name": names[-1], "gender": rng.choice("男女")}
+    # 约束中也包含没有座位的学生
+    pool = names + ["未入座1", "未入座2"]
+    rng.shuffle(pool)
+    together = [pool[k:k + size] for k, size in ((0, 2), (2, 3))]
+    apart = [sorted(rng.sample(pool, 2)) for _ in range(6)]
+    row_limits = {"一组": (1, rng.sample(pool, min(len(pool), 5))),
+                  "二组": (2, rng.sample(pool, min(len(pool), 6)))}
+    constraints = {"together": [g for g in together if len(g) > 1], "apart": apart, "row_limits": row_limits}
+    return config, positions, seat_data, constraints
+
+
+def expected_keys(constraints, seat_data):
+    """逐条检查全部约束，作为增量检查的对照"""
+    seat_of = {}
+    for pos, data in seat_data.items():
+        if data["name"] != "空":
+            seat_of[data["name"]] = pos
+    keys = set()
+    for a, b in constraints["apart"]:
+        if a in seat_of and b in seat_of:
+            (ra, ca), (rb, cb) = seat_of[a], seat_of[b]
+            if abs(ra - rb) <= 1 and abs(ca - cb) <= 1:
+                keys.add(("apart", a, b))
+    for g, group in enumerate(constraints["together"]):
+        seats = [seat_of.get(name) for name in group]
+        cols = sorted(c for _, c in filter(None, seats))
+        if (None in seats or len({r for r, _ in seats}) != 1
+                or cols[-1] - cols[0] != len(cols) - 1):
+            keys.add(("together", g))
+    counts = []
+    for k, (limit, members) in enumerate(constraints["row_limits"].values()):
+        rows = {}
+        for name in members:
+            if name in seat_of:
+                rows[seat_of[name][0]] = rows.get(seat_of[name][0], 0) + 1
+        counts.append(rows)
+        keys |= {("row_limit", k, row) for row, n in rows.items() if n > limit}
+    return keys, counts
+
+
+def swapped(seat_data, pos_a, pos_b):
+    result = dict(seat_data)
+    result[pos_a], result[pos_b] = seat_data[pos_b], seat_data[pos_a]
+    return result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_check_swap_matches_full_recheck(seed):
+    rng = random.Random(seed)
+    config, positions, seat_data, constraints = random_case(rng)
+    checker = main.SeatConstraints(constraints, config, positions, seat_data)
+    for _ in range(80):
+        keys, counts = expected_keys(constraints, seat_data)
+        assert checker.active == keys
+
+        pos_a, pos_b = rng.choice(positions), rng.choice(positions)
+        after = swapped(seat_data, pos_a, pos_b)
+        keys_after, counts_after = expected_keys(constraints, after)
+        # 新出现的冲突，以及人数超限的排在调换后人数更多
+        new = keys_after - keys
+        new |= {key for key in keys_after & keys if key[0] == "row_limit"
+                and counts_after[key[1]][key[2]] > counts[key[1]][key[2]]}
+        fresh = main.SeatConstraints(constraints, config, positions, after)
+        assert checker.check_swap(pos_a, pos_b) == [fresh.describe(key) for key in sorted(new, key=str)]
+        # check_swap不修改状态
+        assert checker.active == keys
+        assert checker.violations() == main.SeatConstraints(constraints, config, positions, seat_data).violations()
+
+        if rng.random() < 0.5:
+            seat_data = after
+            checker.update([pos_a, pos_b], seat_data)
+
+
+def test_podium_seats_are_not_beside_across_the_podium():
+    config = layout(2, 4, podium=2)
+    positions = main.build_seat_positions(config)
+    podium = [pos for pos in positions if pos[0] == config["main_rows"] + 1]
+    assert len(podium) == 2
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    seat_data[podium[0]] = {"name": "甲", "gender": "男"}
+    seat_data[podium[1]] = {"name": "乙", "gender": "男"}
+    constraints = {"together": [["甲", "乙"]], "apart": [["甲", "乙"]], "row_limits": {}}
+    checker = main.SeatConstraints(constraints, config, positions, seat_data)
+    # 讲台两侧的两个座位在同一排但不相邻
+    assert checker.violations() == ["甲、乙应在同一排相邻而坐"]
+
+
+def test_row_limit_message_names_rows():
+    config = layout(3, 2, podium=0)
+    positions = main.build_seat_positions(config)
+    names = iter("甲乙丙丁戊己")
+    seat_data = {pos: {"name": next(names), "gender": "男"} for pos in positions}
+    front = [seat_data[pos]["name"] for pos in positions if pos[0] == 3]
+    constraints = {"together": [], "apart": [], "row_limits": {"一组": (1, front)}}
+    checker = main.SeatConstraints(constraints, config, positions, seat_data)
+    assert checker.violations() == ["一组在第1排有2人，超过每排1人"]
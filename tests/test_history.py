@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+import main
+
+
+def empty_seats(positions):
+    return {pos: {"name": "空", "gender": "空"} for pos in positions}
+
+
+def apply(seat_data, entry, reverse):
+    for pos, old, new in entry.seats:
+        seat_data[pos] = old if reverse else new
+
+
+def random_edit(rng, seat_data, positions, names):
+    """随机修改几个座位，返回修改前的浅拷贝"""
+    before = dict(seat_data)
+    for pos in rng.sample(positions, rng.randint(1, 4)):
+        name = rng.choice(names)
+        seat_data[pos] = {"name": "空", "gender": "空"} if name is None else {"name": name, "gender": "男"}
+    return before
+
+
+def test_diff_seat_data_only_reports_changed_seats():
+    positions = main.build_seat_positions({"podium_seats": 0, "main_rows": 2, "main_cols": 2})
+    before = empty_seats(positions)
+    after = dict(before)
+    after[positions[0]] = {"name": "甲", "gender": "男"}
+    # 内容相同的新条目不算变化
+    after[positions[1]] = {"name": "空", "gender": "空"}
+    assert main.diff_seat_data(before, after) == ((positions[0], before[positions[0]], after[positions[0]]),)
+    assert main.diff_seat_data(before, after, positions[1:]) == ()
+    # 只在after中出现的座位（如布局变大）修改前为None
+    assert main.diff_seat_data({}, after, positions[:1]) == ((positions[0], None, after[positions[0]]),)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_undo_redo_round_trip(seed):
+    rng = random.Random(seed)
+    positions = main.build_seat_positions({"podium_seats": 2, "main_rows": 4, "main_cols": 5})
+    names = [f"学生{i}" for i in range(30)] + [None]
+    seat_data = empty_seats(positions)
+    history = main.SeatHistory()
+    states = [dict(seat_data)]
+    for step in range(60):
+        before = random_edit(rng, seat_data, positions, names)
+        history.push(main.HistoryEntry(f"操作{step % 3}", main.diff_seat_data(before, seat_data)))
+        states.append(dict(seat_data))
+
+    for state in reversed(states[:-1]):
+        entry = history.pop_undo()
+        apply(seat_data, entry, reverse=True)
+        assert seat_data == state
+    assert history.pop_undo() is None
+    for state in states[1:]:
+        entry = history.pop_redo()
+        apply(seat_data, entry, reverse=False)
+        assert seat_data == state
+    assert history.pop_redo() is None
+
+
+def test_new_step_after_undo_drops_redo():
+    history = main.SeatHistory()
+    a = {"name": "甲", "gender": "男"}
+    b = {"name": "乙", "gender": "女"}
+    history.push(main.HistoryEntry("第一步", (((1, 0), None, a),)))
+    history.push(main.HistoryEntry("第二步", (((1, 0), a, b),)))
+    assert history.pop_undo().label == "第二步"
+    history.push(main.HistoryEntry("第三步", (((1, 1), None, b),)))
+    assert history.pop_redo() is None
+    assert [history.pop_undo().label, history.pop_undo().label] == ["第三步", "第一步"]
+
+
+def test_layout_student_and_arrangement_entries_round_trip():
+    history = main.SeatHistory()
+    old_layout = {"podium_seats": 0, "main_rows": 1, "main_cols": 2}
+    new_layout = dict(old_layout, main_cols=3)
+    seats = (((1, 0), {"name": "甲", "gender": "男"}),)
+    layout = (old_layout, new_layout, seats, seats)
+    students = (({"姓名": "甲"},), ({"姓名": "甲"}, {"姓名": "乙"}))
+    record = {"fingerprint": "f"}
+    history.push(main.HistoryEntry("调整布局", layout=layout, arrangement=(record, None)))
+    history.push(main.HistoryEntry("插班生", (((1, 1), None, {"name": "乙", "gender": "女"}),), students=students))
+
+    entry = history.pop_undo()
+    assert entry.label == "插班生" and entry.students == students and entry.layout is None
+    assert entry.arrangement is None
+    entry = history.pop_undo()
+    assert entry.label == "调整布局" and entry.layout == layout and entry.arrangement == (record, None)
+    assert entry.seats == () and entry.students is None
+    # 重做时附加信息同样保留
+    assert history.pop_redo().layout == layout
+    assert history.pop_redo().students == students
+
+
+def test_clear_resets_intern_tables():
+    history = main.SeatHistory()
+    history.push(main.HistoryEntry("交换座位", (((1, 0), None, {"name": "甲", "gender": "男"}),)))
+    history.clear()
+    assert not history.undo_stack and not history.redo_stack
+    assert history._positions == [] and history._values == [] and history._labels == []
+
+
+def test_unreferenced_entries_are_dropped():
+    rng = random.Random(1)
+    positions = main.build_seat_positions({"podium_seats": 0, "main_rows": 10, "main_cols": 10})
+    seat_data = empty_seats(positions)
+    history = main.SeatHistory()
+    states = [dict(seat_data)]
+    for step in range(5000):
+        # 每步都是新的座位条目；多数步骤随即被撤销，被丢弃的重做步骤引用的条目可以清理
+        before = dict(seat_data)
+        seat_data[rng.choice(positions)] = {"name": f"学生{step}", "gender": "男"}
+        history.push(main.HistoryEntry("修改", main.diff_seat_data(before, seat_data)))
+        states.append(dict(seat_data))
+        if step % 10:
+            apply(seat_data, history.pop_undo(), reverse=True)
+            states.pop()
+    assert len(history.undo_stack) == 500
+    assert len(history._values) + len(history._positions) <= 2 * main.SeatHistory.COMPACT_MIN
+    # 清理后重新编号的步骤仍能完整撤销
+    for state in reversed(states[:-1]):
+        apply(seat_data, history.pop_undo(), reverse=True)
+        assert seat_data == state
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import main
+
+
+def layout(rows, cols, podium=2):
+    return {"podium_seats": podium, "main_rows": rows, "main_cols": cols, "class_name": "", "teacher_name": ""}
+
+
+def filled(config, count):
+    positions = main.build_seat_positions(config)
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    for i, pos in enumerate(positions[:count]):
+        seat_data[pos] = {"name": f"学生{i}", "gender": "女"}
+    return positions, seat_data
+
+
+def names(seat_data):
+    return sorted(entry["name"] for entry in seat_data.values() if entry["name"] != "空")
+
+
+def test_same_layout_keeps_every_seat():
+    config = layout(5, 6)
+    positions, seat_data = filled(config, 25)
+    migrated, unplaced = main.migrate_seat_data(config, seat_data, config, positions)
+    assert migrated == seat_data and unplaced == []
+
+
+def test_growing_keeps_relative_positions():
+    old = layout(4, 6)
+    new = layout(6, 8)
+    _, seat_data = filled(old, 26)
+    migrated, unplaced = main.migrate_seat_data(old, seat_data, new, main.build_seat_positions(new))
+    assert unplaced == []
+    for pos, entry in seat_data.items():
+        if entry["name"] == "空":
+            continue
+        target = main._seat_from_relative_key(new, main._relative_seat_key(old, pos))
+        assert migrated[target] is entry
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_resize_loses_nobody_while_seats_suffice(seed):
+    rng = random.Random(seed)
+    old = layout(rng.randint(1, 8), rng.randint(1, 9), rng.randint(0, 4))
+    new = layout(rng.randint(1, 8), rng.randint(1, 9), rng.randint(0, 4))
+    old_positions, seat_data = filled(old, rng.randint(0, len(main.build_seat_positions(old))))
+    new_positions = main.build_seat_positions(new)
+    migrated, unplaced = main.migrate_seat_data(old, seat_data, new, new_positions)
+    assert set(migrated) == set(new_positions)
+    seated = names(seat_data)
+    assert len(unplaced) == max(len(seated) - len(new_positions), 0)
+    assert sorted(names(migrated) + [entry["name"] for entry in unplaced]) == seated
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import main
+
+
+def layout(rows, cols, podium=2):
+    return {"podium_seats": podium, "main_rows": rows, "main_cols": cols, "class_name": "", "teacher_name": ""}
+
+
+def random_class(rng, config):
+    positions = main.build_seat_positions(config)
+    seat_data, height_map, score_map = {}, {}, {}
+    for i, pos in enumerate(positions):
+        if rng.random() < 0.25:
+            seat_data[pos] = {"name": "空", "gender": "空"}
+            continue
+        name = f"学生{i}"
+        seat_data[pos] = {"name": name, "gender": rng.choice("男女")}
+        height_map[name] = rng.randint(140, 190)
+        if rng.random() < 0.9:
+            score_map[name] = rng.randint(40, 100)
+    return positions, seat_data, height_map, score_map
+
+
+def assert_same(metrics, fresh):
+    assert metrics.sightline == fresh.sightline
+    assert metrics.same_gender == fresh.same_gender
+    assert metrics.region_count == fresh.region_count
+    assert metrics.region_sum == pytest.approx(fresh.region_sum)
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_incremental_update_matches_recompute(seed):
+    rng = random.Random(seed)
+    config = layout(rng.randint(1, 7), rng.randint(1, 9), rng.randint(0, 6))
+    positions, seat_data, height_map, score_map = random_class(rng, config)
+    metrics = main.ArrangementMetrics(config, seat_data, height_map, score_map)
+    for _ in range(60):
+        a, b = rng.choice(positions), rng.choice(positions)
+        seat_data[a], seat_data[b] = seat_data[b], seat_data[a]
+        if rng.random() < 0.2:
+            seat_data[rng.choice(positions)] = {"name": "空", "gender": "空"}
+        metrics.update([a, b] + positions[:1], seat_data)
+        metrics.update(positions, seat_data)
+        assert_same(metrics, main.ArrangementMetrics(config, seat_data, height_map, score_map))
+    scores = main.score_arrangement(seat_data, height_map, config)
+    assert (metrics.sightline, metrics.same_gender) == (scores["sightline"], scores["same_gender"])
+
+
+@pytest.mark.parametrize("cols", range(1, 9))
+def test_regions_split_main_grid_columns_evenly(cols):
+    config = layout(2, cols, podium=4)
+    positions = main.build_seat_positions(config)
+    seat_data = {pos: {"name": f"学生{i}", "gender": "男"} for i, pos in enumerate(positions)}
+    score_map = {f"学生{i}": 1 for i in range(len(positions))}
+    metrics = main.ArrangementMetrics(config, seat_data, {}, score_map)
+    # 讲台侧座位不计入区域，左右两侧的列数最多相差一列
+    assert sum(metrics.region_count) == 2 * cols
+    for back, front in ((0, 1), (2, 3)):
+        assert metrics.region_count[back] - metrics.region_count[front] in (0, 1)
+        assert metrics.region_count[front] >= (1 if cols > 1 else 0)
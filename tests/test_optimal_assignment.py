@@ -0,0 +1,79 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import main
+
+
+def brute_force_cost(cost):
+    n, m = cost.shape
+    if n <= m:
+        return min(cost[range(n), list(cols)].sum() for cols in itertools.permutations(range(m), n))
+    return brute_force_cost(cost.T)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_hungarian_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 7))
+    m = int(rng.integers(n, 8))
+    # 整数代价有大量并列，容易暴露增广路的错误
+    cost = rng.integers(0, 6, (n, m)).astype(float)
+    cols = main._hungarian(cost)
+    assert len(set(cols.tolist())) == n
+    assert cost[np.arange(n), cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+@pytest.mark.parametrize("shape", [(4, 6), (6, 4), (5, 5), (0, 3), (3, 0)])
+def test_solve_assignment_rectangular(monkeypatch, shape):
+    monkeypatch.setattr(main, "scipy_available", False)
+    cost = np.random.default_rng(1).random(shape)
+    rows, cols = main.solve_assignment(cost)
+    assert len(rows) == len(cols) == min(shape)
+    assert list(rows) == sorted(rows) and len(set(cols.tolist())) == len(cols)
+    if cost.size:
+        assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def test_matches_scipy_when_installed(monkeypatch):
+    optimize = pytest.importorskip("scipy.optimize")
+    cost = np.random.default_rng(2).random((60, 80))
+    rows, cols = optimize.linear_sum_assignment(cost)
+    assert cost[np.arange(60), main._hungarian(cost)].sum() == pytest.approx(cost[rows, cols].sum())
+
+
+def layout(rows, cols, podium):
+    return {"podium_seats": podium, "main_rows": rows, "main_cols": cols, "class_name": "", "teacher_name": ""}
+
+
+@pytest.mark.parametrize("rows, cols, podium", [(5, 6, 0), (5, 6, 2), (3, 2, 4), (1, 1, 1), (4, 8, 3)])
+def test_zone_masks_use_the_main_grid(rows, cols, podium):
+    config = layout(rows, cols, podium)
+    positions = main.build_seat_positions(config)
+    masks, depth = main.seat_zone_masks(positions)
+    start_col = (max(cols, 4) - cols) // 2
+    for i, (r, c) in enumerate(positions):
+        if r > rows:
+            # 讲台侧座位：前排、最靠前，不算过道和后排
+            assert masks["前排"][i] and not masks["过道"][i] and not masks["后排"][i] and depth[i] == 0
+            continue
+        assert masks["前排"][i] == (rows - r < main.SOLVER_FRONT_ROWS)
+        assert masks["后排"][i] == (r == 1)
+        assert masks["过道"][i] == (c in (start_col, start_col + cols - 1))
+        assert depth[i] == pytest.approx((rows - r) / max(rows - 1, 1))
+    assert main.podium_seat_mask(positions).sum() == podium
+
+
+def test_optimal_strategy_meets_hard_requirements():
+    rng = random.Random(0)
+    config = layout(6, 8, 2)
+    positions = main.build_seat_positions(config)
+    students = main.generate_roster(45, seed=3)
+    for stu in rng.sample(students, 12):
+        stu[main.SEAT_REQUIREMENT_COLUMN] = rng.choice(["前排", "过道", "后排", "前排、过道", "尽量后排"])
+    seat_data = main.arrange_seats(students, positions, "optimal")
+    assert main.unmet_seat_requirements(students, positions, seat_data) == []
+    seated = [entry["name"] for entry in seat_data.values() if entry["name"] != "空"]
+    assert sorted(seated) == sorted(stu["姓名"] for stu in students)
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+import main
+
+LAYOUTS = [
+    {"podium_seats": 2, "main_rows": 4, "main_cols": 5, "class_name": "", "teacher_name": ""},
+    # 列数少于4时主体区域居中，起始列不为0
+    {"podium_seats": 4, "main_rows": 3, "main_cols": 2, "class_name": "", "teacher_name": ""},
+    {"podium_seats": 0, "main_rows": 1, "main_cols": 1, "class_name": "", "teacher_name": ""},
+]
+OPERATIONS = [("swap_rows", 1, 2), ("swap_cols", 1, 2), ("shift_rows", 1), ("shift_rows", -2),
+              ("shift_cols", 1), ("shift_cols", 3), ("mirror",), ("rotate",)]
+
+
+def labelled(positions):
+    """每个座位坐着以座位坐标命名的学生"""
+    return {pos: {"name": str(pos), "gender": "男"} for pos in positions}
+
+
+def apply(seat_data, mapping):
+    # 与StudentSeatTool.apply_seat_permutation相同的应用方式
+    result = dict(seat_data)
+    for target, source in mapping.items():
+        result[target] = seat_data[source]
+    return result
+
+
+def main_seats(layout):
+    return [pos for pos in main.build_seat_positions(layout) if pos[0] <= layout["main_rows"]]
+
+
+def assert_bijection(mapping, positions):
+    assert set(mapping) <= set(positions)
+    # 每个来源座位只用一次，且离开的学生与进入的学生是同一批座位
+    assert len(set(mapping.values())) == len(mapping)
+    assert set(mapping.values()) == set(mapping)
+    assert all(target != source for target, source in mapping.items())
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_grid_operations_are_bijections_on_the_main_seats(layout, operation):
+    if operation[0] in ("swap_rows", "swap_cols") and max(operation[1:]) > min(layout["main_rows"],
+                                                                                layout["main_cols"]):
+        # 布局中没有该排/列
+        with pytest.raises(ValueError):
+            main.grid_permutation(layout, *operation)
+        return
+    mapping = main.grid_permutation(layout, *operation)
+    assert_bijection(mapping, main_seats(layout))
+    seat_data = labelled(main.build_seat_positions(layout))
+    after = apply(seat_data, mapping)
+    assert sorted(d["name"] for d in after.values()) == sorted(d["name"] for d in seat_data.values())
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("operation, times", [(("mirror",), 2), (("rotate",), 2), (("rotate",), 4),
+                                              (("swap_rows", 1, 1), 1), (("swap_cols", 1, 1), 1)])
+def test_repeated_operations_return_to_the_start(layout, operation, times):
+    seat_data = labelled(main.build_seat_positions(layout))
+    after = seat_data
+    for _ in range(times):
+        after = apply(after, main.grid_permutation(layout, *operation))
+    assert after == seat_data
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_shifts_wrap_around(layout):
+    rows, cols = layout["main_rows"], layout["main_cols"]
+    seat_data = labelled(main.build_seat_positions(layout))
+    after = seat_data
+    for _ in range(cols):
+        after = apply(after, main.grid_permutation(layout, "shift_cols", 1))
+    assert after == seat_data
+    after = apply(seat_data, main.grid_permutation(layout, "shift_rows", 1))
+    assert apply(after, main.grid_permutation(layout, "shift_rows", rows - 1)) == seat_data
+
+
+def test_operations_move_students_where_documented():
+    layout = LAYOUTS[0]
+    rows, start = layout["main_rows"], 0
+    seat_data = labelled(main.build_seat_positions(layout))
+    # 第1排（最前排）在坐标中是第rows行
+    front, second = rows, rows - 1
+    after = apply(seat_data, main.grid_permutation(layout, "swap_rows", 1, 2))
+    assert after[(front, start)] == seat_data[(second, start)]
+    after = apply(seat_data, main.grid_permutation(layout, "shift_rows", 1))
+    assert after[(second, start)] == seat_data[(front, start)]
+    after = apply(seat_data, main.grid_permutation(layout, "shift_cols", 1))
+    assert after[(front, start + 1)] == seat_data[(front, start)]
+    assert after[(front, start)] == seat_data[(front, start + layout["main_cols"] - 1)]
+    after = apply(seat_data, main.grid_permutation(layout, "rotate"))
+    assert after[(front, start)] == seat_data[(1, start + layout["main_cols"] - 1)]
+    # 讲台侧座位不参与调整
+    podium = [pos for pos in seat_data if pos[0] == rows + 1]
+    assert podium and all(after[pos] == seat_data[pos] for pos in podium)
+
+
+def test_invalid_grid_operations_raise():
+    layout = LAYOUTS[0]
+    with pytest.raises(ValueError):
+        main.grid_permutation(layout, "swap_rows", 1, layout["main_rows"] + 1)
+    with pytest.raises(ValueError):
+        main.grid_permutation(layout, "transpose")
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_group_move_is_a_bijection_on_the_seat_set(seed):
+    rng = random.Random(seed)
+    layout = rng.choice(LAYOUTS[:2])
+    positions = main.build_seat_positions(layout)
+    row_offset, col_offset = rng.choice([(r, c) for r in (-1, 0, 1) for c in (-2, -1, 0, 1, 2) if r or c])
+    movable = [(r, c) for r, c in positions if (r - row_offset, c + col_offset) in positions]
+    selected = set(rng.sample(movable, rng.randint(1, min(4, len(movable)))))
+    mapping = main.group_move_permutation(positions, selected, row_offset, col_offset)
+    assert_bijection(mapping, positions)
+    seat_data = labelled(positions)
+    after = apply(seat_data, mapping)
+    # 选中的学生整体平移，所有学生仍各占一个座位
+    for r, c in selected:
+        assert after[(r - row_offset, c + col_offset)] == seat_data[(r, c)]
+    assert sorted(d["name"] for d in after.values()) == sorted(d["name"] for d in seat_data.values())
+
+
+def test_group_move_out_of_range_raises():
+    positions = main.build_seat_positions(LAYOUTS[0])
+    front_left = min(positions, key=lambda pos: (-pos[0], pos[1]))
+    with pytest.raises(ValueError):
+        main.group_move_permutation(positions, {front_left}, 0, -10)
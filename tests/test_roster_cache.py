@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import main
+
+
+def write_roster(path, names):
+    lines = ["姓名,性别,身高"] + [f"{name},男,{160 + i}" for i, name in enumerate(names)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """记录read_roster（真正解析文件）的调用次数"""
+    calls = []
+    read_roster = main.read_roster
+
+    def counting(path):
+        calls.append(path)
+        return read_roster(path)
+
+    monkeypatch.setattr(main, "read_roster", counting)
+    return calls
+
+
+def names(students):
+    return [stu["姓名"] for stu in students]
+
+
+def test_unchanged_file_is_read_from_the_cache(tmp_path, parses):
+    roster = tmp_path / "一班.csv"
+    write_roster(roster, ["甲", "乙"])
+    cache_dir = str(tmp_path / "cache")
+    first = main.load_roster(str(roster), cache_dir=cache_dir)
+    assert main.load_roster(str(roster), cache_dir=cache_dir) == first
+    assert names(first) == ["甲", "乙"] and len(parses) == 1
+
+
+def test_content_or_mtime_change_parses_again(tmp_path, parses):
+    roster = tmp_path / "一班.csv"
+    write_roster(roster, ["甲", "乙"])
+    cache_dir = str(tmp_path / "cache")
+    main.load_roster(str(roster), cache_dir=cache_dir)
+    write_roster(roster, ["甲", "乙", "丙"])
+    assert names(main.load_roster(str(roster), cache_dir=cache_dir)) == ["甲", "乙", "丙"]
+    assert len(parses) == 2
+    # 内容不变、只有修改时间变化时同样重新解析
+    stat = os.stat(roster)
+    os.utime(roster, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert names(main.load_roster(str(roster), cache_dir=cache_dir)) == ["甲", "乙", "丙"]
+    assert len(parses) == 3
+
+
+def test_corrupt_cache_falls_back_to_parsing(tmp_path, parses, capsys):
+    roster = tmp_path / "一班.csv"
+    write_roster(roster, ["甲", "乙"])
+    cache_dir = tmp_path / "cache"
+    main.load_roster(str(roster), cache_dir=str(cache_dir))
+    (cache_file,) = cache_dir.glob("*.pkl")
+    cache_file.write_bytes(b"not a pickle")
+    assert names(main.load_roster(str(roster), cache_dir=str(cache_dir))) == ["甲", "乙"]
+    assert len(parses) == 2
+    assert "名单缓存读取失败" in capsys.readouterr().out
+    # 重新解析后缓存被改写，再次读取命中缓存
+    assert names(main.load_roster(str(roster), cache_dir=str(cache_dir))) == ["甲", "乙"]
+    assert len(parses) == 2
+
+
+def test_stale_digest_from_the_caller_is_not_recorded(tmp_path):
+    roster = tmp_path / "一班.csv"
+    write_roster(roster, ["甲", "乙"])
+    stat = os.stat(roster)
+    old_key, old_digest = (stat.st_size, stat.st_mtime_ns), main.file_sha256(str(roster))
+    # 调用方算出哈希后名单又被修改
+    write_roster(roster, ["丙", "丁", "戊"])
+    students = main.load_roster(str(roster), old_digest, cache_dir=str(tmp_path / "cache"), stat_key=old_key)
+    assert names(students) == ["丙", "丁", "戊"]
+    stat = os.stat(roster)
+    assert main._roster_digests[os.path.abspath(roster)] == (
+        (stat.st_size, stat.st_mtime_ns), main.file_sha256(str(roster)))
+
+
+def test_prune_keeps_the_newest_cache_files(tmp_path):
+    for i in range(6):
+        path = tmp_path / f"{i}.pkl"
+        path.write_bytes(b"")
+        os.utime(path, ns=(10 ** 18 + i, 10 ** 18 + i))
+    (tmp_path / "其他.txt").write_text("")
+    main.prune_roster_cache(str(tmp_path), max_files=3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["3.pkl", "4.pkl", "5.pkl", "其他.txt"]
+    # 未超过上限时不删除
+    main.prune_roster_cache(str(tmp_path), max_files=3)
+    assert len(list(tmp_path.glob("*.pkl"))) == 3
+
+
+def test_cache_directory_is_pruned_when_writing(tmp_path, monkeypatch):
+    prune = main.prune_roster_cache
+    monkeypatch.setattr(main, "prune_roster_cache", lambda cache_dir: prune(cache_dir, max_files=2))
+    cache_dir = tmp_path / "cache"
+    for i in range(4):
+        roster = tmp_path / f"{i}.csv"
+        write_roster(roster, [f"学生{k}" for k in range(i + 1)])
+        main.load_roster(str(roster), cache_dir=str(cache_dir))
+    assert len(list(cache_dir.glob("*.pkl"))) == 2
@@ -0,0 +1,192 @@
+import random
+import types
+
+import pytest
+
+import main
+
+
+def make_row(heights):
+    """按座位顺序生成座位数据，None为空座位"""
+    positions = [(1, i) for i in range(len(heights))]
+    seat_data, height_map = {}, {}
+    for i, (pos, height) in enumerate(zip(positions, heights)):
+        if height is None:
+            seat_data[pos] = {"name": "空", "gender": "空"}
+        else:
+            seat_data[pos] = {"name": f"学生{i}", "gender": "男"}
+            height_map[f"学生{i}"] = height
+    return positions, seat_data, height_map
+
+
+def brute_force_slot(heights, height):
+    """第一个比他高的学生之前、紧跟前一个有人座位之后"""
+    known = [i for i, h in enumerate(heights) if h is not None]
+    taller = [i for i in known if heights[i] > height]
+    before = [i for i in known if not taller or i < taller[0]]
+    return before[-1] + 1 if before else 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_height_slot_matches_brute_force(seed):
+    rng = random.Random(seed)
+    heights = sorted(rng.randint(150, 190) for _ in range(rng.randint(0, 40)))
+    heights = [None if rng.random() < 0.4 else h for h in heights]
+    positions, seat_data, height_map = make_row(heights)
+    queries = [rng.randint(140, 200) for _ in range(15)]
+    expected = [brute_force_slot(heights, h) for h in queries]
+    assert [main.find_height_slot(positions, seat_data, height_map, h) for h in queries] == expected
+    assert main.find_height_slots(positions, seat_data, height_map, queries) == expected
+
+
+def test_find_height_slot_unknown_heights():
+    positions, seat_data, height_map = make_row([160, None, 170, 180])
+    height_map["学生2"] = "未知"
+    # 身高未知的学生不参与比较，身高未知的新学生排在最后
+    assert main.find_height_slot(positions, seat_data, height_map, 175) == 1
+    assert main.find_height_slot(positions, seat_data, height_map, None) == 4
+    assert main.find_height_slots(positions, seat_data, height_map, [None, 175]) == [4, 1]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_insert_with_min_shift_only_moves_up_to_nearest_empty(seed):
+    rng = random.Random(seed)
+    heights = [None if rng.random() < 0.2 else 160 for _ in range(rng.randint(1, 25))]
+    positions, seat_data, _ = make_row(heights)
+    before = dict(seat_data)
+    index = rng.randint(0, len(positions))
+    entry = {"name": "插班生", "gender": "女"}
+    changed = main.insert_with_min_shift(positions, seat_data, index, entry)
+    if None not in heights:
+        assert changed == [] and seat_data == before
+        return
+    empty = main.find_nearest_empty_index(positions, before, min(index, len(positions) - 1))
+    lo, hi = sorted((empty, min(index, len(positions) - 1)))
+    assert set(changed) <= set(positions[lo:hi + 1])
+    # 变化范围之外的座位不动，原有学生的先后顺序不变
+    assert all(seat_data[pos] is before[pos] for pos in positions if pos not in changed)
+    names = [seat_data[pos]["name"] for pos in positions if seat_data[pos]["name"] not in ("空", "插班生")]
+    assert names == [before[pos]["name"] for pos in positions if before[pos]["name"] != "空"]
+    assert sum(seat_data[pos]["name"] == "插班生" for pos in positions) == 1
+
+
+def current_heights(positions, seat_data, height_map):
+    return [None if seat_data[pos]["name"] == "空" else height_map.get(seat_data[pos]["name"]) for pos in positions]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_repair_index_follows_seat_changes(seed):
+    rng = random.Random(seed)
+    heights = [None if rng.random() < 0.3 else rng.randint(150, 190) for _ in range(rng.randint(1, 40))]
+    positions, seat_data, height_map = make_row(heights)
+    students = [{"姓名": name, "性别": "男", "身高": height} for name, height in height_map.items()]
+    students += [{"姓名": f"候补{i}", "性别": "女", "身高": rng.randint(150, 190)} for i in range(3)]
+    height_map.update({stu["姓名"]: stu["身高"] for stu in students})
+    index = main.SeatRepairIndex(positions, seat_data, height_map, students)
+    for _ in range(40):
+        # 随机交换、空出或安排座位，只把变化的座位告诉索引
+        a, b = rng.choice(positions), rng.choice(positions)
+        if rng.random() < 0.5:
+            seat_data[a], seat_data[b] = seat_data[b], seat_data[a]
+        else:
+            stu = rng.choice(students + [None])
+            seat_data[a] = {"name": "空", "gender": "空"} if stu is None else {"name": stu["姓名"], "gender": "男"}
+        index.update([a, b], seat_data)
+
+        current = current_heights(positions, seat_data, height_map)
+        height = rng.randint(140, 200)
+        assert index.find_slot(height) == brute_force_slot(current, height)
+        known = [i for i, h in enumerate(current) if h is not None]
+        assert index.find_slot(None) == (known[-1] + 1 if known else 0)
+        seated = {data["name"] for data in seat_data.values()}
+        assert [stu["姓名"] for stu in index.waiting()] == [stu["姓名"] for stu in students
+                                                          if stu["姓名"] not in seated]
+        assert index.empty == sum(data["name"] == "空" for data in seat_data.values())
+
+
+def test_insert_updates_repair_index_and_records_only_changed_seats():
+    positions, seat_data, height_map = make_row([150, 155, None, 165, 170, None])
+    index = main.SeatRepairIndex(positions, seat_data, height_map)
+    original = dict(seat_data)
+    before = {}
+    entry = {"name": "插班生", "gender": "女"}
+    index.heights["插班生"] = 160.0
+    changed = main.insert_with_min_shift(positions, seat_data, index.find_slot(160), entry, before, index)
+    assert changed == positions[2:3]
+    assert before == {pos: original[pos] for pos in changed}
+    rebuilt = main.SeatRepairIndex(positions, seat_data, dict(height_map, 插班生=160.0))
+    assert index.tree == rebuilt.tree and index.empty == rebuilt.empty == 1
+    # 座位已满时不查找空座位
+    seat_data[positions[5]] = {"name": "新", "gender": "男"}
+    index.update(positions[5:], seat_data)
+    full = dict(seat_data)
+    assert main.insert_with_min_shift(positions, seat_data, 0, entry, {}, index) == []
+    assert seat_data == full
+
+
+def make_tool(positions, seat_data, students, monkeypatch):
+    """只有插班/离班所需属性的StudentSeatTool替身，座位变化立即按变化的座位刷新"""
+    tool = types.SimpleNamespace(
+        seat_positions=positions, seat_data=seat_data, students=students, history=main.SeatHistory(),
+        arrangement_record=None, repair_index=None, _repair_students_key=None, metrics=None,
+        _metrics_students_key=None, constraint_checker=None, _constraint_students_key=None,
+        _redraw_pending=False, auto_save_data=lambda: None)
+    for name in ("get_repair_index", "update_repair_index", "note_roster_change", "add_student",
+                 "remove_student_at", "record_history", "mark_arrangement_adjusted", "undo", "apply_history_entry",
+                 "get_height_map"):
+        setattr(tool, name, types.MethodType(getattr(main.StudentSeatTool, name), tool))
+    tool.mark_seats_dirty = lambda positions=None: tool.update_repair_index(positions)
+    monkeypatch.setattr(main.messagebox, "askyesno", lambda *args, **kwargs: True)
+    monkeypatch.setattr(main.messagebox, "showwarning", lambda *args, **kwargs: None)
+    return tool
+
+
+def reference_remove(positions, seat_data, students, pos):
+    """逐座位扫描的离班补位，作为对照"""
+    name = seat_data[pos]["name"]
+    seat_data[pos] = {"name": "空", "gender": "空"}
+    students.remove(next(stu for stu in students if stu["姓名"] == name))
+    seated = {data["name"] for data in seat_data.values()}
+    waiting = [stu for stu in students if stu["姓名"] not in seated]
+    if waiting:
+        height_map = {stu["姓名"]: stu["身高"] for stu in students}
+        slots = main.find_height_slots(positions, seat_data, height_map, [stu["身高"] for stu in waiting])
+        best = min(range(len(waiting)), key=lambda i: abs(slots[i] - positions.index(pos)))
+        entry = {"name": waiting[best]["姓名"], "gender": waiting[best]["性别"]}
+        main.insert_with_min_shift(positions, seat_data, slots[best], entry)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_join_and_leave_match_full_scan(seed, monkeypatch):
+    rng = random.Random(seed)
+    config = {"podium_seats": 2, "main_rows": 4, "main_cols": 5, "class_name": "", "teacher_name": ""}
+    positions = main.build_seat_positions(config)
+    students = [{"姓名": f"学生{i}", "性别": "男女"[i % 2], "身高": float(rng.randint(150, 190))}
+                for i in range(len(positions) + 3)]
+    ordered = sorted(students, key=lambda stu: stu["身高"])
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    for pos, stu in zip(positions, ordered[3:]):
+        seat_data[pos] = {"name": stu["姓名"], "gender": stu["性别"]}
+    tool = make_tool(positions, dict(seat_data), list(students), monkeypatch)
+    expected_seats, expected_students = dict(seat_data), list(students)
+    for step in range(12):
+        if rng.random() < 0.6:
+            pos = rng.choice([pos for pos in positions if expected_seats[pos]["name"] != "空"])
+            reference_remove(positions, expected_seats, expected_students, pos)
+            tool.remove_student_at(pos)
+        else:
+            student = {"姓名": f"插班{step}", "性别": "女", "身高": float(rng.randint(150, 190))}
+            answers = iter([student["姓名"], student["性别"]])
+            monkeypatch.setattr(main.simpledialog, "askstring", lambda *args, **kwargs: next(answers))
+            monkeypatch.setattr(main.simpledialog, "askfloat", lambda *args, **kwargs: student["身高"])
+            height_map = {stu["姓名"]: stu["身高"] for stu in expected_students}
+            expected_students.append(student)
+            slot = main.find_height_slot(positions, expected_seats, height_map, student["身高"])
+            main.insert_with_min_shift(positions, expected_seats, slot, {"name": student["姓名"], "gender": "女"})
+            tool.add_student()
+        assert tool.seat_data == expected_seats
+        assert tool.students == expected_students
+    # 只记录变化的座位也能完整撤销
+    while tool.history.undo_stack:
+        tool.undo()
+    assert tool.seat_data == seat_data and tool.students == students
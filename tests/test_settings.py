@@ -0,0 +1,45 @@
+import main
+
+
+def write_ini(path, text):
+    path.write_text(text, encoding="utf-8")
+
+
+def test_update_notifies_subscribed_sections(tmp_path):
+    settings = main.SettingsService(str(tmp_path / "config.ini"))
+    calls = []
+    unsubscribe = settings.subscribe(lambda section, changed: calls.append((section, changed)), ["Export"])
+    settings.update("Export", {"main_title": "期中座位表"})
+    settings.update("Layout", {"main_rows": 3})
+    # 值未变化时不通知
+    settings.update("Export", {"main_title": "期中座位表"})
+    assert calls == [("Export", {"main_title"})]
+    assert settings.get("Export", "main_title") == "期中座位表"
+    unsubscribe()
+    settings.update("Export", {"main_title": "座位表"})
+    assert len(calls) == 1
+
+
+def test_snapshot_is_not_affected_by_later_updates(tmp_path):
+    settings = main.SettingsService(str(tmp_path / "config.ini"))
+    settings.update("Export", {"title_space_count": 3})
+    snapshot = settings.snapshot()
+    settings.update("Export", {"title_space_count": 5})
+    assert snapshot.getint("Export", "title_space_count") == 3
+    assert settings.getint("Export", "title_space_count") == 5
+    assert main.SettingsService(settings.path).getint("Export", "title_space_count") == 5
+
+
+def test_reload_reports_and_notifies_external_changes(tmp_path):
+    path = tmp_path / "config.ini"
+    write_ini(path, "[Layout]\nmain_rows = 6\n\n[Workspace]\nmax_views = 3\n")
+    settings = main.SettingsService(str(path))
+    calls = []
+    settings.subscribe(lambda section, changed: calls.append((section, changed)))
+    assert settings.reload() == {}
+    write_ini(path, "[Layout]\nmain_rows = 6\n\n[Workspace]\nmax_views = 1\n\n[Color]\ntitle_text_color = red\n")
+    changes = settings.reload()
+    assert changes == {"Workspace": {"max_views"}, "Color": {"title_text_color"}}
+    assert sorted(calls) == sorted(changes.items())
+    assert settings.getint("Workspace", "max_views") == 1
+    assert settings.get("Color", "title_text_color") == "red"
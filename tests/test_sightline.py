@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import main
+
+
+def random_class(rng, rows, cols, podium):
+    config = {"podium_seats": podium, "main_rows": rows, "main_cols": cols, "class_name": "", "teacher_name": ""}
+    seat_data, height_map = {}, {}
+    for i, pos in enumerate(main.build_seat_positions(config)):
+        if rng.random() < 0.2:
+            seat_data[pos] = {"name": "空", "gender": "空"}
+        else:
+            seat_data[pos] = {"name": f"学生{i}", "gender": rng.choice("男女")}
+            height_map[f"学生{i}"] = rng.randint(140, 190)
+    return config, seat_data, height_map
+
+
+def brute_force_occlusion(config, seat_data, height_map):
+    result = {}
+    for (r, c), data in seat_data.items():
+        if data["name"] == "空" or r > config["main_rows"]:
+            continue
+        front = [height_map[seat_data[(fr, c)]["name"]] for fr in range(r + 1, config["main_rows"] + 1)
+                 if seat_data[(fr, c)]["name"] != "空"]
+        result[(r, c)] = max([0] + [h - height_map[data["name"]] for h in front])
+    return result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_occlusion_matches_pairwise(seed):
+    rng = random.Random(seed)
+    config, seat_data, height_map = random_class(rng, rng.randint(1, 7), rng.randint(1, 8), rng.randint(0, 6))
+    occlusion = main.sightline_occlusion(seat_data, height_map, config)
+    assert occlusion == pytest.approx(brute_force_occlusion(config, seat_data, height_map))
+
+
+def test_podium_seats_do_not_block_first_row():
+    config = {"podium_seats": 2, "main_rows": 2, "main_cols": 4, "class_name": "", "teacher_name": ""}
+    positions = main.build_seat_positions(config)
+    seat_data = {pos: {"name": f"学生{i}", "gender": "男"} for i, pos in enumerate(positions)}
+    # 讲台侧座位的学生最高，第一排都比他矮
+    height_map = {f"学生{i}": (200 if i < 2 else 150) for i in range(len(positions))}
+    occlusion = main.sightline_occlusion(seat_data, height_map, config)
+    assert all(pos[0] <= config["main_rows"] for pos in occlusion)
+    assert sum(occlusion.values()) == 0
+    assert main.score_arrangement(seat_data, height_map, config)["sightline"] == 0
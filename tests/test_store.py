@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+import main
+
+LAYOUT = {"podium_seats": 2, "main_rows": 2, "main_cols": 3, "class_name": "一班", "teacher_name": "王老师"}
+STUDENTS = [
+    {"姓名": "甲", "性别": "男", "身高": 160.0, "学号": "01"},
+    {"姓名": "乙", "性别": "女", "身高": 155.5, "学号": "02"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = main.SQLiteSeatStore(str(tmp_path / "座位表数据.db"))
+    yield store
+    store.close()
+
+
+def seats(layout, names=("甲", "乙")):
+    positions = main.build_seat_positions(layout)
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    for pos, name in zip(positions, names):
+        seat_data[pos] = {"name": name, "gender": "男"}
+    return seat_data, {pos: idx + 1 for idx, pos in enumerate(positions)}
+
+
+def test_save_load_round_trip(store):
+    seat_data, seat_index_map = seats(LAYOUT)
+    record = {"fingerprint": "f", "method": "height"}
+    class_id = store.save_class(LAYOUT, seat_data, seat_index_map, STUDENTS, record)
+    loaded = store.load_class(class_id)
+    assert loaded["class_id"] == class_id
+    assert loaded["layout_config"] == LAYOUT
+    assert loaded["students"] == STUDENTS
+    assert loaded["arrangement"] == record
+    expected = main.build_save_payload(LAYOUT, seat_data, seat_index_map, STUDENTS)
+    assert loaded["seat_data"] == expected["seat_data"]
+    assert loaded["seat_index_map"] == expected["seat_index_map"]
+    assert store.load_class(class_id + 1) is None
+
+
+def test_rename_updates_the_same_class(store):
+    seat_data, seat_index_map = seats(LAYOUT)
+    class_id = store.save_class(LAYOUT, seat_data, seat_index_map, STUDENTS)
+    renamed = dict(LAYOUT, class_name="高一（1）班")
+    assert store.save_class(renamed, *seats(renamed, ["甲"]), STUDENTS[:1], class_id=class_id) == class_id
+    classes = store.list_classes()
+    assert [(info["class_id"], info["class_name"], info["student_count"]) for info in classes] == \
+        [(class_id, "高一（1）班", 1)]
+    assert store.load_class(class_id)["layout_config"]["class_name"] == "高一（1）班"
+    assert store.find_class("一班") is None and store.find_class("高一（1）班") == class_id
+    # 旧名称下没有遗留的学生和座位
+    assert [r["class_name"] for r in store.find_student("甲")] == ["高一（1）班"]
+    assert store.find_student("乙") == []
+
+
+def test_unnamed_classes_are_kept_apart(store):
+    unnamed = dict(LAYOUT, class_name="", teacher_name="")
+    first = store.save_class(unnamed, *seats(unnamed, ["甲"]), STUDENTS[:1])
+    second = store.save_class(unnamed, *seats(unnamed, ["乙"]), STUDENTS[1:])
+    assert first != second
+    assert [s["姓名"] for s in store.load_class(first)["students"]] == ["甲"]
+    assert [s["姓名"] for s in store.load_class(second)["students"]] == ["乙"]
+    store.delete_class(first)
+    assert store.load_class(first) is None
+    assert [info["class_id"] for info in store.list_classes()] == [second]
+    assert store.find_student("甲") == []
+
+
+def test_old_database_with_unique_names_is_migrated(tmp_path):
+    db_path = str(tmp_path / "旧版.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(main.SQLiteSeatStore.SCHEMA.replace("name TEXT NOT NULL,", "name TEXT NOT NULL UNIQUE,", 1))
+    with conn:
+        conn.execute("INSERT INTO classes VALUES (7, '一班', '王老师', 0)")
+        conn.execute("INSERT INTO layouts VALUES (7, 2, 2, 3)")
+        conn.execute("INSERT INTO students (class_id, sort_order, name, gender, height) VALUES (7, 0, '甲', '男', 160)")
+    conn.close()
+    store = main.SQLiteSeatStore(db_path)
+    try:
+        # 班级编号和学生数据保留，同名班级可以共存
+        assert [s["姓名"] for s in store.load_class(7)["students"]] == ["甲"]
+        other = store.save_class(LAYOUT, *seats(LAYOUT), STUDENTS)
+        assert other != 7 and len(store.list_classes()) == 2
+        store.delete_class(7)
+        assert store.load_class(other)["students"] == STUDENTS
+    finally:
+        store.close()
+
+
+def test_class_portal_names_duplicate_classes_apart(store, tmp_path):
+    for name in ("一班", "一班", ""):
+        layout = dict(LAYOUT, class_name=name)
+        store.save_class(layout, *seats(layout), STUDENTS)
+    assert main.write_class_portal(store, str(tmp_path / "网页")) == 3
+    pages = sorted(p.name for p in (tmp_path / "网页").iterdir())
+    assert len(pages) == 4 and "index.html" in pages
@@ -0,0 +1,153 @@
+import json
+import time
+
+import pytest
+
+import main
+
+BY_NAME = '''
+@register_strategy("by_name", "按姓名排序", randomized=False, uses_scores=False)
+def by_name(students, seat_positions, rng, params):
+    return sorted(range(len(students)), key=lambda i: students[i]["姓名"])
+
+
+@register_strategy("forever", "死循环")
+def forever(students, seat_positions, rng, params):
+    while True:
+        pass
+'''
+
+STUDENTS = [{"姓名": name, "性别": "男", "身高": 160.0} for name in "丙甲乙"]
+LAYOUT = {"podium_seats": 0, "main_rows": 1, "main_cols": 3, "class_name": "", "teacher_name": ""}
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    directory = tmp_path / "strategies"
+    directory.mkdir()
+    yield directory
+    # 测试中登记的自定义策略不影响其他测试
+    main.register_worker_strategies([])
+
+
+@pytest.fixture
+def worker(plugin_dir):
+    worker = main.StrategyWorker(str(plugin_dir))
+    yield worker
+    worker.stop()
+
+
+def test_plugins_are_only_executed_in_the_worker(plugin_dir, worker):
+    (plugin_dir / "by_name.py").write_text(BY_NAME, encoding="utf-8")
+    (plugin_dir / "broken.py").write_text("raise RuntimeError('坏文件')", encoding="utf-8")
+    errors = main.load_custom_strategies(worker, timeout=60)
+    assert [error for _, error in errors] == ["RuntimeError: 坏文件"]
+    strategy = main.ARRANGE_STRATEGIES["by_name"]
+    assert strategy.func is None and not strategy.builtin and strategy.title == "按姓名排序"
+
+    positions = main.build_seat_positions(LAYOUT)
+    seat_data, record = main.run_arrangement(STUDENTS, positions, LAYOUT, "by_name", worker=worker, timeout=60)
+    assert [seat_data[pos]["name"] for pos in positions] == sorted("丙甲乙")
+    assert record["seed"] is None
+    with pytest.raises(RuntimeError):
+        main.compute_arrangement_order(STUDENTS, positions, "by_name")
+
+
+def test_custom_strategy_without_worker_is_rejected(plugin_dir):
+    main.register_worker_strategies([{"name": "by_name", "title": "按姓名排序", "randomized": False,
+                                      "uses_scores": False, "source": None}])
+    # 名单与其他测试不同，不会命中排座结果缓存
+    students = STUDENTS[:2]
+    with pytest.raises(RuntimeError):
+        main.run_arrangement(students, main.build_seat_positions(LAYOUT), LAYOUT, "by_name")
+
+
+def test_blocking_plugin_file_times_out(plugin_dir, worker):
+    (plugin_dir / "hang.py").write_text("import time\nwhile True:\n    time.sleep(0.1)\n", encoding="utf-8")
+    start = time.monotonic()
+    errors = main.load_custom_strategies(worker, timeout=3)
+    assert time.monotonic() - start < 10
+    assert errors and "超时" in errors[0][1]
+    assert all(strategy.builtin for strategy in main.ARRANGE_STRATEGIES.values())
+    assert not worker.busy
+
+
+def test_looping_strategy_times_out_and_worker_recovers(plugin_dir, worker):
+    (plugin_dir / "by_name.py").write_text(BY_NAME, encoding="utf-8")
+    assert main.load_custom_strategies(worker, timeout=60) == []
+    positions = main.build_seat_positions(LAYOUT)
+    # 先运行一次，进程启动时间不计入下面的超时
+    worker.run("by_name", STUDENTS, positions, timeout=60)
+    with pytest.raises(RuntimeError, match="超时"):
+        worker.run("forever", STUDENTS, positions, seed=1, timeout=1)
+    assert worker.run("by_name", STUDENTS, positions, timeout=60) == sorted(range(3), key=lambda i: STUDENTS[i]["姓名"])
+
+
+def test_poll_and_cancel(plugin_dir, worker):
+    (plugin_dir / "by_name.py").write_text(BY_NAME, encoding="utf-8")
+    worker.submit_list(timeout=60)
+    with pytest.raises(RuntimeError):
+        worker.submit("by_name", STUDENTS, [])
+    status, value = worker.wait()
+    assert status == "ok" and [info["name"] for info in value["strategies"]] == ["by_name", "forever"]
+    worker.submit("forever", STUDENTS, main.build_seat_positions(LAYOUT), seed=1, timeout=60)
+    assert worker.poll() is None
+    worker.cancel()
+    assert not worker.busy and worker.poll() is None
+
+
+def test_api_server_runs_custom_strategies_in_the_worker(plugin_dir, worker, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "get_base_dir", lambda: str(tmp_path))
+    (tmp_path / "config.ini").write_text("[Strategy]\ntimeout = 1\n", encoding="utf-8")
+    (plugin_dir / "by_name.py").write_text(BY_NAME, encoding="utf-8")
+    main.load_custom_strategies(worker, timeout=60)
+    server = main.SeatingAPIServer(workers=1, strategy_worker=worker)
+    try:
+        def request(method):
+            body = json.dumps({"students": STUDENTS, "layout_config": LAYOUT, "method": method, "seed": 1},
+                              ensure_ascii=False).encode("utf-8")
+            status, _, body, _ = server.process_arrange(body, "application/json", {})
+            return status, json.loads(body)
+        status, data = request("forever")
+        assert status == 500 and "超时" in data["error"]
+        status, data = request("by_name")
+        assert status == 200 and data["arrangement"]["method"] == "by_name"
+    finally:
+        server.executor.shutdown()
+
+
+def test_edited_plugin_is_not_run_with_the_old_version(plugin_dir, worker):
+    path = plugin_dir / "by_name.py"
+    path.write_text(BY_NAME, encoding="utf-8")
+    main.load_custom_strategies(worker, timeout=60)
+    positions = main.build_seat_positions(LAYOUT)
+    # 名单与其他测试不同，不会命中排座结果缓存
+    students = STUDENTS[::-1]
+    old = main.describe_arrangement(students, LAYOUT, "by_name")
+    path.write_text(BY_NAME.replace('"按姓名排序"', '"按姓名排序（新）"'), encoding="utf-8")
+    # 进程重新启动时读取了修改后的文件，界面登记的仍是旧版本
+    worker.stop()
+    with pytest.raises(RuntimeError, match="已修改"):
+        main.run_arrangement(students, positions, LAYOUT, "by_name", worker=worker, timeout=60)
+    main.load_custom_strategies(worker, timeout=60)
+    _, record = main.run_arrangement(students, positions, LAYOUT, "by_name", worker=worker, timeout=60)
+    assert record["fingerprint"] != old["fingerprint"]
+
+
+def test_empty_plugin_folder_does_not_start_the_worker(plugin_dir, worker):
+    (plugin_dir / "_helper.py").write_text(BY_NAME, encoding="utf-8")
+    (plugin_dir / "说明.txt").write_text("", encoding="utf-8")
+    assert main.load_custom_strategies(worker, timeout=60) == []
+    assert worker._process is None
+    assert all(strategy.builtin for strategy in main.ARRANGE_STRATEGIES.values())
+
+
+def test_listing_is_told_apart_from_an_arrangement(plugin_dir, worker):
+    (plugin_dir / "by_name.py").write_text(BY_NAME, encoding="utf-8")
+    worker.submit_list(60)
+    assert worker.busy and worker.listing
+    status, value = worker.wait()
+    assert status == "ok" and not worker.listing
+    worker.submit("by_name", STUDENTS[1:], main.build_seat_positions(LAYOUT), timeout=60)
+    assert worker.busy and not worker.listing
+    assert worker.wait()[0] == "ok"
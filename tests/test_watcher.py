@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import main
+
+
+def write_roster(path, names, gender="男"):
+    lines = ["姓名,性别,身高"] + [f"{name},{gender},{160 + i}" for i, name in enumerate(names)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ROSTER_CACHE_DIR", str(tmp_path / "cache"))
+    folder = tmp_path / "名单"
+    folder.mkdir()
+    (folder / "config.ini").write_text("[Layout]\nmain_rows = 2\nmain_cols = 3\n", encoding="utf-8")
+    write_roster(folder / "一班.csv", ["甲", "乙", "丙"])
+    write_roster(folder / "二班.csv", ["丁", "戊"])
+    return folder
+
+
+def watcher(folder):
+    return main.RosterFolderWatcher(str(folder), method="height", formats=("json", "html"))
+
+
+def output_mtimes(folder):
+    output_dir = folder / main.RosterFolderWatcher.OUTPUT_DIR
+    return {name: os.stat(output_dir / name).st_mtime_ns for name in os.listdir(output_dir)}
+
+
+def test_unchanged_folder_regenerates_nothing(folder):
+    assert watcher(folder).run_once() == 2
+    before = output_mtimes(folder)
+    assert {"一班.json", "一班.html", "二班.json", "二班.html"} <= set(before)
+    assert watcher(folder).run_once() == 0
+    assert output_mtimes(folder) == before
+
+
+def test_changed_roster_regenerates_only_its_class(folder):
+    assert watcher(folder).run_once() == 2
+    before = output_mtimes(folder)
+    write_roster(folder / "二班.csv", ["丁", "戊", "己"])
+    changed = watcher(folder).scan()
+    assert [class_id for class_id, _, _ in changed] == ["二班"]
+    assert watcher(folder).run_once() == 1
+    after = output_mtimes(folder)
+    assert after["一班.json"] == before["一班.json"] and after["一班.html"] == before["一班.html"]
+    assert after["二班.json"] != before["二班.json"]
+
+
+def test_export_settings_trigger_regeneration(folder):
+    assert watcher(folder).run_once() == 2
+    with open(folder / "config.ini", "a", encoding="utf-8") as f:
+        f.write("[Export]\nmain_title = 期中考试座位表\n")
+    assert watcher(folder).run_once() == 2
+    html = (folder / main.RosterFolderWatcher.OUTPUT_DIR / "一班.html").read_text(encoding="utf-8")
+    assert "期中考试座位表" in html
+
+
+def test_failed_class_is_retried_only_after_its_input_changes(folder, capsys):
+    write_roster(folder / "二班.csv", ["丁", "戊"], gender="未知")
+    assert watcher(folder).run_once() == 2
+    assert "生成失败" in capsys.readouterr().out
+    state = watcher(folder).state
+    assert "error" in state["二班"] and "error" not in state["一班"]
+    # 输入不变：不再重试，也不再输出错误（重新启动后同样如此）
+    assert watcher(folder).run_once() == 0
+    assert capsys.readouterr().out == ""
+    write_roster(folder / "二班.csv", ["丁", "戊"])
+    assert watcher(folder).run_once() == 1
+    assert "error" not in watcher(folder).state["二班"]
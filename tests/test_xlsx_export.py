@@ -0,0 +1,81 @@
+import pytest
+
+import main
+
+openpyxl = pytest.importorskip("openpyxl")
+
+LAYOUT = {"podium_seats": 2, "main_rows": 2, "main_cols": 3, "class_name": "一班", "teacher_name": "王老师"}
+
+
+def arranged(layout, people):
+    positions = main.build_seat_positions(layout)
+    seat_data = {pos: {"name": "空", "gender": "空"} for pos in positions}
+    for pos, (name, gender) in zip(positions, people):
+        seat_data[pos] = {"name": name, "gender": gender}
+    return seat_data, {pos: idx + 1 for idx, pos in enumerate(positions)}
+
+
+def seat_cells(sheet):
+    """座位表工作表中的座位格：{座位号: (姓名, 填充色)}"""
+    cells = {}
+    for row in sheet.iter_rows(min_row=3):
+        for cell in row:
+            if cell.value is None or cell.value == "讲台":
+                continue
+            index, _, name = str(cell.value).partition("\n")
+            # 只比较RGB部分（openpyxl把6位颜色写成透明度为00的ARGB）
+            cells[int(index)] = (name, cell.fill.fgColor.rgb[-6:])
+    return cells
+
+
+def expected_fill(gender):
+    return main.GENDER_COLORS[gender].lstrip("#").upper()
+
+
+def test_single_class_round_trip(tmp_path):
+    seat_data, seat_index_map = arranged(LAYOUT, [("甲", "男"), ("乙", "女"), ("丙", "男")])
+    path = tmp_path / "座位表.xlsx"
+    main.write_export(str(path), "xlsx", LAYOUT, seat_data, seat_index_map, list(seat_data), [], None)
+
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ["座位清单", "一班"]
+    rows = list(workbook["座位清单"].iter_rows(values_only=True))
+    assert rows[0][0] == "班级" and len(rows) == 1 + len(seat_data)
+    listed = {row[2]: (row[0], row[5], row[6]) for row in rows[1:]}
+    cells = seat_cells(workbook["一班"])
+    assert set(cells) == set(listed) == set(seat_index_map.values())
+    for pos, data in seat_data.items():
+        index = seat_index_map[pos]
+        name = "" if data["name"] == "空" else data["name"]
+        # 空字符串的单元格读回为None
+        assert listed[index] == ("一班", name or None, data["gender"] if name else None)
+        # 座位格按性别着色，空座位使用“空”的颜色
+        assert cells[index] == (name, expected_fill(data["gender"]))
+
+
+def test_workbook_has_one_sheet_per_class(tmp_path):
+    store = main.SQLiteSeatStore(str(tmp_path / "座位表数据.db"))
+    try:
+        classes = [("一班", [("甲", "男")]), ("二班", [("乙", "女"), ("丙", "男")]), ("一班", [("丁", "女")]),
+                   ("", [])]
+        for name, people in classes:
+            layout = dict(LAYOUT, class_name=name)
+            store.save_class(layout, *arranged(layout, people), [])
+        path = tmp_path / "所有班级.xlsx"
+        assert main.write_class_workbook(store, str(path)) == len(classes)
+    finally:
+        store.close()
+
+    workbook = openpyxl.load_workbook(path)
+    # 班级按最近修改时间排列，重名和未命名的班级各占一个工作表
+    assert workbook.sheetnames == ["座位清单", "班级1", "一班", "二班", "一班(2)"]
+    seats = len(main.build_seat_positions(LAYOUT))
+    rows = list(workbook["座位清单"].iter_rows(min_row=2, values_only=True))
+    assert len(rows) == seats * len(classes)
+    for title, (_, people) in zip(workbook.sheetnames[1:], reversed(classes)):
+        cells = seat_cells(workbook[title])
+        assert len(cells) == seats
+        assert sorted(name for name, _ in cells.values() if name) == sorted(name for name, _ in people)
+        genders = dict(people)
+        for name, fill in cells.values():
+            assert fill == expected_fill(genders.get(name, "空"))